@@ -0,0 +1,113 @@
+# -*- coding: utf-8 -*-
+'''Reconciles the desired domain of every host of the play from the Ansible controller, in a few composites.
+
+Every host describes its part of the domain in the jcli_domain variable (server_groups, servers and
+deployments as for the jcli_domain module, its servers default to the host of that variable or to the
+inventory name). The first host of the play batch reads the model of the domain controller once, over
+http, and applies what differs as one composite per phase and per host, the composites of a phase on a
+pool of keep-alive connections; the other hosts report the shared result.'''
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+import sys
+
+from ansible.errors import AnsibleActionFail
+from ansible.plugins.action import ActionBase
+
+# module_utils of the role, they fall back to plain imports outside of a module; appended, so they never shadow a
+# module of the controller
+MODULE_UTILS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'module_utils')
+if MODULE_UTILS not in sys.path:
+    sys.path.append(MODULE_UTILS)
+
+from jcli import JBossConnetionError, JBossOperationFailed, closeSessions
+from jcli_dmr import toCli
+from jcli_model import readModel
+from jcli_reconcile import applyBatch, domainSteps
+from jcli_timing import metricsReport, resetMetrics
+
+ARGS = {
+    "controller_host": 'localhost',
+    "controller_port": 9990,
+    "user": None,
+    "password": None,
+    "server_groups": [],
+    "servers": [],
+    "deployments": [],
+    "host": 'master',
+    "var": 'jcli_domain',
+    "workers": 10,
+    "model": None,
+}
+
+def mergeDomains(contributions, default):
+    '''desired domain of every (inventory name, jcli_domain) contribution, the first description of a name wins'''
+    desired = {"server_groups": [], "servers": [], "deployments": []}
+    seen = set()
+    for inventoryName, contribution in contributions:
+        for kind in desired:
+            for item in contribution.get(kind) or []:
+                if kind == 'servers':
+                    item = dict(item, host=item.get('host') or contribution.get('host') or inventoryName or default)
+                key = (kind, item.get('host'), item['name'])
+                if key not in seen:
+                    seen.add(key)
+                    desired[kind].append(item)
+    return desired
+
+class ActionModule(ActionBase):
+
+    TRANSFERS_FILES = False
+    _requires_connection = False
+
+    def run(self, tmp=None, task_vars=None):
+        task_vars = task_vars or {}
+        result = super(ActionModule, self).run(tmp, task_vars)
+        args = dict(ARGS)
+        unknown = set(self._task.args) - set(ARGS)
+        if unknown:
+            raise AnsibleActionFail('Unsupported parameters: {}'.format(', '.join(sorted(unknown))))
+        args.update(self._task.args)
+        if not args['user'] or not args['password']:
+            raise AnsibleActionFail('user and password are required')
+
+        hosts = task_vars.get('ansible_play_batch') or [task_vars.get('inventory_hostname')]
+        if task_vars.get('inventory_hostname') != hosts[0]:
+            result.update({"changed": False, "skipped": True, "msg": "Applied by {}".format(hosts[0])})
+            return result
+
+        hostvars = task_vars.get('hostvars') or {}
+        contributions = [(None, {"server_groups": args['server_groups'], "servers": args['servers'], "deployments": args['deployments']})]
+        contributions += [(host, hostvars[host].get(args['var']) or {}) for host in hosts if host in hostvars]
+        data = dict(mergeDomains(contributions, args['host']), host=args['host'], transport='http', jboss_home=None,
+                    controller_host=args['controller_host'], controller_port=int(args['controller_port']),
+                    user=args['user'], password=args['password'])
+
+        resetMetrics()
+        try:
+            model = args['model'] if args['model'] is not None and not args['model'].get('invalidated') else readModel(data)
+            steps, diff = domainSteps(data, model)
+            meta = {"status": "OK", "hosts": len(hosts), "operations": [toCli(step) for step in steps], "composites": []}
+            isError = False
+            if steps and not self._play_context.check_mode:
+                isError, meta['composites'] = applyBatch(data, steps, int(args['workers']))
+        except (JBossConnetionError, JBossOperationFailed) as e:
+            result.update({"failed": True, "msg": str(e), "metrics": metricsReport()})
+            return result
+        finally:
+            closeSessions()
+
+        result.update({
+            "changed": bool(steps),
+            "diff": diff,
+            "meta": meta,
+            "reload_required": any(composite.get('reload_required') for composite in meta['composites']),
+            "restart_required": any(composite.get('restart_required') for composite in meta['composites']),
+            "metrics": metricsReport(),
+        })
+        if isError:
+            meta['status'] = "Failed to reconcile the domain"
+            result.update({"failed": True, "msg": "Error reconciling domain"})
+        return result
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+'''Sums the metrics returned by the jcli modules per host and per module, printed at the end of the play.
+
+Enable it with callbacks_enabled = jcli_metrics in the [defaults] section of ansible.cfg.'''
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+from ansible.plugins.callback import CallbackBase
+
+class CallbackModule(CallbackBase):
+    CALLBACK_VERSION = 2.0
+    CALLBACK_TYPE = 'aggregate'
+    CALLBACK_NAME = 'jcli_metrics'
+    CALLBACK_NEEDS_ENABLED = True
+
+    # slowest tasks listed in the report
+    TOP = 10
+
+    def __init__(self, display=None):
+        super(CallbackModule, self).__init__(display)
+        self.totals = {}
+        self.tasks = []
+
+    def collect(self, result):
+        results = result._result.get('results') or [result._result]
+        for item in results:
+            metrics = item.get('metrics') if isinstance(item, dict) else None
+            if not metrics:
+                continue
+            host = result._host.get_name()
+            module = result._task.action
+            total = self.totals.setdefault((host, module), {"tasks": 0, "seconds": 0, "kinds": {}})
+            total['tasks'] += 1
+            total['seconds'] += metrics.get('seconds', 0)
+            for kind, kindTotal in (metrics.get('totals') or {}).items():
+                entry = total['kinds'].setdefault(kind, {"count": 0, "seconds": 0})
+                entry['count'] += kindTotal['count']
+                entry['seconds'] += kindTotal['seconds']
+            self.tasks.append((metrics.get('seconds', 0), host, result._task.get_name(), metrics.get('totals') or {}))
+
+    def v2_runner_on_ok(self, result):
+        self.collect(result)
+
+    def v2_runner_on_failed(self, result, ignore_errors=False):
+        self.collect(result)
+
+    def v2_playbook_on_stats(self, stats):
+        if not self.totals:
+            return
+        self._display.banner('JCLI METRICS')
+        for (host, module), total in sorted(self.totals.items()):
+            kinds = ', '.join('{} {}x {:.2f}s'.format(kind, entry['count'], entry['seconds'])
+                              for kind, entry in sorted(total['kinds'].items(), key=lambda item: -item[1]['seconds']))
+            self._display.display('{} {}: {} tasks {:.2f}s ({})'.format(host, module, total['tasks'], total['seconds'], kinds))
+        self._display.display('slowest tasks:')
+        for seconds, host, name, totals in sorted(self.tasks, key=lambda task: -task[0])[:self.TOP]:
+            dominant = max(totals.items(), key=lambda item: item[1]['seconds'])[0] if totals else '-'
+            self._display.display('  {:.2f}s {} {} (mostly {})'.format(seconds, host, name, dominant))
@@ -0,0 +1,136 @@
+# -*- coding: utf-8 -*-
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+DOCUMENTATION = '''
+    name: jcli_domain
+    short_description: servers of a WildFly managed domain, read from its domain controller
+    description:
+        - One inventory host per server-config, named after host_format, in a group per server group and per host controller.
+        - Hosts, server groups and server-configs are read in one composite, kept in the inventory cache when cache is enabled.
+        - Enable it with enable_plugins = jcli_domain in ansible.cfg, in a file ending in jcli.yml or jcli.yaml.
+    extends_documentation_fragment:
+        - constructed
+        - inventory_cache
+    options:
+        plugin:
+            description: token that ensures this is a source file for the plugin.
+            required: true
+            choices: ['jcli_domain']
+        controller_host:
+            description: domain controller
+            default: localhost
+        controller_port:
+            description: management port of the domain controller
+            type: int
+            default: 9990
+        transport:
+            description: http reads from the machine running Ansible, cli needs jboss_home there
+            default: http
+            choices: ['http', 'cli']
+        jboss_home:
+            description: WildFly installation whose jboss-cli the cli transport runs
+        user:
+            description: management user
+            required: true
+            env:
+                - name: JCLI_USER
+        password:
+            description: password of the management user
+            required: true
+            env:
+                - name: JCLI_PASSWORD
+        host_format:
+            description: name of the inventory host of a server-config, from host and server
+            default: '{host}_{server}'
+        group_prefix:
+            description: prefix of the groups of server groups and host controllers
+            default: ''
+'''
+
+import os
+import sys
+
+from ansible.errors import AnsibleParserError
+from ansible.plugins.inventory import BaseInventoryPlugin, Cacheable, Constructable
+
+# readTopology and the sessions come from the module_utils of the role; the inventory is parsed inside every ansible
+# command, the directory goes last so it can not shadow what those commands import
+MODULE_UTILS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'module_utils')
+if MODULE_UTILS not in sys.path:
+    sys.path.append(MODULE_UTILS)
+
+from jcli import JBossConnetionError, JBossOperationFailed, closeSessions
+from jcli_model import readTopology
+
+def serverVars(host, server, config, group):
+    '''host vars of a server-config, the socket binding group of its server group unless it has its own'''
+    return {
+        "jcli_host": host,
+        "jcli_server": server,
+        "jcli_server_group": config.get('group'),
+        "jcli_profile": group.get('profile'),
+        "jcli_port_offset": config.get('socket-binding-port-offset') or 0,
+        "jcli_socket_binding_group": config.get('socket-binding-group') or group.get('socket-binding-group'),
+        "jcli_auto_start": config.get('auto-start'),
+        "jcli_jvms": sorted(config.get('jvm') or {}),
+    }
+
+class InventoryModule(BaseInventoryPlugin, Constructable, Cacheable):
+
+    NAME = 'jcli_domain'
+
+    def verify_file(self, path):
+        return super(InventoryModule, self).verify_file(path) and path.endswith(('jcli.yml', 'jcli.yaml'))
+
+    def readTopology(self):
+        data = {
+            "controller_host": self.get_option('controller_host'),
+            "controller_port": self.get_option('controller_port'),
+            "transport": self.get_option('transport'),
+            "jboss_home": self.get_option('jboss_home'),
+            "user": self.get_option('user'),
+            "password": self.get_option('password'),
+        }
+        try:
+            return readTopology(data)
+        except (JBossConnetionError, JBossOperationFailed) as e:
+            raise AnsibleParserError('Could not read the domain of {}:{}: {}'.format(data['controller_host'], data['controller_port'], e))
+        finally:
+            closeSessions()
+
+    def parse(self, inventory, loader, path, cache=True):
+        super(InventoryModule, self).parse(inventory, loader, path, cache)
+        self._read_config_data(path)
+        # cache is false with --flush-cache, the topology is then read again and replaces the cached one
+        key = self.get_cache_key(path)
+        useCache = self.get_option('cache') and cache
+        topology = None
+        if useCache:
+            try:
+                topology = self._cache[key]
+            except KeyError:
+                pass
+        if topology is None:
+            topology = self.readTopology()
+            if self.get_option('cache'):
+                self._cache[key] = topology
+        prefix = self.get_option('group_prefix')
+        strict = self.get_option('strict')
+        groups = topology.get('server-group') or {}
+        for name in sorted(groups):
+            self.inventory.add_group(self._sanitize_group_name(prefix + name))
+        for host, hostModel in sorted((topology.get('host') or {}).items()):
+            hostGroup = self.inventory.add_group(self._sanitize_group_name(prefix + 'host_' + host))
+            for server, config in sorted((hostModel.get('server-config') or {}).items()):
+                name = self.get_option('host_format').format(host=host, server=server)
+                self.inventory.add_host(name, group=hostGroup)
+                if config.get('group') in groups:
+                    self.inventory.add_child(self._sanitize_group_name(prefix + config['group']), name)
+                variables = serverVars(host, server, config, groups.get(config.get('group')) or {})
+                for key, value in variables.items():
+                    self.inventory.set_variable(name, key, value)
+                self._set_composite_vars(self.get_option('compose'), variables, name, strict)
+                self._add_host_to_composed_groups(self.get_option('groups'), variables, name, strict)
+                self._add_host_to_keyed_groups(self.get_option('keyed_groups'), variables, name, strict)
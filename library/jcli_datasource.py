@@ -0,0 +1,143 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.jcli_timing import metricsReport
+from ansible.module_utils.jcli import jbossBatch, jbossOperation, JBossConnetionError, JBossNotFound, JBossOperationFailed
+from ansible.module_utils.jcli_dmr import dmrOperation, dmrSummary, failureDescription, isNotFound, isSuccess, processState, toCli
+from ansible.module_utils.jcli_model import addressPairs, modelSet
+from ansible.module_utils.jcli_reconcile import dmrAttributes, reconcile
+
+# pool, validation and statement cache attributes of a datasource, with the names of the module parameters
+POOL_ATTRIBUTES = [
+    'min_pool_size', 'initial_pool_size', 'max_pool_size', 'pool_prefill', 'pool_use_strict_min', 'blocking_timeout_wait_millis',
+    'idle_timeout_minutes', 'validate_on_match', 'background_validation', 'background_validation_millis', 'check_valid_connection_sql',
+    'valid_connection_checker_class_name', 'prepared_statements_cache_size', 'share_prepared_statements', 'track_statements',
+]
+
+def datasourcesAddress(data, name='*'):
+    return [('profile', data['profile']), ('subsystem', 'datasources'), ('xa-data-source' if data['xa'] else 'data-source', name)]
+
+def readDatasources(data):
+    '''attributes of the datasources of the profile by name, every one of them read at once'''
+    response = jbossOperation(data, dmrOperation(datasourcesAddress(data, data['datasource_name'] or '*'), 'read-resource'))
+    if isNotFound(response):
+        raise JBossOperationFailed('Datasource {} does not exist in profile {}'.format(data['datasource_name'], data['profile']))
+    if not isSuccess(response):
+        raise JBossOperationFailed('Could not read the datasources of profile {}: {}'.format(data['profile'], failureDescription(response)))
+    result = response.get('result')
+    if not isinstance(result, list):
+        return {data['datasource_name']: result}
+    return dict((addressPairs(entry['address'])[-1][1], entry.get('result') or {}) for entry in result)
+
+def datasource_present(data):
+    current = readDatasources(data)
+    wanted = dmrAttributes(data, POOL_ATTRIBUTES)
+    model = {}
+    for name, attributes in current.items():
+        modelSet(model, datasourcesAddress(data, name), attributes)
+    steps = []
+    diff = {"before": {}, "after": {}}
+    for name in sorted(current):
+        reconcile(model, datasourcesAddress(data, name), wanted, 'present', steps, diff)
+    isError = False
+    hasChanged = len(steps) > 0
+    meta = {"status": "OK", "datasources": sorted(current), "operations": [toCli(step) for step in steps], "diff": diff}
+    if hasChanged and not data['check_mode']:
+        response = jbossBatch(data, steps)
+        meta['response'] = dmrSummary(response)
+        meta.update(processState(response))
+        if not isSuccess(response):
+            isError = True
+            meta['status'] = "Failed to tune the datasources"
+    return isError, hasChanged, meta
+
+def main():
+    fields = {
+        "jboss_home" : {"required": False, "type": "str"},
+        "controller_host": {
+            "required": False,
+            "default": "localhost",
+            "type": "str"
+        },
+        "controller_port": {
+            "required": False,
+            "default": 9990,
+            "type": "int"
+        },
+        "profile": {
+            "required": True,
+            "type": "str"
+        },
+        "datasource_name": {"required": False, "type": "str"},
+        "xa": {
+            "required": False,
+            "default": False,
+            "type": "bool"
+        },
+        "min_pool_size": {"required": False, "type": "int"},
+        "initial_pool_size": {"required": False, "type": "int"},
+        "max_pool_size": {"required": False, "type": "int"},
+        "pool_prefill": {"required": False, "type": "bool"},
+        "pool_use_strict_min": {"required": False, "type": "bool"},
+        "blocking_timeout_wait_millis": {"required": False, "type": "int"},
+        "idle_timeout_minutes": {"required": False, "type": "int"},
+        "validate_on_match": {"required": False, "type": "bool"},
+        "background_validation": {"required": False, "type": "bool"},
+        "background_validation_millis": {"required": False, "type": "int"},
+        "check_valid_connection_sql": {"required": False, "type": "str"},
+        "valid_connection_checker_class_name": {"required": False, "type": "str"},
+        "prepared_statements_cache_size": {"required": False, "type": "int"},
+        "share_prepared_statements": {"required": False, "type": "bool"},
+        "track_statements": {
+            "required": False,
+            "choices": ['false', 'nowarn', 'true'],
+            "type": "str"
+        },
+        "transport": {
+            "required": False,
+            "default": "cli",
+            "choices": ['cli', 'http'],
+            "type": "str"
+        },
+        "user" : {
+            "required": True,
+            "type": "str"
+        },
+        "password" : {
+            "required": True,
+            "type": "str"
+        },
+        "state": {
+            "default": "present",
+            "choices": ['present'],
+            "type": 'str'
+        },
+    }
+
+    choice_map = {
+        "present": datasource_present,
+    }
+
+    try:
+        module = AnsibleModule(argument_spec=fields, required_if=[('transport', 'cli', ['jboss_home'])], supports_check_mode=True)
+        data = dict(module.params, check_mode=module.check_mode)
+        is_error, has_changed, result = choice_map.get(module.params['state'])(data)
+    except JBossNotFound as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossConnetionError as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossOperationFailed as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except Exception as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+
+    diff = result.pop('diff')
+    if not is_error:
+        module.exit_json(changed=has_changed, meta=result, diff=diff, reload_required=result.get('reload_required', False),
+                         restart_required=result.get('restart_required', False), metrics=metricsReport())
+    else:
+        module.fail_json(msg="Error tuning datasources", meta=result, diff=diff, metrics=metricsReport())
+
+if __name__ == '__main__':
+    main()
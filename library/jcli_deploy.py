@@ -2,95 +2,322 @@
 # -*- coding: utf-8 -*-
 
 from ansible.module_utils.basic import AnsibleModule
-import subprocess
+from ansible.module_utils.jcli_timing import metricsReport
+from ansible.module_utils.jcli import jbossBatch, jbossCommand, jbossOperation, jbossRead, jbossUpload, JBossConnetionError, JBossNotFound, JBossOperationFailed, JBossTimeout
+from ansible.module_utils.jcli_dmr import dmrOperation, dmrBytes, dmrComposite, dmrSummary, cliHeaders, failureDescription, isSuccess, rolloutPlan
+from ansible.module_utils.jcli_model import addressPairs, cachedResource, invalidate, isCovered, modelFacts, modelGet, readServerStates
+from ansible.module_utils.jcli_wait import waitFor
 from os import path
-
-class JBossConnetionError(Exception):
-    '''raise this cannot connect to JBoss contorller'''
-
-class JBossNotFound(Exception):
-    '''raise this when cannot find JBoss command line interface binary'''
-
-def jbossCommand(data, cli):
-    binaryExist = False
-    remoteExists = False
-    cmd = data['jboss_home'] + '/bin/jboss-cli.sh'
-    no_cmd = path.isfile(cmd)
-    if no_cmd is False:
-        raise JBossNotFound('JBOSS command line binary ({}) is not found.'.format(cmd))
-    controller = "--controller={}:{}".format(data['controller_host'],data['controller_port'])
-    user = "-u={}".format(data['user'])
-    password = "-p={}".format(data['password'])
-    p = subprocess.Popen(["sh", cmd, "-c", cmd, controller, user, password], stdout=subprocess.PIPE)
-    commandResult, err = p.communicate()
-    if "WFLYPRT0053" in commandResult:
-        raise JBossConnetionError('Could not connect http-remoting://{}:{}'.format(data['controller_host'],data['controller_port']))
-    return commandResult
+import hashlib
+import time
 
 def isArtifactAlreadyDeployed(data):
-    cli = "deployment-info --name={}".format(data['artifact'])
-    result = jbossCommand(data, cli)
-    if "WFLYCTL0216" in result:
-        created = False
+    address = [('deployment', data['artifact'])]
+    def read():
+        content = jbossRead(data, dmrOperation(address, 'read-attribute', {"name": "content"}))
+        return None if content is None else {"content": content}
+    deployment = cachedResource(data, address, read)
+    created = deployment is not None
+    return created, deployment['content'] if created else None
+
+def artifactHash(data):
+    '''sha1 of the local archive, the hash the content repository stores it under'''
+    sha1 = hashlib.sha1()
+    with open(path.join(data['artifact_dir'], data['artifact']), 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            sha1.update(chunk)
+    return sha1.hexdigest()
+
+def contentHashes(content):
+    return [dmrBytes(item.get('hash')) for item in content or [] if item.get('hash') is not None]
+
+def isArtifactUpToDate(data, content):
+    '''managed content carries its hash, unmanaged (path) content is always redeployed'''
+    return artifactHash(data) in contentHashes(content)
+
+def versionName(data, sha1):
+    '''name of the deployment of one content of the artifact, the artifact stays its runtime-name'''
+    return '{}-{}'.format(data['artifact'], sha1[:12])
+
+def deploymentVersions(data):
+    '''deployments whose runtime-name is the artifact, by name, with their content and the server groups running them,
+    read in one composite'''
+    steps = [
+        dmrOperation([('deployment', '*')], 'read-resource'),
+        dmrOperation([('server-group', '*'), ('deployment', '*')], 'read-resource'),
+    ]
+    response = jbossOperation(data, dmrComposite(steps))
+    if not isSuccess(response):
+        raise JBossOperationFailed('Could not read the deployments: {}'.format(failureDescription(response)))
+    versions = {}
+    for entry in response['result']['step-1'].get('result') or []:
+        name = dict(addressPairs(entry['address']))['deployment']
+        result = entry.get('result') or {}
+        if (result.get('runtime-name') or name) == data['artifact']:
+            versions[name] = {"content": result.get('content'), "server_groups": []}
+    for entry in response['result']['step-2'].get('result') or []:
+        pairs = dict(addressPairs(entry['address']))
+        if pairs['deployment'] in versions:
+            versions[pairs['deployment']]['server_groups'].append(pairs['server-group'])
+    return versions
+
+def assignedServerGroups(data):
+    '''server groups the deployment is added to, read with one wildcard read'''
+    if data['server_mode'] == 'standalone':
+        return []
+    model = data.get('model')
+    if isCovered(model, [('server-group', '*'), ('deployment', data['artifact'])]):
+        groups = model.get('server-group') or {}
+        return [group for group in sorted(groups) if modelGet(groups[group], [('deployment', data['artifact'])]) is not None]
+    op = dmrOperation([('server-group', '*'), ('deployment', data['artifact'])], 'read-resource')
+    return [dict(addressPairs(entry['address']))['server-group'] for entry in jbossRead(data, op) or []]
+
+def serverGroupSteps(data, groups):
+    return [dmrOperation([('server-group', group), ('deployment', data['artifact'])], 'add', {"enabled": True}) for group in groups]
+
+def deployArtifact(data, force, groups, headers=None, name=None):
+    '''deploys the archive and adds it to groups, the content is sent once whatever the number of groups; name deploys
+    the content alone under another name, with the artifact as its runtime-name
+
+    returns the response and the upload statistics of the http transport'''
+    mode = data['server_mode']
+    archive = path.join(data['artifact_dir'], data['artifact'])
+    if data['transport'] == 'http':
+        if data['unmanaged']:
+            # the server reads the archive in place, nothing is copied
+            content = [{"path": path.abspath(archive), "archive": True}]
+        else:
+            content = [{"input-stream-index": 0}]
+        if force:
+            steps = [dmrOperation([], 'full-replace-deployment', {"name": data['artifact'], "content": content, "enabled": True})]
+        elif mode == 'standalone':
+            steps = [dmrOperation([('deployment', data['artifact'])], 'add', {"content": content, "enabled": True})]
+        elif name is not None:
+            steps = [dmrOperation([('deployment', name)], 'add', {"content": content, "runtime-name": data['artifact']})]
+        else:
+            steps = [dmrOperation([('deployment', data['artifact'])], 'add', {"content": content})]
+        if mode == 'domain':
+            steps += serverGroupSteps(data, groups)
+        op = steps[0] if len(steps) == 1 else dmrComposite(steps)
+        if headers:
+            op['operation-headers'] = headers
+        if data['unmanaged']:
+            return jbossOperation(data, op), None
+        return jbossUpload(data, op, archive, data['upload_chunk_size'])
+    unmanaged = " --unmanaged" if data['unmanaged'] else ""
+    if headers:
+        unmanaged += " --headers={}".format(cliHeaders(headers))
+    if force:
+        cli = "deploy {}/{} --force{}".format(data['artifact_dir'],data['artifact'],unmanaged) #same behaviour between standalone and domain
+        res = jbossCommand(data, cli)
+        if mode == 'domain' and groups and isSuccess(res):
+            cli = "deploy --name={} --server-groups={}".format(data['artifact'],','.join(groups))
+            res = jbossCommand(data, cli)
+        return res, None
+    elif mode == 'standalone':
+        cli = "deploy {}/{}{}".format(data['artifact_dir'],data['artifact'],unmanaged)
+    elif not groups:
+        # content only, the server groups are added later
+        if name is not None:
+            unmanaged += " --name={} --runtime-name={}".format(name, data['artifact'])
+        cli = "deploy {}/{} --disabled{}".format(data['artifact_dir'],data['artifact'],unmanaged)
     else:
-        created = True
-    return created, result
+        cli = "deploy {}/{} --server-groups={}{}".format(data['artifact_dir'],data['artifact'],','.join(groups),unmanaged)
+    return jbossCommand(data, cli), None
 
-def deployment_present(data):
+def undeployArtifact(data, groups, keepContent):
+    '''removes the deployment from groups, and from the content repository unless other groups still use it'''
     mode = data['server_mode']
+    if data['transport'] == 'http' or (mode == 'domain' and not groups):
+        if mode == 'standalone':
+            steps = [dmrOperation([('deployment', data['artifact'])], 'undeploy')]
+        else:
+            steps = [dmrOperation([('server-group', group), ('deployment', data['artifact'])], 'remove') for group in groups]
+        if not keepContent:
+            steps.append(dmrOperation([('deployment', data['artifact'])], 'remove'))
+        return jbossBatch(data, steps)
+    if mode == 'standalone':
+        cli = "undeploy {}".format(data['artifact'])
+    else:
+        cli = "undeploy {} --server-groups={}".format(data['artifact'],','.join(groups))
+        if keepContent:
+            cli += " --keep-content"
+    return jbossCommand(data, cli)
+
+def rolloutWaves(data, groups):
+    size = data['rollout_wave_size']
+    return [groups[i:i + size] for i in range(0, len(groups), size)]
+
+def waveHealth(data, groups, deployment):
+    '''started servers of groups that do not run deployment yet, and those where it failed'''
+    pending = []
+    failed = []
+    for server in readServerStates(data, deployment):
+        if server['server-group'] not in groups or str(server['server-state']).lower() == 'stopped':
+            continue
+        name = "{}/{}".format(server['host'], server['server'])
+        if server['status'] == 'FAILED':
+            failed.append(name)
+        elif str(server['server-state']).lower() != 'running' or server['status'] != 'OK':
+            pending.append(name)
+    return pending, failed
+
+def waitForWave(data, groups, deployment):
+    '''health gate of a wave, polled until its servers run deployment or rollout_timeout is over'''
+    def check():
+        pending, failed = waveHealth(data, groups, deployment)
+        return bool(failed) or not pending, (pending, failed)
+    try:
+        state, checks = waitFor(check, data['rollout_timeout'], 'Deployment of {} on {}'.format(deployment, ', '.join(groups)))
+    except JBossTimeout as e:
+        state = e.state
+    return state
+
+def moveStep(data, group, previous, deployment):
+    '''step running deployment on group in place of the version previous, adding it when previous is None and removing
+    previous when deployment is None'''
+    if previous is None:
+        return dmrOperation([('server-group', group), ('deployment', deployment)], 'add', {"enabled": True})
+    if deployment is None:
+        return dmrOperation([('server-group', group), ('deployment', previous)], 'remove')
+    return dmrOperation([('server-group', group)], 'replace-deployment', {"name": deployment, "to-replace": previous})
+
+def rolloutArtifact(data, versions, target, moves):
+    '''moves the server groups of moves to the version target wave by wave, each wave gated by the health of its servers,
+    the content uploaded first when target is a new version; a failed wave stops the rollout and, with rollback, the
+    groups moved so far go back to their version
+
+    returns whether a wave failed, the report of every wave and the upload statistics'''
+    rollback = data['rollout_on_failure'] == 'rollback'
+    running = dict((group, name) for name, version in versions.items() for group in version['server_groups'])
+    report = []
+    upload = None
+    if target not in versions:
+        res, upload = deployArtifact(data, False, [], name=target if target != data['artifact'] else None)
+        if not isSuccess(res):
+            report.append({"wave": 0, "server_groups": [], "response": dmrSummary(res)})
+            return True, report, upload
+    applied = []
+    for number, wave in enumerate(rolloutWaves(data, moves), 1):
+        started = time.time()
+        steps = [moveStep(data, group, running.get(group), target) for group in wave]
+        op = steps[0] if len(steps) == 1 else dmrComposite(steps)
+        op['operation-headers'] = rolloutPlan([wave], data['rollout_rolling_to_servers'], rollback)
+        res = jbossOperation(data, op)
+        if not isSuccess(res):
+            pending, failed = [], wave
+        else:
+            applied += wave
+            pending, failed = waitForWave(data, wave, target)
+        report.append({"wave": number, "server_groups": wave, "seconds": round(time.time() - started, 3), "pending": pending, "failed": failed})
+        if pending or failed:
+            if rollback and applied:
+                jbossBatch(data, [moveStep(data, group, target, running.get(group)) for group in applied])
+                report[-1]['rolled_back'] = applied
+            return True, report, upload
+    return False, report, upload
+
+def deployment_rollout(data):
+    '''the version of the local archive on every server group of the task: a changed archive is uploaded as a new version
+    and the groups are moved to it wave by wave, the versions no group runs any more are then removed'''
+    versions = deploymentVersions(data)
+    sha1 = artifactHash(data)
+    current = sorted(name for name, version in versions.items() if sha1 in contentHashes(version['content']))
+    target = current[0] if current else versionName(data, sha1) if versions else data['artifact']
+    running = dict((group, name) for name, version in versions.items() for group in version['server_groups'])
+    moves = [group for group in data['server_group_name'] if running.get(group) != target]
+    if current and not moves:
+        return False, False, {"status": "OK", "response": "Deployment {} is up to date".format(data['artifact']), "version": target}
+    isError, waves, upload = rolloutArtifact(data, versions, target, moves)
+    meta = {"status": "Rollout failed" if isError else "OK", "version": target, "waves": waves, "upload": upload}
+    if not isError:
+        unused = sorted(name for name, version in versions.items()
+                        if name != target and not [group for group in version['server_groups'] if group not in moves])
+        if unused:
+            response = jbossBatch(data, [dmrOperation([('deployment', name)], 'remove') for name in unused])
+            isError = not isSuccess(response)
+            meta['removed'] = unused
+            if isError:
+                meta.update({"status": "Failed to remove the previous versions", "response": dmrSummary(response)})
+    return isError, True, meta
+
+def deployment_rollout_absent(data):
+    '''every version of the artifact removed from the server groups of the task, and from the content repository when no
+    other group runs it'''
+    steps = []
+    for name, version in sorted(deploymentVersions(data).items()):
+        groups = [group for group in version['server_groups'] if group in data['server_group_name']]
+        steps += [moveStep(data, group, name, None) for group in groups]
+        if len(groups) == len(version['server_groups']):
+            steps.append(dmrOperation([('deployment', name)], 'remove'))
+    if not steps:
+        return False, False, {"status": "OK", "response": "Deployment {} does not exist".format(data['artifact'])}
+    response = jbossBatch(data, steps)
+    isError = not isSuccess(response)
+    return isError, True, {"status": "Failed to undeploy" if isError else "OK", "response": dmrSummary(response)}
+
+def deployment_present(data):
+    if data['server_mode'] == 'domain' and data['rollout_wave_size'] > 0:
+        return deployment_rollout(data)
     created, result = isArtifactAlreadyDeployed(data)
     isError = False
     hasChanged = True
     meta = {}
-    result = ""
     if not created:
-        if mode == 'standalone':
-            cli = "deploy {}/{}".format(data['artifact_dir'],data['artifact'])
-        else:
-            cli = "deploy {}/{} --server-groups={}".format(data['artifact_dir'],data['artifact'],data['server_group_name'])
-        res = jbossCommand(data, cli)
+        res, upload = deployArtifact(data, False, data['server_group_name'])
+        isError = not isSuccess(res)
+        meta = {"status" : "Failed to deploy" if isError else "OK", "response" : dmrSummary(res), "upload" : upload}
     else:
-        cli = "deploy {}/{} --force".format(data['artifact_dir'],data['artifact']) #same behaviour between standalone and domain
-        res = jbossCommand(data, cli)
-        meta = {"status": "OK", "response": res}
-        result = str(res)
-        if "WFLYDC0074" in result:
-            meta = {"status" : "Failed to deploy", "response" : result}
-            isError = True
+        assigned = assignedServerGroups(data)
+        missing = [group for group in data['server_group_name'] if group not in assigned] if data['server_mode'] == 'domain' else []
+        if isArtifactUpToDate(data, result):
+            if not missing:
+                hasChanged = False
+                resp = "Deployment {} is up to date".format(data['artifact'])
+                meta = {"status" : "OK", "response" : resp}
+            else:
+                # the content is already in the repository, only the server groups are missing
+                res = jbossBatch(data, serverGroupSteps(data, missing))
+                isError = not isSuccess(res)
+                meta = {"status" : "Failed to deploy" if isError else "OK", "response" : dmrSummary(res), "server_groups" : missing}
         else:
-            meta = {"status" : "OK", "response" : result}
+            res, upload = deployArtifact(data, True, missing)
+            if not isSuccess(res):
+                meta = {"status" : "Failed to deploy", "response" : dmrSummary(res)}
+                isError = True
+            else:
+                meta = {"status" : "OK", "response" : dmrSummary(res), "upload" : upload}
     return isError, hasChanged, meta
 
 def deployment_absent(data):
-    mode = data['server_mode']
+    if data['server_mode'] == 'domain' and data['rollout_wave_size'] > 0:
+        return deployment_rollout_absent(data)
     created, result = isArtifactAlreadyDeployed(data)
     isError = False
     hasChanged = True
     meta = {}
-    if not created:
+    assigned = assignedServerGroups(data) if created else []
+    groups = [group for group in data['server_group_name'] if group in assigned]
+    keepContent = len(groups) < len(assigned)
+    if not created or (keepContent and not groups):
         hasChanged = False
         resp = "Deployment {} does not exist".format(data['artifact'])
         meta = {"status" : "OK", "response" : resp}
     else:
-        if mode == 'standalone':
-            cli = "undeploy {}".format(data['artifact'])
-        else:
-            cli = "undeploy {} --server-groups={}".format(data['artifact'],data['server_group_name'])
-        res = jbossCommand(data, cli)
-        result = str(res)
-        if "WFLYDC0074" in result:
-            meta = {"status" : "Failed to undeploy", "response" : result}
+        res = undeployArtifact(data, groups, keepContent)
+        if not isSuccess(res):
+            meta = {"status" : "Failed to undeploy", "response" : dmrSummary(res)}
             isError = True
         else:
-            meta = {"status": "OK", "response": result}
+            meta = {"status": "OK", "response": dmrSummary(res)}
     return isError, hasChanged, meta
 
 def main():
     fields = {
-        "jboss_home" : {"required": True, "type": "str"},
+        "jboss_home" : {"required": False, "type": "str"},
         "server_group_name": {
             "required": True,
-            "type": "str"
+            "type": "list"
         },
         "artifact": {
             "required": True,
@@ -110,11 +337,49 @@ def main():
             "default": 9990,
             "type": "int"
         },
+        "unmanaged": {
+            "required": False,
+            "default": False,
+            "type": "bool"
+        },
+        "upload_chunk_size": {
+            "required": False,
+            "default": 1048576,
+            "type": "int"
+        },
+        "rollout_wave_size": {
+            "required": False,
+            "default": 0,
+            "type": "int"
+        },
+        "rollout_rolling_to_servers": {
+            "required": False,
+            "default": False,
+            "type": "bool"
+        },
+        "rollout_on_failure": {
+            "required": False,
+            "default": "rollback",
+            "choices": ['stop', 'rollback'],
+            "type": "str"
+        },
+        "rollout_timeout": {
+            "required": False,
+            "default": 300,
+            "type": "int"
+        },
         "server_mode" : {
             "required": True,
             "choices": ['standalone', 'domain'],
             "type": "str"
         },
+        "transport": {
+            "required": False,
+            "default": "cli",
+            "choices": ['cli', 'http'],
+            "type": "str"
+        },
+        "model": {"required": False, "type": "dict"},
         "user" : {
             "required": True,
             "type": "str"
@@ -136,19 +401,25 @@ def main():
     }
 
     try:
-        module = AnsibleModule(argument_spec=fields, supports_check_mode=False)
+        module = AnsibleModule(argument_spec=fields, required_if=[('transport', 'cli', ['jboss_home'])], supports_check_mode=False)
         is_error, has_changed, result = choice_map.get(module.params['state'])(module.params)
+        if has_changed:
+            # the content and the server groups of the deployment may all have changed
+            invalidate(module.params, [('deployment', module.params['artifact'])])
+            invalidate(module.params, [('server-group', '*'), ('deployment', module.params['artifact'])])
     except JBossNotFound as e:
-        module.fail_json(msg=str(e))
+        module.fail_json(msg=str(e), metrics=metricsReport())
     except JBossConnetionError as e:
-        module.fail_json(msg=str(e))
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossOperationFailed as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
     except Exception as e:
-        module.fail_json(msg=str(e))
+        module.fail_json(msg=str(e), metrics=metricsReport())
 
     if not is_error:
-        module.exit_json(changed=has_changed, meta=result)
+        module.exit_json(changed=has_changed, meta=result, ansible_facts=modelFacts(module.params), metrics=metricsReport())
     else:
-        module.fail_json(msg="Error creating server", meta=result)
+        module.fail_json(msg="Error creating server", meta=result, metrics=metricsReport())
 
 if __name__ == '__main__':
     main()
@@ -0,0 +1,110 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.jcli_timing import metricsReport
+from ansible.module_utils.jcli import jbossBatch, JBossConnetionError, JBossNotFound, JBossOperationFailed
+from ansible.module_utils.jcli_dmr import dmrSummary, isSuccess, processState, toCli
+from ansible.module_utils.jcli_model import addressPairs, invalidate, modelFacts, readModel
+from ansible.module_utils.jcli_reconcile import domainSteps
+
+def domain_present(data):
+    # a snapshot of jcli_facts is only trusted as a whole, nothing may have changed since it was taken
+    cached = data.get('model') is not None and not data['model'].get('invalidated')
+    model = data['model'] if cached else readModel(data)
+    steps, diff = domainSteps(data, model)
+    isError = False
+    hasChanged = len(steps) > 0
+    meta = {"status": "OK", "operations": [toCli(step) for step in steps], "diff": diff}
+    if hasChanged and not data['check_mode']:
+        response = jbossBatch(data, steps)
+        for step in steps:
+            invalidate(data, addressPairs(step['address']))
+        meta['response'] = dmrSummary(response)
+        meta.update(processState(response))
+        if not isSuccess(response):
+            isError = True
+            meta['status'] = "Failed to reconcile the domain"
+    return isError, hasChanged, meta
+
+def main():
+    fields = {
+        "jboss_home" : {"required": False, "type": "str"},
+        "host": {
+            "required": False,
+            "default": "master",
+            "type": "str"
+        },
+        "controller_host": {
+            "required": False,
+            "default": "localhost",
+            "type": "str"
+        },
+        "controller_port": {
+            "required": False,
+            "default": 9990,
+            "type": "int"
+        },
+        "server_groups": {
+            "required": False,
+            "default": [],
+            "type": "list"
+        },
+        "servers": {
+            "required": False,
+            "default": [],
+            "type": "list"
+        },
+        "deployments": {
+            "required": False,
+            "default": [],
+            "type": "list"
+        },
+        "transport": {
+            "required": False,
+            "default": "cli",
+            "choices": ['cli', 'http'],
+            "type": "str"
+        },
+        "model": {"required": False, "type": "dict"},
+        "user" : {
+            "required": True,
+            "type": "str"
+        },
+        "password" : {
+            "required": True,
+            "type": "str"
+        },
+        "state": {
+            "default": "present",
+            "choices": ['present'],
+            "type": 'str'
+        },
+    }
+
+    choice_map = {
+        "present": domain_present,
+    }
+
+    try:
+        module = AnsibleModule(argument_spec=fields, required_if=[('transport', 'cli', ['jboss_home'])], supports_check_mode=True)
+        data = dict(module.params, check_mode=module.check_mode)
+        is_error, has_changed, result = choice_map.get(module.params['state'])(data)
+    except JBossNotFound as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossConnetionError as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossOperationFailed as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except Exception as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+
+    diff = result.pop('diff')
+    if not is_error:
+        module.exit_json(changed=has_changed, meta=result, diff=diff, reload_required=result.get('reload_required', False),
+                         restart_required=result.get('restart_required', False), ansible_facts=modelFacts(module.params), metrics=metricsReport())
+    else:
+        module.fail_json(msg="Error reconciling domain", meta=result, diff=diff, metrics=metricsReport())
+
+if __name__ == '__main__':
+    main()
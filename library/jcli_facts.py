@@ -0,0 +1,67 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.jcli_timing import metricsReport
+from ansible.module_utils.jcli import JBossConnetionError, JBossNotFound, JBossOperationFailed
+from ansible.module_utils.jcli_model import readModel, readServerStates
+
+def gather_facts(data):
+    '''snapshot of the server groups, server-configs with their JVMs and deployments, and the state of every server
+
+    the other jcli modules take jcli_model as their model option and skip the reads it answers'''
+    facts = {"jcli_model": readModel(data)}
+    if data['server_states']:
+        facts['jcli_servers'] = readServerStates(data)
+    return facts
+
+def main():
+    fields = {
+        "jboss_home" : {"required": False, "type": "str"},
+        "controller_host": {
+            "required": False,
+            "default": "localhost",
+            "type": "str"
+        },
+        "controller_port": {
+            "required": False,
+            "default": 9990,
+            "type": "int"
+        },
+        "server_states": {
+            "required": False,
+            "default": True,
+            "type": "bool"
+        },
+        "transport": {
+            "required": False,
+            "default": "cli",
+            "choices": ['cli', 'http'],
+            "type": "str"
+        },
+        "user" : {
+            "required": True,
+            "type": "str"
+        },
+        "password" : {
+            "required": True,
+            "type": "str"
+        },
+    }
+
+    try:
+        module = AnsibleModule(argument_spec=fields, required_if=[('transport', 'cli', ['jboss_home'])], supports_check_mode=True)
+        facts = gather_facts(module.params)
+    except JBossNotFound as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossConnetionError as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossOperationFailed as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except Exception as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+
+    module.exit_json(changed=False, ansible_facts=facts, metrics=metricsReport())
+
+if __name__ == '__main__':
+    main()
@@ -2,74 +2,86 @@
 # -*- coding: utf-8 -*-
 
 from ansible.module_utils.basic import AnsibleModule
-import subprocess
-from os import path
+from ansible.module_utils.jcli_timing import metricsReport
+from ansible.module_utils.jcli import jbossBatch, jbossOperation, jbossRead, JBossConnetionError, JBossNotFound, JBossOperationFailed
+from ansible.module_utils.jcli_dmr import dmrOperation, dmrEquals, dmrSummary, isNotFound, isSuccess, processState
+from ansible.module_utils.jcli_model import cachedResource, invalidate, modelFacts, serverConfigs
+from ansible.module_utils.jcli_sizing import GCS, jvmSizing, mergeJvmOptions, physicalMemoryMb, sizingOptions
 
-class JBossConnetionError(Exception):
-    '''raise this cannot connect to JBoss contorller'''
+def jvmAddress(data):
+    return [('host', data['host']), ('server-config', data['server_config_name']), ('jvm', data['jvm_name'])]
 
-class JBossNotFound(Exception):
-    '''raise this when cannot find JBoss command line interface binary'''
+def isJvmAlreadyCreated(data):
+    def query():
+        op = dmrOperation(jvmAddress(data), 'query')
+        response = jbossOperation(data, op)
+        return None if isNotFound(response) else response
+    result = cachedResource(data, jvmAddress(data), query)
+    return result is not None, result
 
-def jbossCommand(data, cli):
-    binaryExist = False
-    remoteExists = False
-    cmd = data['jboss_home'] + '/bin/jboss-cli.sh'
-    no_cmd = path.isfile(cmd)
-    if no_cmd is False:
-        raise JBossNotFound('JBOSS command line binary ({}) is not found.'.format(cmd))
-    controller = "--controller={}:{}".format(data['controller_host'],data['controller_port'])
-    user = "-u={}".format(data['user'])
-    password = "-p={}".format(data['password'])
-    p = subprocess.Popen(["sh", cmd, "-c", cmd, controller, user, password], stdout=subprocess.PIPE)
-    commandResult, err = p.communicate()
-    if "WFLYPRT0053" in commandResult:
-        raise JBossConnetionError('Could not connect http-remoting://{}:{}'.format(data['controller_host'],data['controller_port']))
-    return commandResult
+def jvmAttributes(data, sizing=None):
+    '''attributes given to the task, the heap of sizing for those that are not'''
+    names = [('heap-size', 'heap_size'), ('max-heap-size', 'max_heap_size'), ('permgen-size', 'permgen_size'), ('max-permgen-size', 'max_permgen_size')]
+    attributes = dict((name, (sizing or {}).get(name)) for name, key in names if (sizing or {}).get(name) is not None)
+    attributes.update((name, data[key]) for name, key in names if data[key] is not None)
+    return attributes
 
-def isJvmAlreadyCreated(data):
-    cli = "/host={}/server-config={}/jvm={}:query".format(data['host'], data['server_config_name'], data['jvm_name'])
-    result = jbossCommand(data, cli)
-    if "WFLYCTL0216" in result:
-        created = False
-    else:
-        created = True
-    return created, result
+def autoSizing(data):
+    '''heap and metaspace for the memory of the machine, shared by the server-configs of the host, this one included'''
+    configs = serverConfigs(data, data['host'])
+    servers = len(configs) + (0 if data['server_config_name'] in configs else 1)
+    return jvmSizing(data['memory_mb'] or physicalMemoryMb(), servers, data['reserve_ratio'])
 
 def jvm_present(data):
-    created, result = isJvmAlreadyCreated(data)
+    current = cachedResource(data, jvmAddress(data), lambda: jbossRead(data, dmrOperation(jvmAddress(data), 'read-resource')))
+    sizing = autoSizing(data) if data['auto_size'] else None
+    wanted = jvmAttributes(data, sizing)
     isError = False
     hasChanged = True
     meta = {}
-    result = []
-    if not created:
-        cli = "/host={}/server-config={}/jvm={}:add".format(data['host'],data['server_config_name'],data['jvm_name'])
-        res = jbossCommand(data, cli)
-        result.append(res)
-        cli = "/host={}/server-config={}/jvm={}:write-attribute(name=heap-size,value={})".format(data['host'],data['server_config_name'],data['jvm_name'],data['heap_size'])
-        res = jbossCommand(data, cli)
-        result.append(res)
-        cli = "/host={}/server-config={}/jvm={}:write-attribute(name=max-heap-size,value={})".format(data['host'],data['server_config_name'],data['jvm_name'],data['max_heap_size'])
-        res = jbossCommand(data, cli)
-        result.append(res)
-        cli = "/host={}/server-config={}/jvm={}:write-attribute(name=permgen-size,value={})".format(data['host'],data['server_config_name'],data['jvm_name'],data['permgen_size'])
-        res = jbossCommand(data, cli)
-        result.append(res)
-        cli = "/host={}/server-config={}/jvm={}:write-attribute(name=max-permgen-size,value={})".format(data['host'],data['server_config_name'],data['jvm_name'],data['max_permgen_size'])
-        res = jbossCommand(data, cli)
-        result.append(res)
-        if data['jvm_options'] is not None:
-            cli = "/host={}/server-config={}/jvm={}:add-jvm-option(jvm-option={})".format(data['host'],data['server_config_name'],data['jvm_name'],data['jvm_options'])
-            res = jbossCommand(data, cli)
-            result.append(res)
-        cli = "reload --host={}".format(data['host'])
-        res = jbossCommand(data, cli)
-        result.append(res)
-        meta = {"status": "OK", "response": res}
+    if current is None:
+        steps = [dmrOperation(jvmAddress(data), 'add')]
+        changed = sorted(wanted)
+        current = {}
+    else:
+        steps = []
+        changed = sorted(name for name, value in wanted.items() if not dmrEquals(current.get(name), value))
+    for name in changed:
+        steps.append(dmrOperation(jvmAddress(data), 'write-attribute', {"name": name, "value": wanted[name]}))
+    if sizing is not None:
+        # metaspace and the collector are -XX options, the permgen attributes are dropped
+        for name in ('permgen-size', 'max-permgen-size'):
+            if current.get(name) is not None:
+                steps.append(dmrOperation(jvmAddress(data), 'undefine-attribute', {"name": name}))
+                changed.append(name)
+        # the options of the task before the sizing ones, the same list whatever the current one, so a rerun writes nothing
+        options = mergeJvmOptions(current.get('jvm-options'), (data['jvm_options'] or []) + sizingOptions(sizing, data['gc']))
+        if options != (current.get('jvm-options') or []):
+            steps.append(dmrOperation(jvmAddress(data), 'write-attribute', {"name": "jvm-options", "value": options}))
+            changed.append('jvm-options')
+    else:
+        missing = [option for option in data['jvm_options'] or [] if option not in (current.get('jvm-options') or [])]
+        steps += [dmrOperation(jvmAddress(data), 'add-jvm-option', {"jvm-option": option}) for option in missing]
+        if missing:
+            changed.append('jvm-options')
+    if not steps:
+        hasChanged = False
+        resp = "JVM {} already configured".format(data['jvm_name'])
+        meta = {"status" : "OK", "response" : resp}
+        if sizing is not None:
+            meta['sizing'] = sizing
+    else:
+        response = jbossBatch(data, steps)
+        invalidate(data, jvmAddress(data))
+        if not isSuccess(response):
+            isError = True
+            meta = {"status": "Failed to configure JVM", "changed_attributes": changed, "response": dmrSummary(response)}
         else:
-            hasChanged = False
-            resp = "JVM {} already created".format(data['jvm_name'])
-            meta = {"status" : "OK", "response" : resp}
+            # the reload or restart it needs is left to the jcli reload handler, once for every change of the play
+            meta = {"status": "OK", "changed_attributes": changed, "response": dmrSummary(response)}
+            meta.update(processState(response))
+        if sizing is not None:
+            meta['sizing'] = sizing
     return isError, hasChanged, meta
 
 def jvm_absent(data):
@@ -82,16 +94,18 @@ def jvm_absent(data):
         resp = "JVM {} does not exist".format(data['jvm_name'])
         meta = {"status" : "OK", "response" : resp}
     else:
-        cli = "/host={}/server-config={}/jvm={}:remove".format(data['host'],data['server_config_name'],data['jvm_name'])
-        res = jbossCommand(data, cli)
-        result.append(res)
-        meta = {"status": "OK", "response": result}
+        op = dmrOperation(jvmAddress(data), 'remove')
+        response = jbossOperation(data, op)
+        invalidate(data, jvmAddress(data))
+        isError = not isSuccess(response)
+        meta = {"status": "Failed to remove JVM" if isError else "OK", "response": dmrSummary(response)}
+        meta.update(processState(response))
     return isError, hasChanged, meta
 
 def main():
 
     fields = {
-        "jboss_home" : {"required": True, "type": "str"},
+        "jboss_home" : {"required": False, "type": "str"},
         "host": {
             "required": False,
             "default": "master",
@@ -116,25 +130,49 @@ def main():
             "type": "str"
         },
         "heap_size": {
-            "required": True,
+            "required": False,
             "type": "str"
         },
         "max_heap_size": {
-            "required": True,
+            "required": False,
             "type": "str"
         },
         "permgen_size": {
-            "required": True,
+            "required": False,
             "type": "str"
         },
         "max_permgen_size": {
-            "required": True,
+            "required": False,
+            "type": "str"
+        },
+        "auto_size": {
+            "required": False,
+            "default": False,
+            "type": "bool"
+        },
+        "memory_mb": {"required": False, "type": "int"},
+        "reserve_ratio": {
+            "required": False,
+            "default": 0.25,
+            "type": "float"
+        },
+        "gc": {
+            "required": False,
+            "default": "G1",
+            "choices": GCS,
             "type": "str"
         },
         "jvm_options": {
             "required": False,
+            "type": "list"
+        },
+        "transport": {
+            "required": False,
+            "default": "cli",
+            "choices": ['cli', 'http'],
             "type": "str"
         },
+        "model": {"required": False, "type": "dict"},
         "user" : {
             "required": True,
             "type": "str"
@@ -156,19 +194,29 @@ def main():
     }
 
     try:
-        module = AnsibleModule(argument_spec=fields, supports_check_mode=False)
+        required_if = [
+            ('transport', 'cli', ['jboss_home']),
+            ('auto_size', False, ['heap_size', 'max_heap_size']),
+        ]
+        module = AnsibleModule(argument_spec=fields, required_if=required_if, supports_check_mode=False)
+        # auto_size: false is given with the permgen sizes by the playbooks written before it
+        if module.params['auto_size'] and (module.params['permgen_size'] or module.params['max_permgen_size']):
+            module.fail_json(msg="permgen_size and max_permgen_size can not be given with auto_size, it sizes the metaspace")
         is_error, has_changed, result = choice_map.get(module.params['state'])(module.params)
     except JBossNotFound as e:
-        module.fail_json(msg=str(e))
+        module.fail_json(msg=str(e), metrics=metricsReport())
     except JBossConnetionError as e:
-        module.fail_json(msg=str(e))
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossOperationFailed as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
     except Exception as e:
-        module.fail_json(msg=str(e))
+        module.fail_json(msg=str(e), metrics=metricsReport())
 
     if not is_error:
-        module.exit_json(changed=has_changed, meta=result)
+        module.exit_json(changed=has_changed, meta=result, reload_required=result.get('reload_required', False),
+                         restart_required=result.get('restart_required', False), ansible_facts=modelFacts(module.params), metrics=metricsReport())
     else:
-        module.fail_json(msg="Error creating server", meta=result)
+        module.fail_json(msg="Error configuring JVM", meta=result, metrics=metricsReport())
 
 if __name__ == '__main__':
     main()
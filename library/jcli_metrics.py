@@ -0,0 +1,88 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.jcli_timing import metricsReport
+import csv
+import json
+from ansible.module_utils.jcli import JBossConnetionError, JBossNotFound, JBossOperationFailed
+from ansible.module_utils.jcli_runtime import metricsRows, readRuntimeMetrics
+
+def writeMetrics(metrics, dest, format):
+    '''metrics as one JSON document, or as a CSV file with one row per measured value'''
+    with open(dest, 'w') as f:
+        if format == 'json':
+            json.dump(metrics, f, indent=2, sort_keys=True)
+            return
+        writer = csv.writer(f)
+        writer.writerow(['collected', 'server', 'section', 'entry', 'attribute', 'value'])
+        for row in metricsRows(metrics):
+            writer.writerow((metrics['collected'],) + row)
+
+def collect_metrics(data):
+    metrics = readRuntimeMetrics(data, data['host'], data['server_group_name'], data['servers'])
+    meta = {"status": "OK", "servers": len(metrics['servers']), "unavailable": metrics['unavailable']}
+    if data['dest']:
+        writeMetrics(metrics, data['dest'], data['format'])
+        meta['dest'] = data['dest']
+    return False, bool(data['dest']), meta, {"jcli_runtime_metrics": metrics}
+
+def main():
+    fields = {
+        "jboss_home" : {"required": False, "type": "str"},
+        "controller_host": {
+            "required": False,
+            "default": "localhost",
+            "type": "str"
+        },
+        "controller_port": {
+            "required": False,
+            "default": 9990,
+            "type": "int"
+        },
+        "host": {
+            "required": False,
+            "default": "*",
+            "type": "str"
+        },
+        "server_group_name": {"required": False, "type": "str"},
+        "servers": {"required": False, "type": "list"},
+        "dest": {"required": False, "type": "path"},
+        "format": {
+            "required": False,
+            "default": "json",
+            "choices": ['json', 'csv'],
+            "type": "str"
+        },
+        "transport": {
+            "required": False,
+            "default": "cli",
+            "choices": ['cli', 'http'],
+            "type": "str"
+        },
+        "user" : {
+            "required": True,
+            "type": "str"
+        },
+        "password" : {
+            "required": True,
+            "type": "str"
+        },
+    }
+
+    try:
+        module = AnsibleModule(argument_spec=fields, required_if=[('transport', 'cli', ['jboss_home'])], supports_check_mode=True)
+        is_error, has_changed, result, facts = collect_metrics(dict(module.params, dest=None if module.check_mode else module.params['dest']))
+    except JBossNotFound as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossConnetionError as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossOperationFailed as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except Exception as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+
+    module.exit_json(changed=has_changed, meta=result, ansible_facts=facts, metrics=metricsReport())
+
+if __name__ == '__main__':
+    main()
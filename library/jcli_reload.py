@@ -0,0 +1,136 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.jcli_timing import metricsReport
+import time
+from ansible.module_utils.jcli import jbossOperation, JBossConnetionError, JBossNotFound, JBossOperationFailed, JBossTimeout
+from ansible.module_utils.jcli_dmr import dmrOperation, dmrSummary, isSuccess
+from ansible.module_utils.jcli_parallel import runParallelStates
+from ansible.module_utils.jcli_wait import blockingOperation, readHostStates, readServerReadiness, remaining, waitForHost, waitForServers
+
+# server-state of a running server whose configuration changed, with the operation applying it
+PENDING = {"reload-required": 'reload', "restart-required": 'restart'}
+
+# host-state of a host controller whose configuration changed, with the operation applying it: a reload does not
+# clear restart-required, the host controller process has to be restarted
+HOST_PENDING = {"reload-required": ('reload', None), "restart-required": ('shutdown', {"restart": True})}
+
+def reloadHost(data, host, state):
+    '''reload, or restart, of a host controller; always waits, the servers are read after it'''
+    started = time.time()
+    operation, params = HOST_PENDING[state]
+    response = jbossOperation(data, dmrOperation([('host', host)], operation, params))
+    if not isSuccess(response):
+        return True, True, {"status": "Failed to {} host".format('reload' if operation == 'reload' else 'restart'), "response": dmrSummary(response)}
+    state, checks = waitForHost(data, host, data['timeout'])
+    return False, True, {"status": "OK", "wait": {"host_state": state, "checks": checks, "seconds": round(time.time() - started, 3)}}
+
+def applyServer(data, server, operation, deadline):
+    host, name = server.split('/', 1)
+    response = blockingOperation(data, [('host', host), ('server-config', name)], operation, deadline)
+    isError = not isSuccess(response)
+    return isError, True, {"status": "Failed to {} server".format(operation) if isError else "OK", "operation": operation, "response": dmrSummary(response)}
+
+def reload_pending(data):
+    '''one reload of every host controller and one reload or restart of every server the changes of the play left pending,
+    found in the process states of the domain so that any number of notifications end in a single pass'''
+    meta = {"status": "OK", "hosts": [], "servers": []}
+    isError = False
+    hasChanged = False
+    hostStates = readHostStates(data, data['host'])
+    hosts = sorted(name for name, state in hostStates.items() if state in HOST_PENDING)
+    if hosts:
+        # one host after the other, the domain controller may be one of them
+        hostsError, hostsChanged, hostsMeta = runParallelStates(lambda host: reloadHost(data, host, hostStates[host]), hosts, 1, 'host')
+        isError, hasChanged = hostsError, hostsChanged
+        meta['hosts'] = hostsMeta['hosts']
+    if isError:
+        meta['status'] = "Failed"
+        return isError, hasChanged, meta
+    pending = dict((name, PENDING[str(server['server-state']).lower()]) for name, server in readServerReadiness(data, data['host']).items()
+                   if str(server['server-state']).lower() in PENDING)
+    if pending:
+        # the servers are reloaded or restarted, and awaited, within one timeout
+        started = time.time()
+        deadline = started + data['timeout']
+        serversError, serversChanged, serversMeta = runParallelStates(lambda server: applyServer(data, server, pending[server], deadline),
+                                                                      sorted(pending), data['workers'], 'server')
+        isError, hasChanged = isError or serversError, hasChanged or serversChanged
+        meta['servers'] = serversMeta['servers']
+        if data['wait'] and not serversError:
+            servers, checks = waitForServers(data, 'started', remaining(deadline), data['host'], servers=sorted(pending))
+            meta['wait'] = {"checks": checks, "seconds": round(time.time() - started, 3)}
+    meta['status'] = "Failed" if isError else "OK"
+    return isError, hasChanged, meta
+
+def main():
+    fields = {
+        "jboss_home" : {"required": False, "type": "str"},
+        "controller_host": {
+            "required": False,
+            "default": "localhost",
+            "type": "str"
+        },
+        "controller_port": {
+            "required": False,
+            "default": 9990,
+            "type": "int"
+        },
+        "host": {
+            "required": False,
+            "default": "*",
+            "type": "str"
+        },
+        "workers": {
+            "required": False,
+            "default": 10,
+            "type": "int"
+        },
+        "transport": {
+            "required": False,
+            "default": "cli",
+            "choices": ['cli', 'http'],
+            "type": "str"
+        },
+        "wait": {
+            "required": False,
+            "default": True,
+            "type": "bool"
+        },
+        "timeout": {
+            "required": False,
+            "default": 300,
+            "type": "int"
+        },
+        "user" : {
+            "required": True,
+            "type": "str"
+        },
+        "password" : {
+            "required": True,
+            "type": "str"
+        },
+    }
+
+    try:
+        module = AnsibleModule(argument_spec=fields, required_if=[('transport', 'cli', ['jboss_home'])], supports_check_mode=False)
+        is_error, has_changed, result = reload_pending(module.params)
+    except JBossNotFound as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossConnetionError as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossTimeout as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossOperationFailed as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except Exception as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+
+    if not is_error:
+        module.exit_json(changed=has_changed, meta=result, metrics=metricsReport())
+    else:
+        module.fail_json(msg="Error applying the pending reloads and restarts", meta=result, metrics=metricsReport())
+
+if __name__ == '__main__':
+    main()
@@ -2,40 +2,46 @@
 # -*- coding: utf-8 -*-
 
 from ansible.module_utils.basic import AnsibleModule
-import subprocess
-from os import path
+from ansible.module_utils.jcli_timing import metricsReport
 import time
+from ansible.module_utils.jcli import jbossBatch, jbossOperation, JBossConnetionError, JBossNotFound, JBossTimeout
+from ansible.module_utils.jcli_dmr import dmrOperation, dmrSummary, isNotFound, isSuccess
+from ansible.module_utils.jcli_wait import blockingOperation, remaining, waitForServerStatus, STOPPED
+from ansible.module_utils.jcli_parallel import runParallelStates
+from ansible.module_utils.jcli_model import allocatePortOffsets, cachedResource, invalidate, modelFacts, serverConfigs
 
-class JBossConnetionError(Exception):
-    '''raise this cannot connect to JBoss contorller'''
-
-class JBossNotFound(Exception):
-    '''raise this when cannot find JBoss command line interface binary'''
-
-def jbossCommand(data, cli):
-    binaryExist = False
-    remoteExists = False
-    cmd = data['jboss_home'] + '/bin/jboss-cli.sh'
-    no_cmd = path.isfile(cmd)
-    if no_cmd is False:
-        raise JBossNotFound('JBOSS command line binary ({}) is not found.'.format(cmd))
-    controller = "--controller={}:{}".format(data['controller_host'],data['controller_port'])
-    user = "-u={}".format(data['user'])
-    password = "-p={}".format(data['password'])
-    p = subprocess.Popen(["sh", cmd, "-c", cmd, controller, user, password], stdout=subprocess.PIPE)
-    commandResult, err = p.communicate()
-    if "WFLYPRT0053" in commandResult:
-        raise JBossConnetionError('Could not connect http-remoting://{}:{}'.format(data['controller_host'],data['controller_port']))
-    return commandResult
+def serverConfigAddress(data):
+    return [('host', data['host']), ('server-config', data['server_config_name'])]
+
+def changeServerState(data, operation, statuses):
+    '''start, stop or restart, waits for statuses when blocking, both within timeout; returns whether the operation failed and the meta'''
+    started = time.time()
+    deadline = started + data['timeout']
+    response = blockingOperation(data, serverConfigAddress(data), operation, deadline)
+    if not isSuccess(response):
+        return True, {"status": "Failed to {} server".format(operation), "response": dmrSummary(response)}
+    meta = {"status": "OK", "response": dmrSummary(response)}
+    if data['wait']:
+        status, checks = waitForServerStatus(data, data['host'], data['server_config_name'], statuses, remaining(deadline))
+        meta['wait'] = {"server_status": status, "checks": checks, "seconds": round(time.time() - started, 3)}
+    return False, meta
 
 def isServerAlreadyCreated(data):
-    cli = "/host={}/server={}:query".format(data['host'], data['server_config_name'])
-    result = jbossCommand(data, cli)
-    if "WFLYCTL0216" in result:
-        created = False
-    else:
-        created = True
-    return created, result
+    def query():
+        op = dmrOperation([('host', data['host']), ('server', data['server_config_name'])], 'query')
+        response = jbossOperation(data, op)
+        return None if isNotFound(response) else response
+    result = cachedResource(data, serverConfigAddress(data), query)
+    return result is not None, result
+
+def addServerSteps(data, offset):
+    '''add of the server-config and, when jvm_name is given, of its JVM'''
+    op = dmrOperation(serverConfigAddress(data), 'add', {"group": data['server_group_name'], "socket-binding-port-offset": offset, "socket-binding-group": data['server_group_socket']})
+    steps = [op]
+    if data['jvm_name']:
+        jvm = dict((name, data[key]) for name, key in [('heap-size', 'heap_size'), ('max-heap-size', 'max_heap_size'), ('jvm-options', 'jvm_options')] if data[key])
+        steps.append(dmrOperation(serverConfigAddress(data) + [('jvm', data['jvm_name'])], 'add', jvm))
+    return steps
 
 def server_present(data):
     created, result = isServerAlreadyCreated(data)
@@ -43,9 +49,10 @@ def server_present(data):
     hasChanged = True
     meta = {}
     if not created:
-        cli = "/host={}/server-config={}:add(group={},socket-binding-port-offset={},socket-binding-group={})".format(data['host'],data['server_config_name'],data['server_group_name'],data['server_socket_binding_port_offset'],data['server_group_socket'])
-        res = jbossCommand(data, cli)
-        meta = {"status": "OK", "response": res}
+        response = jbossBatch(data, addServerSteps(data, data['server_socket_binding_port_offset']))
+        invalidate(data, serverConfigAddress(data))
+        isError = not isSuccess(response)
+        meta = {"status": "Failed to add server" if isError else "OK", "response": dmrSummary(response)}
     else:
         hasChanged = False
         resp = "Server {} already created".format(data['server_config_name'])
@@ -62,17 +69,15 @@ def server_absent(data):
         resp = "Server {} does not exist".format(data['server_config_name'])
         meta = {"status" : "OK", "response" : resp}
     else:
-        cli = "/host={}/server-config={}:stop".format(data['host'],data['server_config_name'])
-        res = jbossCommand(data, cli)
-        res = str(res)
-        while not "STOPPED" in res:
-            time.sleep(0.5)
-            cli = "/host={}/server-config={}:stop".format(data['host'],data['server_config_name'])
-            res = jbossCommand(data, cli)
-            res = str(res,'utf-8')
-        cli = "/host={}/server-config={}:remove".format(data['host'],data['server_config_name'])
-        res = jbossCommand(data, cli)
-        meta = {"status": "OK", "response": res}
+        # a running server can not be removed, it always waits for the stop
+        isError, meta = changeServerState(dict(data, wait=True), 'stop', STOPPED)
+        if not isError:
+            op = dmrOperation(serverConfigAddress(data), 'remove')
+            response = jbossOperation(data, op)
+            invalidate(data, serverConfigAddress(data))
+            isError = not isSuccess(response)
+            meta['status'] = "Failed to remove server" if isError else "OK"
+            meta['response'] = dmrSummary(response)
     return isError, hasChanged, meta
 
 def server_start(data):
@@ -81,9 +86,7 @@ def server_start(data):
     hasChanged = True
     meta = {}
     if created:
-        cli = "/host={}/server-config={}:start".format(data['host'],data['server_config_name'])
-        res = jbossCommand(data, cli)
-        meta = {"status": "OK", "response": res}
+        isError, meta = changeServerState(data, 'start', ['STARTED'])
     else:
         hasChanged = False
         resp = "Server {} does not exist".format(data['server_config_name'])
@@ -96,18 +99,74 @@ def server_stop(data):
     hasChanged = True
     meta = {}
     if created:
-        cli = "/host={}/server-config={}:stop".format(data['host'],data['server_config_name'])
-        res = jbossCommand(data, cli)
-        meta = {"status": "OK", "response": res}
+        isError, meta = changeServerState(data, 'stop', STOPPED)
     else:
         hasChanged = False
         resp = "Server {} does not exist".format(data['server_config_name'])
         meta = {"status" : "OK", "response" : resp}
     return isError, hasChanged, meta
 
+def server_restart(data):
+    created, result = isServerAlreadyCreated(data)
+    isError = False
+    hasChanged = True
+    meta = {}
+    if created:
+        isError, meta = changeServerState(data, 'restart', ['STARTED'])
+    else:
+        hasChanged = False
+        resp = "Server {} does not exist".format(data['server_config_name'])
+        meta = {"status" : "OK", "response" : resp}
+    return isError, hasChanged, meta
+
+def servers_present(data):
+    '''every missing server-config of servers added in one composite, with port offsets free on their host'''
+    wanted = {}
+    for server in data['servers']:
+        serverConfig = serverData(data, server)
+        wanted.setdefault(serverConfig['host'], []).append(serverConfig)
+    steps = []
+    added = []
+    existing = []
+    offsets = {}
+    for host, hostServers in sorted(wanted.items()):
+        current = serverConfigs(data, host)
+        missing = [serverConfig for serverConfig in hostServers if serverConfig['server_config_name'] not in current]
+        existing += ['{}/{}'.format(host, serverConfig['server_config_name']) for serverConfig in hostServers if serverConfig not in missing]
+        used = [config.get('socket-binding-port-offset') or 0 for config in current.values()]
+        allocated = allocatePortOffsets(used, len(missing), data['server_socket_binding_port_offset'], data['port_offset_step'])
+        for serverConfig, offset in zip(missing, allocated):
+            steps += addServerSteps(serverConfig, offset)
+            added.append(serverConfig)
+            offsets['{}/{}'.format(host, serverConfig['server_config_name'])] = offset
+    if not steps:
+        return False, False, {"status": "OK", "created": [], "existing": existing}
+    response = jbossBatch(data, steps)
+    for serverConfig in added:
+        invalidate(data, serverConfigAddress(serverConfig))
+    isError = not isSuccess(response)
+    meta = {"status": "Failed to add servers" if isError else "OK", "created": sorted(offsets), "existing": existing,
+            "port_offsets": offsets, "response": dmrSummary(response)}
+    return isError, True, meta
+
+def serverNames(data):
+    '''servers, or count server-configs named after server_config_name'''
+    if data['count'] is None:
+        return data['servers']
+    return ['{}-{}'.format(data['server_config_name'], i) for i in range(1, data['count'] + 1)]
+
+def serverData(data, server):
+    '''module parameters for one entry of servers, given as host/name or as a name on host'''
+    host, _, name = server.rpartition('/')
+    return dict(data, host=host or data['host'], server_config_name=name)
+
+def each_server(action, data):
+    '''action for every entry of servers, at most workers of them at the same time'''
+    return runParallelStates(lambda server: action(serverData(data, server)), data['servers'], data['workers'], 'server')
+
 def main():
     fields = {
-        "jboss_home" : {"required": True, "type": "str"},
+        "jboss_home" : {"required": False, "type": "str"},
         "host": {
             "required": False,
             "default": "master",
@@ -124,23 +183,62 @@ def main():
             "type": "int"
         },
         "server_group_name": {
-            "required": True,
+            "required": False,
             "type": "str"
         },
         "server_config_name": {
-            "required": True,
+            "required": False,
             "type": "str"
         },
+        "servers": {
+            "required": False,
+            "type": "list"
+        },
+        "count": {
+            "required": False,
+            "type": "int"
+        },
+        "workers": {
+            "required": False,
+            "default": 10,
+            "type": "int"
+        },
         "server_socket_binding_port_offset": {
             "required": False,
             "default": 0,
             "type": "int"
         },
+        "port_offset_step": {
+            "required": False,
+            "default": 100,
+            "type": "int"
+        },
+        "jvm_name": {"required": False, "type": "str"},
+        "heap_size": {"required": False, "type": "str"},
+        "max_heap_size": {"required": False, "type": "str"},
+        "jvm_options": {"required": False, "type": "list"},
         "server_group_socket": {
             "required": False,
             "default": "standard-sockets",
             "type": "str"
         },
+        "transport": {
+            "required": False,
+            "default": "cli",
+            "choices": ['cli', 'http'],
+            "type": "str"
+        },
+        "wait": {
+            "required": False,
+            "default": False,
+            "type": "bool"
+        },
+        "timeout": {
+            "required": False,
+            "default": 300,
+            "type": "int"
+        },
+        "model": {"required": False, "type": "dict"},
         "user" : {
             "required": True,
             "type": "str"
@@ -151,7 +249,7 @@ def main():
         },
         "state": {
             "default": "present",
-            "choices": ['present', 'absent', 'start', 'stop'],
+            "choices": ['present', 'absent', 'start', 'stop', 'restart'],
             "type": 'str'
         },
     }
@@ -161,22 +259,38 @@ def main():
         "absent": server_absent,
         "start": server_start,
         "stop": server_stop,
+        "restart": server_restart,
     }
 
+    required_if = [
+        ('transport', 'cli', ['jboss_home']),
+        ('state', 'present', ['server_group_name']),
+    ]
+
     try:
-        module = AnsibleModule(argument_spec=fields, supports_check_mode=False)
-        is_error, has_changed, result = choice_map.get(module.params['state'])(module.params)
+        module = AnsibleModule(argument_spec=fields, required_if=required_if, required_one_of=[['server_config_name', 'servers']],
+                               mutually_exclusive=[['server_config_name', 'servers'], ['count', 'servers']], supports_check_mode=False)
+        if module.params['count'] is not None or module.params['servers']:
+            module.params['servers'] = serverNames(module.params)
+            if module.params['state'] == 'present':
+                is_error, has_changed, result = servers_present(module.params)
+            else:
+                is_error, has_changed, result = each_server(choice_map.get(module.params['state']), module.params)
+        else:
+            is_error, has_changed, result = choice_map.get(module.params['state'])(module.params)
     except JBossNotFound as e:
-        module.fail_json(msg=str(e))
+        module.fail_json(msg=str(e), metrics=metricsReport())
     except JBossConnetionError as e:
-        module.fail_json(msg=str(e))
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossTimeout as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
     except Exception as e:
-        module.fail_json(msg=str(e))
+        module.fail_json(msg=str(e), metrics=metricsReport())
 
     if not is_error:
-        module.exit_json(changed=has_changed, meta=result)
+        module.exit_json(changed=has_changed, meta=result, ansible_facts=modelFacts(module.params), metrics=metricsReport())
     else:
-        module.fail_json(msg="Error creating server", meta=result)
+        module.fail_json(msg="Error creating server", meta=result, metrics=metricsReport())
 
 if __name__ == '__main__':
     main()
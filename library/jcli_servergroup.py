@@ -2,39 +2,37 @@
 # -*- coding: utf-8 -*-
 
 from ansible.module_utils.basic import AnsibleModule
-import subprocess
-from os import path
+from ansible.module_utils.jcli_timing import metricsReport
+from ansible.module_utils.jcli import jbossOperation, JBossConnetionError, JBossNotFound, JBossTimeout
+from ansible.module_utils.jcli_dmr import dmrOperation, dmrSummary, isNotFound, isSuccess
+from ansible.module_utils.jcli_wait import blockingOperation, remaining, waitForServers
+from ansible.module_utils.jcli_parallel import runParallelStates
+from ansible.module_utils.jcli_model import cachedResource, invalidate, modelFacts
+import time
 
-class JBossConnetionError(Exception):
-    '''raise this cannot connect to JBoss contorller'''
+def changeServerGroupState(data, operation, state):
+    '''start-servers, stop-servers or restart-servers, waits for every server of the group to be started or stopped when blocking,
+    both within timeout
 
-class JBossNotFound(Exception):
-    '''raise this when cannot find JBoss command line interface binary'''
-
-def jbossCommand(data, cli):
-    binaryExist = False
-    remoteExists = False
-    cmd = data['jboss_home'] + '/bin/jboss-cli.sh'
-    no_cmd = path.isfile(cmd)
-    if no_cmd is False:
-        raise JBossNotFound('JBOSS command line binary ({}) is not found.'.format(cmd))
-    controller = "--controller={}:{}".format(data['controller_host'],data['controller_port'])
-    user = "-u={}".format(data['user'])
-    password = "-p={}".format(data['password'])
-    p = subprocess.Popen(["sh", cmd, "-c", cmd, controller, user, password], stdout=subprocess.PIPE)
-    commandResult, err = p.communicate()
-    if "WFLYPRT0053" in commandResult:
-        raise JBossConnetionError('Could not connect http-remoting://{}:{}'.format(data['controller_host'],data['controller_port']))
-    return commandResult
+    returns whether the operation failed and the meta'''
+    started = time.time()
+    deadline = started + data['timeout']
+    response = blockingOperation(data, [('server-group', data['server_group_name'])], operation, deadline)
+    if not isSuccess(response):
+        return True, {"status": "Failed to {}".format(operation), "response": dmrSummary(response)}
+    meta = {"status": "OK", "response": dmrSummary(response)}
+    if data['wait']:
+        servers, checks = waitForServers(data, state, remaining(deadline), group=data['server_group_name'])
+        meta['wait'] = {"checks": checks, "seconds": round(time.time() - started, 3)}
+    return False, meta
 
 def isServerGroupAlreadyCreated(data):
-    cli = "/server-group={}:query".format(data['server_group_name'])
-    result = jbossCommand(data, cli)
-    if "WFLYCTL0216" in result:
-        created = False
-    else:
-        created = True
-    return created, result
+    def query():
+        op = dmrOperation([('server-group', data['server_group_name'])], 'query')
+        response = jbossOperation(data, op)
+        return None if isNotFound(response) else response
+    result = cachedResource(data, [('server-group', data['server_group_name'])], query)
+    return result is not None, result
 
 def server_group_present(data):
     created, result = isServerGroupAlreadyCreated(data)
@@ -42,12 +40,14 @@ def server_group_present(data):
     hasChanged = True
     meta = {}
     if not created:
-        cli = "/server-group={}:add(profile={}, socket-binding-group={})".format(data['server_group_name'],data['server_group_profile'],data['socket_binding_group'])
-        res = jbossCommand(data, cli)
-        meta = {"status": "OK", "response": res}
+        op = dmrOperation([('server-group', data['server_group_name'])], 'add', {"profile": data['server_group_profile'], "socket-binding-group": data['socket_binding_group']})
+        response = jbossOperation(data, op)
+        invalidate(data, [('server-group', data['server_group_name'])])
+        isError = not isSuccess(response)
+        meta = {"status": "Failed to add server group" if isError else "OK", "response": dmrSummary(response)}
     else:
         hasChanged = False
-        resp = "Server group {} already created ({})".format(data['server_group_name'], result)
+        resp = "Server group {} already created".format(data['server_group_name'])
         meta = {"status" : "OK", "response" : resp}
     return isError, hasChanged, meta
 
@@ -61,9 +61,11 @@ def server_group_absent(data):
         resp = "Server group {} does not exist".format(data['server_group_name'])
         meta = {"status" : "OK", "response" : resp}
     else:
-        cli = "/server-group={}:remove".format(data['server_group_name'])
-        res = jbossCommand(data, cli)
-        meta = {"status": "OK", "response": res}
+        op = dmrOperation([('server-group', data['server_group_name'])], 'remove')
+        response = jbossOperation(data, op)
+        invalidate(data, [('server-group', data['server_group_name'])])
+        isError = not isSuccess(response)
+        meta = {"status": "Failed to remove server group" if isError else "OK", "response": dmrSummary(response)}
     return isError, hasChanged, meta
 
 def server_group_start(data):
@@ -72,9 +74,7 @@ def server_group_start(data):
     hasChanged = True
     meta = {}
     if created:
-        cli = "/server-group={}:start-servers".format(data['server_group_name'])
-        res = jbossCommand(data, cli)
-        meta = {"status": "OK", "response": res}
+        isError, meta = changeServerGroupState(data, 'start-servers', 'started')
     else:
         hasChanged = False
         resp = "Server group {} does not exist".format(data['server_group_name'])
@@ -87,18 +87,33 @@ def server_group_stop(data):
     hasChanged = True
     meta = {}
     if created:
-        cli = "/server-group={}:stop-servers".format(data['server_group_name'])
-        res = jbossCommand(data, cli)
-        meta = {"status": "OK", "response": res}
+        isError, meta = changeServerGroupState(data, 'stop-servers', 'stopped')
+    else:
+        hasChanged = False
+        resp = "Server group {} does not exist".format(data['server_group_name'])
+        meta = {"status" : "OK", "response" : resp}
+    return isError, hasChanged, meta
+
+def server_group_restart(data):
+    created, result = isServerGroupAlreadyCreated(data)
+    isError = False
+    hasChanged = True
+    meta = {}
+    if created:
+        isError, meta = changeServerGroupState(data, 'restart-servers', 'started')
     else:
         hasChanged = False
         resp = "Server group {} does not exist".format(data['server_group_name'])
         meta = {"status" : "OK", "response" : resp}
     return isError, hasChanged, meta
 
+def each_server_group(action, data):
+    '''action for every entry of server_groups, at most workers of them at the same time'''
+    return runParallelStates(lambda group: action(dict(data, server_group_name=group)), data['server_groups'], data['workers'], 'server_group')
+
 def main():
     fields = {
-        "jboss_home" : {"required": True, "type": "str"},
+        "jboss_home" : {"required": False, "type": "str"},
         "controller_host": {
             "required": False,
             "default": "localhost",
@@ -109,7 +124,13 @@ def main():
             "default": 9990,
             "type": "int"
         },
-        "server_group_name": {"required": True, "type": "str"},
+        "server_group_name": {"required": False, "type": "str"},
+        "server_groups": {"required": False, "type": "list"},
+        "workers": {
+            "required": False,
+            "default": 10,
+            "type": "int"
+        },
         "server_group_profile": {
             "required": False,
             "default": "default",
@@ -120,6 +141,23 @@ def main():
             "default": "standard-sockets",
             "type": "str"
         },
+        "transport": {
+            "required": False,
+            "default": "cli",
+            "choices": ['cli', 'http'],
+            "type": "str"
+        },
+        "wait": {
+            "required": False,
+            "default": False,
+            "type": "bool"
+        },
+        "timeout": {
+            "required": False,
+            "default": 300,
+            "type": "int"
+        },
+        "model": {"required": False, "type": "dict"},
         "user" : {
             "required": True,
             "type": "str"
@@ -130,7 +168,7 @@ def main():
         },
         "state": {
             "default": "present",
-            "choices": ['present', 'absent', 'start', 'stop'],
+            "choices": ['present', 'absent', 'start', 'stop', 'restart'],
             "type": 'str'
         },
     }
@@ -139,23 +177,31 @@ def main():
         "present": server_group_present,
         "absent": server_group_absent,
         "start": server_group_start,
-        "stop": server_group_stop
+        "stop": server_group_stop,
+        "restart": server_group_restart,
     }
 
     try:
-        module = AnsibleModule(argument_spec=fields, supports_check_mode=False)
-        is_error, has_changed, result = choice_map.get(module.params['state'])(module.params)
+        module = AnsibleModule(argument_spec=fields, required_if=[('transport', 'cli', ['jboss_home'])],
+                               required_one_of=[['server_group_name', 'server_groups']],
+                               mutually_exclusive=[['server_group_name', 'server_groups']], supports_check_mode=False)
+        if module.params['server_groups']:
+            is_error, has_changed, result = each_server_group(choice_map.get(module.params['state']), module.params)
+        else:
+            is_error, has_changed, result = choice_map.get(module.params['state'])(module.params)
     except JBossNotFound as e:
-        module.fail_json(msg=str(e))
+        module.fail_json(msg=str(e), metrics=metricsReport())
     except JBossConnetionError as e:
-        module.fail_json(msg=str(e))
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossTimeout as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
     except Exception as e:
-        module.fail_json(msg=str(e))
+        module.fail_json(msg=str(e), metrics=metricsReport())
 
     if not is_error:
-        module.exit_json(changed=has_changed, meta=result)
+        module.exit_json(changed=has_changed, meta=result, ansible_facts=modelFacts(module.params), metrics=metricsReport())
     else:
-        module.fail_json(msg="Error creating server group", meta=result)
+        module.fail_json(msg="Error creating server group", meta=result, metrics=metricsReport())
 
 if __name__ == '__main__':
     main()
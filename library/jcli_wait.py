@@ -0,0 +1,88 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.jcli_timing import metricsReport
+import time
+from ansible.module_utils.jcli import JBossConnetionError, JBossNotFound, JBossOperationFailed, JBossTimeout
+from ansible.module_utils.jcli_wait import waitForServers
+
+def wait_for_servers(data):
+    started = time.time()
+    isError = False
+    hasChanged = False
+    try:
+        servers, checks = waitForServers(data, data['state'], data['timeout'], data['host'], data['server_group_name'], data['servers'])
+        meta = {"status": "OK", "servers": servers}
+    except JBossTimeout as e:
+        isError = True
+        checks = None
+        meta = {"status": str(e), "lagging": e.state}
+    meta['wait'] = {"checks": checks, "seconds": round(time.time() - started, 3)}
+    return isError, hasChanged, meta
+
+def main():
+    fields = {
+        "jboss_home" : {"required": False, "type": "str"},
+        "controller_host": {
+            "required": False,
+            "default": "localhost",
+            "type": "str"
+        },
+        "controller_port": {
+            "required": False,
+            "default": 9990,
+            "type": "int"
+        },
+        "host": {
+            "required": False,
+            "default": "*",
+            "type": "str"
+        },
+        "server_group_name": {"required": False, "type": "str"},
+        "servers": {"required": False, "type": "list"},
+        "transport": {
+            "required": False,
+            "default": "cli",
+            "choices": ['cli', 'http'],
+            "type": "str"
+        },
+        "timeout": {
+            "required": False,
+            "default": 300,
+            "type": "int"
+        },
+        "user" : {
+            "required": True,
+            "type": "str"
+        },
+        "password" : {
+            "required": True,
+            "type": "str"
+        },
+        "state": {
+            "default": "started",
+            "choices": ['started', 'stopped'],
+            "type": 'str'
+        },
+    }
+
+    try:
+        module = AnsibleModule(argument_spec=fields, required_if=[('transport', 'cli', ['jboss_home'])], supports_check_mode=True)
+        is_error, has_changed, result = wait_for_servers(module.params)
+    except JBossNotFound as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossConnetionError as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossOperationFailed as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except Exception as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+
+    if not is_error:
+        module.exit_json(changed=has_changed, meta=result, metrics=metricsReport())
+    else:
+        module.fail_json(msg="Servers not {} in time".format(module.params['state']), meta=result, metrics=metricsReport())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+
+from ansible.module_utils.basic import AnsibleModule
+from ansible.module_utils.jcli_timing import metricsReport
+from ansible.module_utils.jcli import jbossBatch, jbossOperation, JBossConnetionError, JBossNotFound, JBossOperationFailed
+from ansible.module_utils.jcli_dmr import dmrComposite, dmrOperation, dmrPath, dmrSummary, failureDescription, isNotFound, isSuccess, processState, toCli
+from ansible.module_utils.jcli_model import modelSet
+from ansible.module_utils.jcli_reconcile import dmrAttributes, reconcile
+from ansible.module_utils.jcli_sizing import cpuCount, webPreset
+
+def workerAddress(data):
+    return [('profile', data['profile']), ('subsystem', 'io'), ('worker', data['worker'])]
+
+def bufferPoolAddress(data):
+    return [('profile', data['profile']), ('subsystem', 'io'), ('buffer-pool', data['buffer_pool'])]
+
+def listenerAddress(data):
+    return [('profile', data['profile']), ('subsystem', 'undertow'), ('server', data['server']), (data['listener_type'] + '-listener', data['listener'])]
+
+# tuned resources with the module parameters of their attributes
+RESOURCES = [
+    (workerAddress, ['io_threads', 'task_max_threads', 'task_keepalive', 'stack_size']),
+    (bufferPoolAddress, ['buffer_size', 'buffers_per_slice', 'direct_buffers']),
+    (listenerAddress, ['max_connections', 'max_post_size', 'no_request_timeout', 'request_parse_timeout', 'tcp_backlog']),
+]
+
+def wantedValues(data):
+    '''parameters of the task over the values of the cpu preset'''
+    values = {}
+    if data['preset'] == 'cpu':
+        values.update(webPreset(data['cpus'] or cpuCount()))
+    for address, names in RESOURCES:
+        values.update((name, data[name]) for name in names if data[name] is not None)
+    return values
+
+def readResources(data, addresses):
+    '''attributes of every address, read in one composite'''
+    steps = [dmrOperation(address, 'read-resource') for address in addresses]
+    response = jbossOperation(data, dmrComposite(steps))
+    results = response.get('result') or {}
+    current = []
+    for i, address in enumerate(addresses):
+        step = results.get('step-{}'.format(i + 1)) or {}
+        if isNotFound(step):
+            raise JBossOperationFailed('{} does not exist'.format(dmrPath(address)))
+        if not isSuccess(step):
+            raise JBossOperationFailed('Could not read {}: {}'.format(dmrPath(address), failureDescription(step) or failureDescription(response)))
+        current.append(step.get('result') or {})
+    return current
+
+def web_tuning_present(data):
+    values = wantedValues(data)
+    tuned = [(address(data), dmrAttributes(values, names)) for address, names in RESOURCES]
+    tuned = [(address, wanted) for address, wanted in tuned if wanted]
+    if not tuned:
+        return False, False, {"status": "OK", "operations": [], "diff": {"before": {}, "after": {}}}
+    model = {}
+    for (address, wanted), attributes in zip(tuned, readResources(data, [address for address, wanted in tuned])):
+        modelSet(model, address, attributes)
+    steps = []
+    diff = {"before": {}, "after": {}}
+    for address, wanted in tuned:
+        reconcile(model, address, wanted, 'present', steps, diff)
+    isError = False
+    hasChanged = len(steps) > 0
+    meta = {"status": "OK", "operations": [toCli(step) for step in steps], "diff": diff}
+    if data['preset'] == 'cpu':
+        meta['preset'] = webPreset(data['cpus'] or cpuCount())
+    if hasChanged and not data['check_mode']:
+        response = jbossBatch(data, steps)
+        meta['response'] = dmrSummary(response)
+        meta.update(processState(response))
+        if not isSuccess(response):
+            isError = True
+            meta['status'] = "Failed to tune the web subsystems"
+    return isError, hasChanged, meta
+
+def main():
+    fields = {
+        "jboss_home" : {"required": False, "type": "str"},
+        "controller_host": {
+            "required": False,
+            "default": "localhost",
+            "type": "str"
+        },
+        "controller_port": {
+            "required": False,
+            "default": 9990,
+            "type": "int"
+        },
+        "profile": {
+            "required": True,
+            "type": "str"
+        },
+        "preset": {
+            "required": False,
+            "choices": ['cpu'],
+            "type": "str"
+        },
+        "cpus": {"required": False, "type": "int"},
+        "worker": {
+            "required": False,
+            "default": "default",
+            "type": "str"
+        },
+        "io_threads": {"required": False, "type": "int"},
+        "task_max_threads": {"required": False, "type": "int"},
+        "task_keepalive": {"required": False, "type": "int"},
+        "stack_size": {"required": False, "type": "int"},
+        "buffer_pool": {
+            "required": False,
+            "default": "default",
+            "type": "str"
+        },
+        "buffer_size": {"required": False, "type": "int"},
+        "buffers_per_slice": {"required": False, "type": "int"},
+        "direct_buffers": {"required": False, "type": "bool"},
+        "server": {
+            "required": False,
+            "default": "default-server",
+            "type": "str"
+        },
+        "listener": {
+            "required": False,
+            "default": "default",
+            "type": "str"
+        },
+        "listener_type": {
+            "required": False,
+            "default": "http",
+            "choices": ['http', 'https', 'ajp'],
+            "type": "str"
+        },
+        "max_connections": {"required": False, "type": "int"},
+        "max_post_size": {"required": False, "type": "int"},
+        "no_request_timeout": {"required": False, "type": "int"},
+        "request_parse_timeout": {"required": False, "type": "int"},
+        "tcp_backlog": {"required": False, "type": "int"},
+        "transport": {
+            "required": False,
+            "default": "cli",
+            "choices": ['cli', 'http'],
+            "type": "str"
+        },
+        "user" : {
+            "required": True,
+            "type": "str"
+        },
+        "password" : {
+            "required": True,
+            "type": "str"
+        },
+        "state": {
+            "default": "present",
+            "choices": ['present'],
+            "type": 'str'
+        },
+    }
+
+    choice_map = {
+        "present": web_tuning_present,
+    }
+
+    try:
+        module = AnsibleModule(argument_spec=fields, required_if=[('transport', 'cli', ['jboss_home'])], supports_check_mode=True)
+        data = dict(module.params, check_mode=module.check_mode)
+        is_error, has_changed, result = choice_map.get(module.params['state'])(data)
+    except JBossNotFound as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossConnetionError as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except JBossOperationFailed as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+    except Exception as e:
+        module.fail_json(msg=str(e), metrics=metricsReport())
+
+    diff = result.pop('diff')
+    if not is_error:
+        module.exit_json(changed=has_changed, meta=result, diff=diff, reload_required=result.get('reload_required', False),
+                         restart_required=result.get('restart_required', False), metrics=metricsReport())
+    else:
+        module.fail_json(msg="Error tuning the web subsystems", meta=result, diff=diff, metrics=metricsReport())
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,185 @@
+# -*- coding: utf-8 -*-
+
+import atexit
+import math
+import subprocess
+import threading
+from os import path
+
+try:
+    from ansible.module_utils.jcli_dmr import dmrComposite, dmrPath, dmrResponse, failureDescription, isNotFound, isSuccess, toCli
+    from ansible.module_utils.jcli_timing import timed
+except ImportError:
+    from jcli_dmr import dmrComposite, dmrPath, dmrResponse, failureDescription, isNotFound, isSuccess, toCli
+    from jcli_timing import timed
+
+class JBossConnetionError(Exception):
+    '''raise this cannot connect to JBoss contorller'''
+
+class JBossNotFound(Exception):
+    '''raise this when cannot find JBoss command line interface binary'''
+
+class JBossOperationFailed(Exception):
+    '''raise this when the controller answers an operation with a failed outcome'''
+
+class JBossTimeout(Exception):
+    '''raise this when a server or host does not reach the awaited state in time'''
+
+# printed by the cli after every command so the output of one command can be
+# told apart from the next one on the shared stdout pipe
+END_OF_COMMAND = '#jcli-end-of-command#'
+
+class JBossSession(object):
+    '''one jboss-cli.sh process, connected once and reused by every command of a module run'''
+
+    def __init__(self, data):
+        self.data = data
+        self.process = None
+
+    def start(self):
+        cmd = self.data['jboss_home'] + '/bin/jboss-cli.sh'
+        if not path.isfile(cmd):
+            raise JBossNotFound('JBOSS command line binary ({}) is not found.'.format(cmd))
+        controller = "--controller={}:{}".format(self.data['controller_host'], self.data['controller_port'])
+        user = "-u={}".format(self.data['user'])
+        password = "-p={}".format(self.data['password'])
+        # without a terminal the cli reads its commands line by line from stdin,
+        # --output-json prints the responses as JSON rather than in the dmr notation
+        with timed('spawn'):
+            self.process = subprocess.Popen(["sh", cmd, "-c", controller, user, password, "--output-json"],
+                                            stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                            stderr=subprocess.STDOUT, universal_newlines=True)
+        # the start of the jvm and the connection to the controller, told apart from the first operation
+        with timed('connect', controller=controller[len('--controller='):]):
+            self.send('')
+
+    def isAlive(self):
+        return self.process is not None and self.process.poll() is None
+
+    def send(self, cli):
+        '''writes cli and reads its output up to the end marker'''
+        try:
+            self.process.stdin.write("{}\necho {}\n".format(cli, END_OF_COMMAND))
+            self.process.stdin.flush()
+        except IOError:
+            pass
+        lines = []
+        for line in iter(self.process.stdout.readline, ''):
+            if line.strip() == END_OF_COMMAND:
+                break
+            lines.append(line)
+        else:
+            # a non interactive cli exits on the first failed command, the next
+            # command will start a new process
+            self.process.wait()
+            self.process = None
+        commandResult = ''.join(lines)
+        # a connection failure is printed as a message of the cli, not as an operation response
+        if "WFLYPRT0053" in commandResult:
+            self.close()
+            raise JBossConnetionError('Could not connect http-remoting://{}:{}'.format(self.data['controller_host'], self.data['controller_port']))
+        return commandResult
+
+    def command(self, cli):
+        if not self.isAlive():
+            self.start()
+            if self.process is None:
+                raise JBossConnetionError('jboss-cli exited while connecting to {}:{}'.format(self.data['controller_host'], self.data['controller_port']))
+        return self.send(cli)
+
+    def execute(self, op, timeout=None):
+        '''op as a cli command, the cli cancels it past timeout seconds'''
+        if timeout is None:
+            return self.command(toCli(op))
+        self.command('command-timeout set {}'.format(int(math.ceil(timeout))))
+        try:
+            return self.command(toCli(op))
+        finally:
+            # a failed command ended the cli, the next one starts with the default timeout
+            if self.isAlive():
+                self.send('command-timeout reset default')
+
+    def close(self):
+        if self.isAlive():
+            try:
+                self.process.stdin.write("quit\n")
+                self.process.stdin.close()
+            except IOError:
+                pass
+            self.process.wait()
+        self.process = None
+
+_sessions = {}
+
+def transport(data):
+    return data.get('transport') or 'cli'
+
+def sessionKey(data):
+    # sessions are not shared between threads, see jcli_parallel
+    return (transport(data), data.get('jboss_home'), data['controller_host'], data['controller_port'], data['user'], threading.current_thread().ident)
+
+def jbossSession(data):
+    key = sessionKey(data)
+    if key not in _sessions:
+        if transport(data) == 'http':
+            try:
+                from ansible.module_utils.jcli_http import JBossHttpSession
+            except ImportError:
+                from jcli_http import JBossHttpSession
+            _sessions[key] = JBossHttpSession(data)
+        else:
+            try:
+                from ansible.module_utils.jcli_daemon import daemonSession
+            except ImportError:
+                from jcli_daemon import daemonSession
+            # a running jcli daemon saves the start of a jboss-cli for every task
+            _sessions[key] = daemonSession(data) or JBossSession(data)
+    return _sessions[key]
+
+def jbossCommand(data, cli):
+    '''raw jboss-cli command, only the cli transport understands these; returns the response as a dict'''
+    session = jbossSession(dict(data, transport='cli'))
+    with timed('command', command=cli.split(' ')[0], transport='cli'):
+        return dmrResponse(session.command(cli))
+
+def jbossOperation(data, op, timeout=None):
+    '''management operation built with dmrOperation, sent over the transport of the task
+
+    timeout bounds, in seconds, the wait for the answer of a blocking operation; returns the response as a dict with
+    outcome, result and failure-description'''
+    session = jbossSession(data)
+    address = dmrPath([list(step.items())[0] for step in op['address']])
+    with timed('operation', operation=op['operation'], address=address, transport=transport(data)):
+        return dmrResponse(session.execute(op, timeout))
+
+def jbossRead(data, op):
+    '''result of a read operation, None when the resource does not exist'''
+    response = jbossOperation(data, op)
+    if isSuccess(response):
+        return response.get('result')
+    if isNotFound(response):
+        return None
+    raise JBossOperationFailed('{} failed: {}'.format(op['operation'], failureDescription(response)))
+
+def jbossBatch(data, steps):
+    '''steps applied in one composite operation, they are rolled back together when one of them fails'''
+    if len(steps) == 1:
+        return jbossOperation(data, steps[0])
+    return jbossOperation(data, dmrComposite(steps))
+
+def jbossUpload(data, op, filename, chunkSize=1024 * 1024):
+    '''management operation with filename streamed as its first input stream, http transport only
+
+    returns the response and the size, duration, throughput and progress of the upload'''
+    session = jbossSession(data)
+    with timed('upload', operation=op['operation'], transport=transport(data)):
+        response = dmrResponse(session.upload(op, filename, chunkSize))
+    return response, session.lastUpload
+
+def closeSessions():
+    for session in _sessions.values():
+        session.close()
+    _sessions.clear()
+
+# exit_json and fail_json leave through sys.exit
+atexit.register(closeSessions)
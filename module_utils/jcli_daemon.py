@@ -0,0 +1,207 @@
+# -*- coding: utf-8 -*-
+'''Optional per host daemon keeping jboss-cli sessions open between the tasks of a play.
+
+Run on the target as python jcli_daemon.py [--socket path] [--idle-timeout seconds] [--detach]
+next to jcli.py, jcli_dmr.py and jcli_http.py; the modules use it when its socket exists and run
+jboss-cli themselves otherwise.'''
+
+import json
+import os
+import socket
+import stat
+import sys
+import threading
+import time
+
+try:
+    from socketserver import StreamRequestHandler, ThreadingMixIn, UnixStreamServer
+except ImportError:
+    from SocketServer import StreamRequestHandler, ThreadingMixIn, UnixStreamServer
+
+try:
+    from ansible.module_utils.jcli import JBossConnetionError, JBossNotFound, JBossSession
+    from ansible.module_utils.jcli_timing import metricsReport, record, resetMetrics, timed
+except ImportError:
+    from jcli import JBossConnetionError, JBossNotFound, JBossSession
+    from jcli_timing import metricsReport, record, resetMetrics, timed
+
+ERRORS = {"JBossConnetionError": JBossConnetionError, "JBossNotFound": JBossNotFound}
+
+def daemonSocket():
+    '''path of the socket of the daemon, $JCLI_DAEMON_SOCKET or one per user in the temporary directory'''
+    return os.environ.get('JCLI_DAEMON_SOCKET') or '/tmp/jcli-daemon-{}.sock'.format(os.getuid())
+
+def isDaemonSocket(socketPath):
+    '''a socket of the current user, the passwords of the tasks are not sent to anyone else'''
+    try:
+        info = os.stat(socketPath)
+    except OSError:
+        return False
+    return stat.S_ISSOCK(info.st_mode) and info.st_uid == os.getuid()
+
+class JBossDaemonSession(object):
+    '''session of the daemon, commands are forwarded over its socket and answered by a jboss-cli it keeps running'''
+
+    def __init__(self, data, socketPath):
+        self.data = data
+        self.socketPath = socketPath
+        self.connection = None
+        self.stream = None
+
+    def connect(self):
+        self.connection = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        with timed('connect', daemon=self.socketPath):
+            self.connection.connect(self.socketPath)
+        self.stream = self.connection.makefile('rwb')
+
+    def request(self, **request):
+        if self.connection is None:
+            self.connect()
+        request['data'] = dict((k, self.data.get(k)) for k in ('jboss_home', 'controller_host', 'controller_port', 'user', 'password'))
+        self.stream.write(json.dumps(request).encode('utf-8') + b'\n')
+        self.stream.flush()
+        line = self.stream.readline()
+        if not line:
+            self.close()
+            raise JBossConnetionError('The jcli daemon on {} closed the connection'.format(self.socketPath))
+        reply = json.loads(line.decode('utf-8'))
+        # the spawn and connect of a jboss-cli happen in the daemon
+        for event in reply.get('events') or []:
+            record(**dict(event, daemon=True))
+        if 'error' in reply:
+            raise ERRORS.get(reply.get('type'), Exception)(reply['error'])
+        return reply['output']
+
+    def command(self, cli):
+        return self.request(cli=cli)
+
+    def execute(self, op, timeout=None):
+        return self.request(op=op, timeout=timeout)
+
+    def close(self):
+        if self.connection is not None:
+            self.stream.close()
+            self.connection.close()
+        self.connection = None
+        self.stream = None
+
+def daemonSession(data):
+    '''session of the daemon when it runs, None otherwise'''
+    socketPath = daemonSocket()
+    if not isDaemonSocket(socketPath):
+        return None
+    session = JBossDaemonSession(data, socketPath)
+    try:
+        session.connect()
+    except socket.error:
+        # a socket left behind by a daemon that is gone
+        return None
+    return session
+
+class JBossDaemonHandler(StreamRequestHandler):
+
+    def handle(self):
+        for line in iter(self.rfile.readline, b''):
+            request = json.loads(line.decode('utf-8'))
+            reply = self.server.answer(request)
+            self.wfile.write(json.dumps(reply).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+class JBossDaemon(ThreadingMixIn, UnixStreamServer):
+    '''one jboss-cli per controller and credentials, commands of concurrent tasks are run one at a time'''
+
+    daemon_threads = True
+
+    def __init__(self, socketPath, idleTimeout):
+        if os.path.exists(socketPath):
+            os.remove(socketPath)
+        umask = os.umask(0o177)
+        try:
+            UnixStreamServer.__init__(self, socketPath, JBossDaemonHandler)
+        finally:
+            os.umask(umask)
+        self.socketPath = socketPath
+        self.idleTimeout = idleTimeout
+        self.sessions = {}
+        self.lock = threading.Lock()
+        self.lastUsed = time.time()
+
+    def session(self, data):
+        key = (data['jboss_home'], data['controller_host'], data['controller_port'], data['user'], data['password'])
+        if key not in self.sessions:
+            self.sessions[key] = JBossSession(data)
+        return self.sessions[key]
+
+    def answer(self, request):
+        with self.lock:
+            self.lastUsed = time.time()
+            resetMetrics()
+            try:
+                session = self.session(request['data'])
+                if 'cli' in request:
+                    reply = {"output": session.command(request['cli'])}
+                else:
+                    reply = {"output": session.execute(request['op'], request.get('timeout'))}
+            except Exception as e:
+                reply = {"error": str(e), "type": type(e).__name__}
+            reply['events'] = metricsReport()['events']
+            self.lastUsed = time.time()
+            return reply
+
+    def watchIdle(self):
+        while time.time() - self.lastUsed < self.idleTimeout or self.lock.locked():
+            time.sleep(1)
+        self.shutdown()
+
+    def run(self):
+        watchdog = threading.Thread(target=self.watchIdle)
+        watchdog.daemon = True
+        watchdog.start()
+        try:
+            self.serve_forever()
+        finally:
+            self.server_close()
+            for session in self.sessions.values():
+                session.close()
+            if os.path.exists(self.socketPath):
+                os.remove(self.socketPath)
+
+def detach():
+    '''leaves the task that started the daemon'''
+    if os.fork() > 0:
+        os._exit(0)
+    os.setsid()
+    if os.fork() > 0:
+        os._exit(0)
+    devnull = os.open(os.devnull, os.O_RDWR)
+    for fd in (0, 1, 2):
+        os.dup2(devnull, fd)
+
+def main(args):
+    socketPath = daemonSocket()
+    idleTimeout = 600
+    background = False
+    while args:
+        arg = args.pop(0)
+        if arg == '--socket':
+            socketPath = args.pop(0)
+        elif arg == '--idle-timeout':
+            idleTimeout = int(args.pop(0))
+        elif arg == '--detach':
+            background = True
+    if isDaemonSocket(socketPath):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(socketPath)
+            # already running
+            return
+        except socket.error:
+            pass
+        finally:
+            probe.close()
+    if background:
+        detach()
+    JBossDaemon(socketPath, idleTimeout).run()
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,216 @@
+# -*- coding: utf-8 -*-
+
+import base64
+import binascii
+import json
+import re
+
+def dmrOperation(address, operation, params=None):
+    '''build a detyped management operation, address is a list of (type, name) pairs'''
+    op = {"operation": operation, "address": [{key: value} for key, value in address]}
+    if params:
+        op.update(params)
+    return op
+
+def dmrComposite(steps):
+    return dmrOperation([], 'composite', {"steps": steps})
+
+def rolloutPlan(waves, rollingToServers=False, rollback=True):
+    '''operation headers applying an operation to the waves of server groups one after the other,
+    the groups of a wave concurrently and, with rollingToServers, their servers one by one'''
+    policy = {"rolling-to-servers": rollingToServers, "max-failed-servers": 0}
+    plan = {
+        "in-series": [{"concurrent-groups": dict((group, policy) for group in wave)} for wave in waves],
+        "rollback-across-groups": rollback,
+    }
+    return {"rollout-plan": plan}
+
+def cliHeaders(headers):
+    '''operation headers in the {...} notation of jboss-cli'''
+    rendered = []
+    for name, value in headers.items():
+        if name == 'rollout-plan':
+            waves = []
+            for step in value['in-series']:
+                waves.append('^'.join('{}(rolling-to-servers={},max-failed-servers={})'.format(
+                    group, dmrValue(policy['rolling-to-servers']), policy['max-failed-servers'])
+                    for group, policy in step['concurrent-groups'].items()))
+            rollout = 'rollout ' + ','.join(waves)
+            if value.get('rollback-across-groups'):
+                rollout += ' rollback-across-groups'
+            rendered.append(rollout)
+        else:
+            rendered.append('{}={}'.format(name, dmrValue(value)))
+    return '{' + ';'.join(rendered) + '}'
+
+def dmrValue(value, key=None):
+    '''render a value the way jboss-cli expects it in operation parameters'''
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (int, float)):
+        return str(value)
+    if isinstance(value, dict):
+        return '{' + ','.join('"{}" => {}'.format(k, dmrValue(v, k)) for k, v in value.items()) + '}'
+    if isinstance(value, (list, tuple)):
+        if key == 'address':
+            return '[' + ','.join('("{}" => {})'.format(k, dmrValue(v)) for step in value for k, v in step.items()) + ']'
+        return '[' + ','.join(dmrValue(v) for v in value) + ']'
+    return '"{}"'.format(str(value).replace('\\', '\\\\').replace('"', '\\"'))
+
+def dmrPath(address):
+    '''cli path of an address given as (type, name) pairs'''
+    return ''.join('/{}={}'.format(k, v) for k, v in address) or '/'
+
+def toCli(op):
+    address = ''.join('/{}={}'.format(k, v) for step in op['address'] for k, v in step.items())
+    params = ','.join('{}={}'.format(k, dmrValue(v, k)) for k, v in op.items() if k not in ('operation', 'address', 'operation-headers'))
+    headers = cliHeaders(op['operation-headers']) if op.get('operation-headers') else ''
+    if params:
+        return '{}:{}({}){}'.format(address, op['operation'], params, headers)
+    if headers:
+        return '{}:{}(){}'.format(address, op['operation'], headers)
+    return '{}:{}'.format(address, op['operation'])
+
+def toJson(op):
+    return json.dumps(op)
+
+def dmrText(value):
+    '''value normalized for comparison, the model returns numbers and booleans where tasks often give strings'''
+    if value is None:
+        return None
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, (list, tuple)):
+        return [dmrText(v) for v in value]
+    if isinstance(value, dict):
+        return dict((k, dmrText(v)) for k, v in value.items())
+    return str(value)
+
+def dmrBytes(value):
+    '''hex string of a bytes value, printed by the cli as bytes {0x..} and returned as base64 in JSON'''
+    if isinstance(value, dict) and 'BYTES_VALUE' in value:
+        return binascii.hexlify(base64.b64decode(value['BYTES_VALUE'])).decode('ascii')
+    return value
+
+def dmrEquals(current, wanted):
+    return dmrText(current) == dmrText(wanted)
+
+DMR_TOKENS = re.compile(r'''
+    (?P<string>"(?:[^"\\]|\\.)*")
+  | (?P<bytes>bytes\s*\{(?P<octets>[^}]*)\})
+  | (?P<expression>expression\s+(?P<expr>"(?:[^"\\]|\\.)*"))
+  | (?P<big>big\s+(?:decimal|integer)\s+)
+  | (?P<number>-?\d+(?:\.\d+)?(?:[eE][-+]?\d+)?)L?
+  | (?P<arrow>=>)
+  | (?P<word>[A-Za-z_][\w-]*)
+  | (?P<open>\()
+  | (?P<close>\))
+  | (?P<other>[\[\]{},:])
+  | (?P<space>\s+)
+''', re.X)
+
+def dmrTextToJson(text):
+    '''convert the dmr notation printed by jboss-cli to JSON text'''
+    out = []
+    for m in DMR_TOKENS.finditer(text):
+        kind = m.lastgroup
+        if kind in ('string', 'number', 'other'):
+            out.append(m.group(kind))
+        elif kind == 'bytes':
+            out.append('"{}"'.format(''.join(o.strip()[2:].zfill(2) for o in m.group('octets').split(',') if o.strip())))
+        elif kind == 'expression':
+            out.append(m.group('expr'))
+        elif kind == 'arrow':
+            out.append(':')
+        elif kind == 'open':
+            out.append('{')
+        elif kind == 'close':
+            out.append('}')
+        elif kind == 'word':
+            word = m.group('word')
+            out.append('null' if word == 'undefined' else word if word in ('true', 'false') else '"{}"'.format(word))
+    return ''.join(out)
+
+_decoder = json.JSONDecoder()
+
+def dmrResponse(text):
+    '''response of an operation as a dict with outcome, result and failure-description
+
+    the JSON printed with --output-json or returned over http is decoded in place in one pass,
+    the dmr notation of an older cli is converted first'''
+    if not text.strip():
+        # commands such as deploy print nothing when they succeed
+        return {"outcome": "success"}
+    start = text.find('{')
+    if start < 0:
+        return {"outcome": "failed", "failure-description": text.strip()}
+    try:
+        return _decoder.raw_decode(text, start)[0]
+    except ValueError:
+        return json.loads(dmrTextToJson(text[start:text.rfind('}') + 1]))
+
+def dmrResult(text):
+    '''result of a successful response, None when the operation failed'''
+    response = dmrResponse(text)
+    if response.get('outcome') != 'success':
+        return None
+    return response.get('result')
+
+def isSuccess(response):
+    return response.get('outcome') == 'success'
+
+def failureDescription(response):
+    '''failure-description of a response as text, a composite nests the failures of its steps'''
+    description = response.get('failure-description')
+    if description is None:
+        return None
+    if isinstance(description, (dict, list)):
+        return json.dumps(description, sort_keys=True)
+    return str(description)
+
+def isNotFound(response):
+    '''failed because the addressed resource does not exist'''
+    return not isSuccess(response) and 'WFLYCTL0216' in (failureDescription(response) or '')
+
+def stepNumber(name):
+    return int(name[len('step-'):])
+
+def dmrSummary(response):
+    '''outcome, failure and headers of a response, with the outcome of every step of a composite but
+    without the read results, small enough to be returned by a module'''
+    summary = {"outcome": response.get('outcome')}
+    for key in ('failure-description', 'response-headers'):
+        if response.get(key) is not None:
+            summary[key] = response[key]
+    result = response.get('result')
+    if isinstance(result, dict) and result and all(re.match(r'step-\d+$', name) for name in result):
+        summary['steps'] = [dmrSummary(result[name]) for name in sorted(result, key=stepNumber)]
+    elif result is not None and not isinstance(result, (dict, list)):
+        summary['result'] = result
+    return summary
+
+def processState(response):
+    '''reload_required and restart_required as the response headers of an operation, its steps and the servers
+    it reached report them; servers lists the host/server entries that need a reload or a restart'''
+    state = {"reload_required": False, "restart_required": False, "servers": []}
+    def headers(found):
+        reload = bool(found.get('operation-requires-reload')) or found.get('process-state') == 'reload-required'
+        restart = bool(found.get('operation-requires-restart')) or found.get('process-state') == 'restart-required'
+        state['reload_required'] = state['reload_required'] or reload
+        state['restart_required'] = state['restart_required'] or restart
+        return reload or restart
+    def visit(response):
+        headers(response.get('response-headers') or {})
+        for group in (response.get('server-groups') or {}).values():
+            for host, servers in ((group or {}).get('host') or {}).items():
+                for server, reached in (servers or {}).items():
+                    serverResponse = (reached or {}).get('response') or {}
+                    if headers(serverResponse.get('response-headers') or {}):
+                        state['servers'].append('{}/{}'.format(host, server))
+        result = response.get('result')
+        if isinstance(result, dict) and result and all(re.match(r'step-\d+$', name) for name in result):
+            for name in sorted(result, key=stepNumber):
+                visit(result[name])
+    visit(response)
+    state['servers'] = sorted(set(state['servers']))
+    return state
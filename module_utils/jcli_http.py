@@ -0,0 +1,231 @@
+# -*- coding: utf-8 -*-
+
+import hashlib
+import re
+import os
+import select
+import socket
+import time
+import uuid
+from os import path
+
+try:
+    import http.client as http_client
+except ImportError:
+    import httplib as http_client
+
+try:
+    from ansible.module_utils.jcli import JBossConnetionError, JBossTimeout
+    from ansible.module_utils.jcli_dmr import toJson
+    from ansible.module_utils.jcli_timing import record, timed
+except ImportError:
+    from jcli import JBossConnetionError, JBossTimeout
+    from jcli_dmr import toJson
+    from jcli_timing import record, timed
+
+# seconds an answer is waited for, unless the operation gives its own timeout
+SOCKET_TIMEOUT = 60
+
+def md5(text):
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+class MultipartStream(object):
+    '''multipart body read from disk chunk by chunk, so the archive is never held in memory'''
+
+    def __init__(self, head, filename, tail, chunkSize, progress=None):
+        self.head = head
+        self.filename = filename
+        self.tail = tail
+        self.chunkSize = chunkSize
+        self.progress = progress
+        self.size = os.path.getsize(filename)
+        self.file = None
+        self.rewind()
+
+    def __len__(self):
+        return len(self.head) + self.size + len(self.tail)
+
+    def rewind(self):
+        if self.file is not None:
+            self.file.close()
+        self.file = open(self.filename, 'rb')
+        self.parts = [self.head]
+        self.sent = 0
+        self.done = False
+
+    def read(self, size=-1):
+        if self.parts:
+            return self.parts.pop(0)
+        if self.done:
+            return b''
+        chunk = self.file.read(self.chunkSize)
+        if chunk:
+            self.sent += len(chunk)
+            if self.progress is not None:
+                self.progress(self.sent, self.size)
+            return chunk
+        self.done = True
+        self.file.close()
+        return self.tail
+
+    def close(self):
+        self.file.close()
+
+class UploadProgress(object):
+    '''bytes sent and a checkpoint for every tenth of the archive'''
+
+    def __init__(self):
+        self.started = time.time()
+        self.checkpoints = []
+
+    def __call__(self, sent, total):
+        percent = 100 * sent // total if total else 100
+        if not self.checkpoints or percent // 10 > self.checkpoints[-1]['percent'] // 10:
+            self.checkpoints.append({"percent": percent, "bytes": sent, "seconds": round(time.time() - self.started, 3)})
+
+    def report(self, size):
+        seconds = time.time() - self.started
+        return {
+            "bytes": size,
+            "seconds": round(seconds, 3),
+            "throughput": int(size / seconds) if seconds > 0 else size,
+            "progress": self.checkpoints,
+        }
+
+class JBossHttpSession(object):
+    '''keep-alive connection to the http management endpoint of the controller'''
+
+    def __init__(self, data):
+        self.data = data
+        self.connection = None
+        self.challenge = None
+        self.nonceCount = 0
+        self.lastUpload = None
+
+    def url(self):
+        return 'http://{}:{}/management'.format(self.data['controller_host'], self.data['controller_port'])
+
+    def connect(self):
+        self.connection = http_client.HTTPConnection(self.data['controller_host'], self.data['controller_port'], timeout=SOCKET_TIMEOUT)
+        with timed('connect', controller='{}:{}'.format(self.data['controller_host'], self.data['controller_port'])):
+            try:
+                self.connection.connect()
+            except socket.error as e:
+                self.close()
+                raise JBossConnetionError('Could not connect {} ({})'.format(self.url(), e))
+        # headers and body go in separate writes, Nagle would hold the body until the ack of the headers
+        self.connection.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def authorization(self, method, uri):
+        '''digest authorization header for the last challenge of the ManagementRealm'''
+        if self.challenge is None:
+            return {}
+        self.nonceCount += 1
+        nc = '{:08x}'.format(self.nonceCount)
+        cnonce = uuid.uuid4().hex
+        realm = self.challenge.get('realm', '')
+        nonce = self.challenge.get('nonce', '')
+        ha1 = md5('{}:{}:{}'.format(self.data['user'], realm, self.data['password']))
+        ha2 = md5('{}:{}'.format(method, uri))
+        fields = [('username', self.data['user']), ('realm', realm), ('nonce', nonce), ('uri', uri)]
+        if 'qop' in self.challenge:
+            response = md5('{}:{}:{}:{}:auth:{}'.format(ha1, nonce, nc, cnonce, ha2))
+            fields += [('qop', 'auth'), ('nc', nc), ('cnonce', cnonce)]
+        else:
+            response = md5('{}:{}:{}'.format(ha1, nonce, ha2))
+        fields.append(('response', response))
+        if 'opaque' in self.challenge:
+            fields.append(('opaque', self.challenge['opaque']))
+        header = ', '.join('{}="{}"'.format(k, v) if k not in ('qop', 'nc') else '{}={}'.format(k, v) for k, v in fields)
+        return {'Authorization': 'Digest ' + header}
+
+    def readChallenge(self, response):
+        header = response.getheader('WWW-Authenticate') or ''
+        if not header.lower().startswith('digest'):
+            return False
+        self.challenge = dict(re.findall(r'(\w+)="?([^",]*)"?', header[len('digest'):]))
+        self.nonceCount = 0
+        return True
+
+    def isStale(self):
+        '''the server closed the idle kept-alive connection, its socket is readable before anything was asked'''
+        if self.connection.sock is None:
+            return False
+        try:
+            return bool(select.select([self.connection.sock], [], [], 0)[0])
+        except (ValueError, socket.error):
+            return True
+
+    def send(self, method, uri, body, headers, timeout=None):
+        '''one request over the kept-alive connection, reconnecting once when the server dropped it before the request was written
+
+        a request the server may have received is never sent again, an add or a composite would run twice; an answer
+        not received within timeout raises JBossTimeout'''
+        for attempt in (1, 2):
+            if self.connection is not None and self.isStale():
+                self.close()
+            reused = self.connection is not None
+            if not reused:
+                self.connect()
+            if hasattr(body, 'rewind'):
+                body.rewind()
+            written = False
+            try:
+                self.connection.timeout = SOCKET_TIMEOUT if timeout is None else timeout
+                if self.connection.sock is not None:
+                    self.connection.sock.settimeout(self.connection.timeout)
+                allHeaders = dict(headers)
+                allHeaders.update(self.authorization(method, uri))
+                self.connection.request(method, uri, body, allHeaders)
+                written = True
+                response = self.connection.getresponse()
+                return response, response.read()
+            except (http_client.HTTPException, socket.error) as e:
+                self.close()
+                if timeout is not None and isinstance(e, socket.timeout):
+                    raise JBossTimeout('No answer from {} within {}s'.format(self.url(), timeout))
+                if attempt == 2 or isinstance(e, socket.timeout) or written or not reused:
+                    raise JBossConnetionError('Could not connect {} ({})'.format(self.url(), e))
+
+    def request(self, method, uri, body=None, headers=None, timeout=None):
+        headers = headers or {}
+        started = time.time()
+        response, content = self.send(method, uri, body, headers, timeout)
+        if response.status == 401 and self.readChallenge(response):
+            # the round trip answered with the challenge is the cost of the authentication
+            record('authenticate', time.time() - started)
+            response, content = self.send(method, uri, body, headers, timeout)
+        if response.status == 401:
+            raise JBossConnetionError('Authentication failed for {} on {}'.format(self.data['user'], self.url()))
+        return content.decode('utf-8')
+
+    def execute(self, op, timeout=None):
+        body = toJson(op).encode('utf-8')
+        return self.request('POST', '/management', body, {'Content-Type': 'application/json', 'Accept': 'application/json'}, timeout)
+
+    def upload(self, op, filename, chunkSize=1024 * 1024):
+        '''operation with the content of filename streamed as input stream 0, statistics are kept in lastUpload'''
+        if self.challenge is None:
+            # get the challenge with an empty request, so the archive is sent only once
+            self.request('GET', '/management')
+        boundary = uuid.uuid4().hex
+        head = b''.join([
+            '--{}\r\nContent-Disposition: form-data; name="operation"\r\nContent-Type: application/json\r\n\r\n'.format(boundary).encode('utf-8'),
+            toJson(op).encode('utf-8'),
+            '\r\n--{}\r\nContent-Disposition: form-data; name="file"; filename="{}"\r\nContent-Type: application/octet-stream\r\n\r\n'.format(boundary, path.basename(filename)).encode('utf-8'),
+        ])
+        tail = '\r\n--{}--\r\n'.format(boundary).encode('utf-8')
+        progress = UploadProgress()
+        body = MultipartStream(head, filename, tail, chunkSize, progress)
+        headers = {'Content-Type': 'multipart/form-data; boundary=' + boundary, 'Content-Length': str(len(body))}
+        try:
+            result = self.request('POST', '/management-upload', body, headers)
+        finally:
+            body.close()
+        self.lastUpload = progress.report(body.size)
+        return result
+
+    def close(self):
+        if self.connection is not None:
+            self.connection.close()
+        self.connection = None
@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+
+try:
+    from ansible.module_utils.jcli import jbossOperation, JBossOperationFailed
+    from ansible.module_utils.jcli_dmr import dmrComposite, dmrOperation
+except ImportError:
+    from jcli import jbossOperation, JBossOperationFailed
+    from jcli_dmr import dmrComposite, dmrOperation
+
+# the parts of a managed domain the jcli modules manage
+DOMAIN_SNAPSHOT = [
+    [('server-group', '*')],
+    [('host', '*'), ('server-config', '*')],
+    [('deployment', '*')],
+]
+
+def modelGet(model, address):
+    '''resource at address in a model tree, None when it does not exist'''
+    node = model
+    for key, value in address:
+        node = (node.get(key) or {}).get(value)
+        if node is None:
+            return None
+    return node
+
+def modelSet(model, address, resource):
+    node = model
+    for key, value in address[:-1]:
+        node = node.setdefault(key, {}).setdefault(value, {})
+    key, value = address[-1]
+    node.setdefault(key, {})[value] = resource
+
+def modelRemove(model, address):
+    '''removes the resources at address from a model tree, a * matches any name'''
+    key, value = address[0]
+    children = model.get(key) or {}
+    for name in list(children):
+        if value == '*' or name == value:
+            if len(address) > 1:
+                modelRemove(children[name], address[1:])
+            else:
+                del children[name]
+
+def matches(address, pattern):
+    '''whether pattern is address or one of its parents, a * in either of them matches any name'''
+    if len(pattern) > len(address):
+        return False
+    return all(pk == ak and (pv == '*' or av == '*' or pv == av) for (pk, pv), (ak, av) in zip(pattern, address))
+
+def isCovered(model, address):
+    '''whether a snapshot of jcli_facts answers for the resource at address: it was read and nothing changed it since'''
+    if model is None:
+        return False
+    types = [key for key, value in address]
+    if not any(types[:len(snapshot)] == [key for key, value in snapshot] for snapshot in DOMAIN_SNAPSHOT):
+        return False
+    return not any(matches(address, [tuple(pair) for pair in stale]) for stale in model.get('invalidated') or [])
+
+def cachedResource(data, address, read):
+    '''resource at address from the model option of the task when it covers it, else read(); None when it does not exist'''
+    model = data.get('model')
+    if isCovered(model, address):
+        return modelGet(model, address)
+    return read()
+
+def invalidate(data, address):
+    '''drops the subtree of a changed resource from the model option, later lookups under it go to the controller'''
+    model = data.get('model')
+    if model is None:
+        return
+    modelRemove(model, address)
+    model.setdefault('invalidated', []).append([list(pair) for pair in address])
+
+def modelFacts(data):
+    '''the model option of the task, with the subtrees it changed invalidated, returned as jcli_model'''
+    if data.get('model') is None:
+        return {}
+    return {"jcli_model": data['model']}
+
+def addressPairs(address):
+    '''(type, name) pairs of an address returned by the controller'''
+    return [list(step.items())[0] for step in address]
+
+def serverConfigs(data, host):
+    '''attributes of the server-configs of host by name, from the model option when it covers them'''
+    address = [('host', host), ('server-config', '*')]
+    if isCovered(data.get('model'), address):
+        return dict((modelGet(data['model'], [('host', host)]) or {}).get('server-config') or {})
+    response = jbossOperation(data, dmrOperation(address, 'read-resource'))
+    if response.get('outcome') != 'success':
+        raise JBossOperationFailed('Could not read the server-configs of {}: {}'.format(host, response.get('failure-description')))
+    return dict((dict(addressPairs(entry['address']))['server-config'], entry.get('result') or {}) for entry in response.get('result') or [])
+
+def allocatePortOffsets(used, count, start=0, step=100):
+    '''count socket-binding-port-offsets from start on, each at least step away from used and from each other'''
+    taken = list(used)
+    offsets = []
+    candidate = start
+    while len(offsets) < count:
+        if all(abs(candidate - offset) >= step for offset in taken):
+            offsets.append(candidate)
+            taken.append(candidate)
+        candidate += step
+    return offsets
+
+def readServerStates(data, deployment=None):
+    '''state of every server of the domain, and the status of deployment on it, read in one composite'''
+    steps = [dmrOperation([('host', '*'), ('server', '*')], 'read-resource', {"attributes-only": True, "include-runtime": True})]
+    if deployment is not None:
+        steps.append(dmrOperation([('host', '*'), ('server', '*'), ('deployment', deployment)], 'read-attribute', {"name": "status"}))
+    response = jbossOperation(data, dmrComposite(steps))
+    if response.get('outcome') != 'success':
+        raise JBossOperationFailed('Could not read the server states: {}'.format(response.get('failure-description')))
+    servers = {}
+    for entry in response['result']['step-1'].get('result') or []:
+        pairs = dict(addressPairs(entry['address']))
+        result = entry.get('result') or {}
+        servers[(pairs['host'], pairs['server'])] = {
+            "host": pairs['host'],
+            "server": pairs['server'],
+            "server-group": result.get('server-group'),
+            "server-state": result.get('server-state'),
+            "status": None,
+        }
+    if deployment is not None:
+        for entry in response['result']['step-2'].get('result') or []:
+            pairs = dict(addressPairs(entry['address']))
+            if (pairs['host'], pairs['server']) in servers:
+                servers[(pairs['host'], pairs['server'])]['status'] = entry.get('result')
+    return sorted(servers.values(), key=lambda server: (server['host'], server['server']))
+
+def readModel(data, addresses=None):
+    '''one composite of recursive read-resource calls, merged into a tree shaped like the management model'''
+    addresses = addresses or DOMAIN_SNAPSHOT
+    steps = [dmrOperation(address, 'read-resource', {"recursive": True}) for address in addresses]
+    response = jbossOperation(data, dmrComposite(steps))
+    if response.get('outcome') != 'success':
+        raise JBossOperationFailed('Could not read the management model: {}'.format(response.get('failure-description')))
+    model = {}
+    for i, address in enumerate(addresses):
+        result = response['result']['step-{}'.format(i + 1)].get('result')
+        if not isinstance(result, list):
+            result = [{"address": [{k: v} for k, v in address], "result": result}]
+        for entry in result:
+            if entry.get('result') is not None:
+                modelSet(model, addressPairs(entry['address']), entry['result'])
+    return model
+
+def readTopology(data):
+    '''hosts and server groups with their attributes and the server-configs of every host with their JVMs, in one composite'''
+    steps = [
+        dmrOperation([('host', '*')], 'read-resource', {"attributes-only": True}),
+        dmrOperation([('server-group', '*')], 'read-resource', {"attributes-only": True}),
+        dmrOperation([('host', '*'), ('server-config', '*')], 'read-resource', {"recursive": True}),
+    ]
+    response = jbossOperation(data, dmrComposite(steps))
+    if response.get('outcome') != 'success':
+        raise JBossOperationFailed('Could not read the domain topology: {}'.format(response.get('failure-description')))
+    model = {"host": {}, "server-group": {}}
+    for i in range(len(steps)):
+        for entry in response['result']['step-{}'.format(i + 1)].get('result') or []:
+            address = addressPairs(entry['address'])
+            node = modelGet(model, address)
+            if node is None:
+                modelSet(model, address, dict(entry.get('result') or {}))
+            else:
+                node.update(entry.get('result') or {})
+    return model
@@ -0,0 +1,45 @@
+# -*- coding: utf-8 -*-
+
+import time
+from multiprocessing.pool import ThreadPool
+
+def runParallel(task, items, workers):
+    '''task(item) for every item on a pool of at most workers threads
+
+    every thread talks to the controller over its own session; returns one
+    outcome per item, in the order of items, with the result or the error and the duration'''
+    def timed(item):
+        started = time.time()
+        try:
+            outcome = {"item": item, "ok": True, "result": task(item)}
+        except Exception as e:
+            outcome = {"item": item, "ok": False, "error": str(e)}
+        outcome['seconds'] = round(time.time() - started, 3)
+        return outcome
+    if not items:
+        return []
+    pool = ThreadPool(max(1, min(workers, len(items))))
+    try:
+        return pool.map(timed, items)
+    finally:
+        pool.close()
+        pool.join()
+
+def runParallelStates(task, items, workers, key):
+    '''runParallel for a task returning (isError, hasChanged, meta), folded into one module result
+
+    the outcome of every item is reported under meta[key + 's'], an item that raised counts as failed'''
+    isError = False
+    hasChanged = False
+    entries = []
+    for outcome in runParallel(task, items, workers):
+        entry = {key: outcome['item'], "seconds": outcome['seconds']}
+        if outcome['ok']:
+            failed, changed, meta = outcome['result']
+            entry.update({"changed": changed, "failed": failed, "meta": meta})
+        else:
+            entry.update({"changed": False, "failed": True, "error": outcome['error']})
+        isError = isError or entry['failed']
+        hasChanged = hasChanged or entry['changed']
+        entries.append(entry)
+    return isError, hasChanged, {"status": "Failed" if isError else "OK", key + 's': entries}
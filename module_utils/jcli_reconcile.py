@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+
+try:
+    from ansible.module_utils.jcli import jbossBatch
+    from ansible.module_utils.jcli_dmr import dmrOperation, dmrEquals, dmrPath, dmrSummary, isSuccess, processState
+    from ansible.module_utils.jcli_model import modelGet
+    from ansible.module_utils.jcli_parallel import runParallel
+except ImportError:
+    from jcli import jbossBatch
+    from jcli_dmr import dmrOperation, dmrEquals, dmrPath, dmrSummary, isSuccess, processState
+    from jcli_model import modelGet
+    from jcli_parallel import runParallel
+
+SERVER_GROUP_ATTRIBUTES = ['profile', 'socket_binding_group']
+SERVER_ATTRIBUTES = ['group', 'socket_binding_port_offset', 'socket_binding_group', 'auto_start']
+JVM_ATTRIBUTES = ['heap_size', 'max_heap_size', 'permgen_size', 'max_permgen_size', 'jvm_options']
+
+def dmrAttributes(item, names):
+    '''attributes of a desired item that are set, with the names of the management model'''
+    attributes = {}
+    for name in names:
+        if item.get(name) is not None:
+            attributes[name.replace('_', '-')] = item[name]
+    if 'jvm-options' in attributes and not isinstance(attributes['jvm-options'], list):
+        attributes['jvm-options'] = [attributes['jvm-options']]
+    return attributes
+
+def reconcile(model, address, wanted, state, steps, diff):
+    '''steps turning the resource at address into the wanted one'''
+    current = modelGet(model, address)
+    path = dmrPath(address)
+    if state == 'absent':
+        if current is not None:
+            steps.append(dmrOperation(address, 'remove'))
+            diff['before'][path] = dict((k, v) for k, v in current.items() if not isinstance(v, dict))
+        return
+    if current is None:
+        steps.append(dmrOperation(address, 'add', wanted))
+        diff['after'][path] = wanted
+        return
+    changed = dict((k, v) for k, v in wanted.items() if not dmrEquals(current.get(k), v))
+    for name, value in changed.items():
+        steps.append(dmrOperation(address, 'write-attribute', {"name": name, "value": value}))
+    if changed:
+        diff['before'][path] = dict((k, current.get(k)) for k in changed)
+        diff['after'][path] = changed
+
+def isServerGroup(step):
+    return len(step['address']) == 1 and 'server-group' in step['address'][0]
+
+def domainSteps(data, model):
+    '''every step needed to reach the desired domain, additions first and removals last'''
+    diff = {"before": {}, "after": {}}
+    additions = []
+    removals = []
+    for group in data['server_groups'] or []:
+        state = group.get('state', 'present')
+        reconcile(model, [('server-group', group['name'])], dmrAttributes(group, SERVER_GROUP_ATTRIBUTES), state,
+                  additions if state == 'present' else removals, diff)
+    for server in data['servers'] or []:
+        state = server.get('state', 'present')
+        address = [('host', server.get('host', data['host'])), ('server-config', server['name'])]
+        reconcile(model, address, dmrAttributes(server, SERVER_ATTRIBUTES), state,
+                  additions if state == 'present' else removals, diff)
+        if state == 'present' and server.get('jvm'):
+            jvm = server['jvm']
+            reconcile(model, address + [('jvm', jvm.get('name', 'default'))], dmrAttributes(jvm, JVM_ATTRIBUTES), 'present', additions, diff)
+    for deployment in data['deployments'] or []:
+        state = deployment.get('state', 'present')
+        if state == 'present' and deployment.get('path') and modelGet(model, [('deployment', deployment['name'])]) is None:
+            content = [{"path": deployment['path'], "archive": True}]
+            reconcile(model, [('deployment', deployment['name'])], {"content": content}, 'present', additions, diff)
+        for group in deployment.get('server_groups') or []:
+            wanted = {"enabled": deployment.get('enabled', True)}
+            reconcile(model, [('server-group', group), ('deployment', deployment['name'])], wanted, state,
+                      additions if state == 'present' else removals, diff)
+    # server groups can be removed only after their servers and deployments
+    removals.sort(key=isServerGroup)
+    return additions + removals, diff
+
+def hostOf(step):
+    '''host of a step addressed under /host=..., None for the resources of the domain'''
+    first = list(step['address'][0].items())[0] if step['address'] else (None, None)
+    return first[1] if first[0] == 'host' else None
+
+def batchPhases(steps):
+    '''steps of domainSteps as phases run one after the other, each a list of composites that may run concurrently:
+    server groups and deployments, then one composite per host, then the deployments of server groups, removals last'''
+    additions = [step for step in steps if step['operation'] != 'remove']
+    removals = [step for step in steps if step['operation'] == 'remove']
+    hosts = {}
+    for step in additions:
+        if hostOf(step) is not None:
+            hosts.setdefault(hostOf(step), []).append(step)
+    phases = [
+        [[step for step in additions if hostOf(step) is None and len(step['address']) == 1]],
+        [hosts[host] for host in sorted(hosts)],
+        [[step for step in additions if hostOf(step) is None and len(step['address']) > 1]],
+        [removals],
+    ]
+    return [[composite for composite in phase if composite] for phase in phases if any(phase)]
+
+def applyBatch(data, steps, workers):
+    '''steps applied as the composites of batchPhases, those of a phase on at most workers sessions at the same time;
+    stops after a phase with a failed composite, returns whether one failed and the outcome of every composite'''
+    composites = []
+    for phase in batchPhases(steps):
+        for outcome in runParallel(lambda composite: jbossBatch(data, composite), phase, workers):
+            entry = {"hosts": sorted(set(hostOf(step) or '/' for step in outcome['item'])), "steps": len(outcome['item']),
+                     "seconds": outcome['seconds']}
+            if outcome['ok']:
+                entry.update({"failed": not isSuccess(outcome['result']), "response": dmrSummary(outcome['result'])})
+                entry.update(processState(outcome['result']))
+            else:
+                entry.update({"failed": True, "error": outcome['error']})
+            composites.append(entry)
+        if any(entry['failed'] for entry in composites):
+            return True, composites
+    return False, composites
@@ -0,0 +1,90 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+try:
+    from ansible.module_utils.jcli import jbossOperation, JBossOperationFailed
+    from ansible.module_utils.jcli_dmr import dmrComposite, dmrOperation, failureDescription, isSuccess
+    from ansible.module_utils.jcli_model import addressPairs
+except ImportError:
+    from jcli import jbossOperation, JBossOperationFailed
+    from jcli_dmr import dmrComposite, dmrOperation, failureDescription, isSuccess
+    from jcli_model import addressPairs
+
+PLATFORM = [('core-service', 'platform-mbean')]
+
+# section of the metrics, resource under /host=*/server=*, the runtime attributes kept and the address types naming an entry
+SECTIONS = [
+    ('memory', PLATFORM + [('type', 'memory')], ['heap-memory-usage', 'non-heap-memory-usage'], []),
+    ('gc', PLATFORM + [('type', 'garbage-collector'), ('name', '*')], ['collection-count', 'collection-time'], ['name']),
+    ('threads', PLATFORM + [('type', 'threading')], ['thread-count', 'peak-thread-count', 'daemon-thread-count'], []),
+    ('io_workers', [('subsystem', 'io'), ('worker', '*')],
+     ['io-thread-count', 'task-core-threads', 'task-max-threads', 'core-pool-size', 'max-pool-size', 'busy-task-thread-count', 'queue-size'], ['worker']),
+    ('listeners', [('subsystem', 'undertow'), ('server', '*'), ('http-listener', '*')],
+     ['request-count', 'error-count', 'processing-time', 'max-processing-time', 'bytes-received', 'bytes-sent'], ['server', 'http-listener']),
+    ('datasources', [('subsystem', 'datasources'), ('data-source', '*'), ('statistics', 'pool')],
+     ['ActiveCount', 'AvailableCount', 'InUseCount', 'MaxUsedCount', 'WaitCount', 'TimedOut', 'AverageBlockingTime', 'MaxWaitTime'], ['data-source']),
+]
+
+def serverAddress(host):
+    return [('host', host), ('server', '*')]
+
+def readRuntimeMetrics(data, host='*', group=None, servers=None):
+    '''heap and non-heap usage, GC counts and times, threads, IO workers, http listeners and datasource pools of every
+    running server of host, in one composite of wildcard include-runtime reads
+
+    servers are names or host/name entries; a section the profile of a server does not have is left out, a section
+    that could not be read is listed under unavailable'''
+    steps = [dmrOperation(serverAddress(host), 'read-resource', {"attributes-only": True, "include-runtime": True})]
+    steps += [dmrOperation(serverAddress(host) + address, 'read-resource', {"attributes-only": True, "include-runtime": True})
+              for section, address, attributes, naming in SECTIONS]
+    response = jbossOperation(data, dmrComposite(steps))
+    results = response.get('result') or {}
+    first = results.get('step-1') or {}
+    if not isSuccess(first):
+        raise JBossOperationFailed('Could not read the servers: {}'.format(failureDescription(first) or failureDescription(response)))
+    metrics = {}
+    for entry in first.get('result') or []:
+        pairs = dict(addressPairs(entry['address']))
+        name = '{}/{}'.format(pairs['host'], pairs['server'])
+        result = entry.get('result') or {}
+        if group is not None and result.get('server-group') != group:
+            continue
+        if servers and not any(name == server or name.endswith('/' + server) for server in servers):
+            continue
+        metrics[name] = {"server-group": result.get('server-group'), "server-state": result.get('server-state')}
+    unavailable = []
+    for i, (section, address, attributes, naming) in enumerate(SECTIONS):
+        step = results.get('step-{}'.format(i + 2)) or {}
+        if not isSuccess(step):
+            unavailable.append(section)
+            continue
+        for entry in step.get('result') or []:
+            pairs = addressPairs(entry['address'])
+            server = metrics.get('{}/{}'.format(pairs[0][1], pairs[1][1]))
+            if server is None:
+                continue
+            result = entry.get('result') or {}
+            values = dict((attribute, result.get(attribute)) for attribute in attributes if attribute in result)
+            if naming:
+                names = dict(pairs[2:])
+                server.setdefault(section, {})['/'.join(names[kind] for kind in naming)] = values
+            else:
+                server[section] = values
+    return {"collected": int(time.time()), "servers": metrics, "unavailable": unavailable}
+
+def metricsRows(metrics):
+    '''one (server, section, entry, attribute, value) row for every measured value, memory usages split into init, used, committed and max'''
+    rows = []
+    for server, sections in sorted(metrics['servers'].items()):
+        for section, values in sorted(sections.items()):
+            if not isinstance(values, dict):
+                continue
+            entries = sorted(values.items()) if section not in ('memory', 'threads') else [('', values)]
+            for entry, attributes in entries:
+                for attribute, value in sorted(attributes.items()):
+                    if isinstance(value, dict):
+                        rows += [(server, section, entry, '{}.{}'.format(attribute, key), value[key]) for key in sorted(value)]
+                    else:
+                        rows.append((server, section, entry, attribute, value))
+    return rows
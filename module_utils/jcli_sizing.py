@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+
+import re
+
+# garbage collectors of -XX:+Use<name>GC
+GCS = ['G1', 'Parallel', 'Serial', 'Shenandoah', 'Z']
+
+# permgen options, ignored since Java 8 and refused by the JVMs after it
+OBSOLETE = ['PermSize', 'MaxPermSize']
+
+# smallest heap a server is sized to, below it the host runs too many servers for its memory
+MIN_HEAP_MB = 256
+
+def physicalMemoryMb(meminfo='/proc/meminfo'):
+    '''MemTotal of the machine in megabytes'''
+    with open(meminfo) as f:
+        for line in f:
+            if line.startswith('MemTotal:'):
+                return int(line.split()[1]) // 1024
+    raise ValueError('No MemTotal in {}'.format(meminfo))
+
+def roundMb(value, unit=16):
+    return int(value) // unit * unit
+
+def jvmSizing(memoryMb, servers, reserveRatio=0.25):
+    '''heap and metaspace of each of servers JVMs sharing memoryMb, of which reserveRatio is left to the system and the host controller
+
+    an eighth of the share of a server goes to metaspace, between 128m and 512m, and three quarters of the rest to the
+    heap, the last quarter is for thread stacks, the code cache and direct buffers'''
+    share = memoryMb * (1 - reserveRatio) / max(servers, 1)
+    maxMetaspace = roundMb(min(512, max(128, share / 8)))
+    heap = roundMb((share - maxMetaspace) * 3 / 4)
+    if heap < MIN_HEAP_MB:
+        raise ValueError('{}m of memory, {:.0%} reserved, leave {}m of heap to each of {} servers, less than {}m'.format(
+            memoryMb, reserveRatio, max(heap, 0), servers, MIN_HEAP_MB))
+    return {
+        "memory_mb": memoryMb,
+        "servers": servers,
+        "reserve_ratio": reserveRatio,
+        "heap-size": '{}m'.format(heap),
+        "max-heap-size": '{}m'.format(heap),
+        "metaspace-size": '{}m'.format(roundMb(maxMetaspace / 2)),
+        "max-metaspace-size": '{}m'.format(maxMetaspace),
+    }
+
+def sizingOptions(sizing, gc):
+    '''-XX options for the metaspace of a sizing and the garbage collector'''
+    return [
+        '-XX:MetaspaceSize={}'.format(sizing['metaspace-size']),
+        '-XX:MaxMetaspaceSize={}'.format(sizing['max-metaspace-size']),
+        '-XX:+Use{}GC'.format(gc),
+    ]
+
+def optionKey(option):
+    '''what an option sets, options with the same key replace each other: every -XX:+Use...GC selects the collector'''
+    if re.match(r'-XX:[+-]Use\w+GC$', option):
+        return 'gc'
+    match = re.match(r'-XX:[+-]?(\w+)', option)
+    return match.group(1) if match else option
+
+def mergeJvmOptions(current, wanted):
+    '''current options with those setting what wanted sets, and the permgen ones, replaced by wanted, in their order'''
+    keys = set(optionKey(option) for option in wanted) | set(OBSOLETE)
+    return [option for option in current or [] if optionKey(option) not in keys] + list(wanted)
+
+def cpuCount():
+    try:
+        import multiprocessing
+        return multiprocessing.cpu_count()
+    except (ImportError, NotImplementedError):
+        return 1
+
+def webPreset(cpus):
+    '''IO worker and buffer pool for cpus cores: two IO threads per core and sixteen blocking task threads per core, as
+    undertow sizes them itself, with 16k direct buffers'''
+    return {
+        "io_threads": 2 * cpus,
+        "task_max_threads": 16 * cpus,
+        "buffer_size": 16384,
+        "direct_buffers": True,
+    }
@@ -0,0 +1,48 @@
+# -*- coding: utf-8 -*-
+
+import threading
+import time
+
+# kinds of events: spawn and connect of a jboss-cli, connect and authenticate of the http
+# transport, operation, command, upload, and every check of a wait
+_events = []
+_lock = threading.Lock()
+_started = time.time()
+
+def record(kind, seconds, **details):
+    event = {"kind": kind, "seconds": round(seconds, 4)}
+    event.update(details)
+    with _lock:
+        _events.append(event)
+
+class timed(object):
+    '''records the duration of a with block as an event of kind'''
+
+    def __init__(self, kind, **details):
+        self.kind = kind
+        self.details = details
+
+    def __enter__(self):
+        self.started = time.time()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.kind, time.time() - self.started, **self.details)
+        return False
+
+def metricsReport():
+    '''every event recorded by the module run, their count and time per kind, and the duration of the run'''
+    with _lock:
+        events = list(_events)
+    totals = {}
+    for event in events:
+        total = totals.setdefault(event['kind'], {"count": 0, "seconds": 0})
+        total['count'] += 1
+        total['seconds'] = round(total['seconds'] + event['seconds'], 4)
+    return {"seconds": round(time.time() - _started, 4), "totals": totals, "events": events}
+
+def resetMetrics():
+    global _started
+    with _lock:
+        del _events[:]
+        _started = time.time()
@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+try:
+    from ansible.module_utils.jcli import jbossOperation, jbossRead, JBossConnetionError, JBossOperationFailed, JBossTimeout
+    from ansible.module_utils.jcli_dmr import dmrComposite, dmrOperation
+    from ansible.module_utils.jcli_model import addressPairs
+    from ansible.module_utils.jcli_timing import record
+except ImportError:
+    from jcli import jbossOperation, jbossRead, JBossConnetionError, JBossOperationFailed, JBossTimeout
+    from jcli_dmr import dmrComposite, dmrOperation
+    from jcli_model import addressPairs
+    from jcli_timing import record
+
+# statuses of a server-config once it is down
+STOPPED = ['STOPPED', 'DISABLED']
+
+# a blocking operation is answered once the controller is done with it, its answer is awaited this long past the deadline
+BLOCKING_GRACE = 30
+
+def remaining(deadline):
+    '''seconds left until deadline, never less than 0'''
+    return max(0, deadline - time.time())
+
+def blockingOperation(data, address, operation, deadline):
+    '''start, stop, restart or reload of a server, or of the servers of a group, answered once they are done when data
+    asks to wait
+
+    a stop suspends the servers gracefully until deadline at most, an answer not received BLOCKING_GRACE seconds past
+    deadline raises JBossTimeout'''
+    if not data['wait']:
+        return jbossOperation(data, dmrOperation(address, operation))
+    params = {"blocking": True}
+    if operation in ('stop', 'stop-servers'):
+        params['timeout'] = int(remaining(deadline))
+    return jbossOperation(data, dmrOperation(address, operation, params), remaining(deadline) + BLOCKING_GRACE)
+
+def waitFor(check, timeout, what, delay=0.25, maxDelay=5):
+    '''calls check until it reports done, sleeping twice as long after every try but never past the deadline
+
+    check returns (done, state), state is kept for the report; returns the state and the number of tries'''
+    deadline = time.time() + timeout
+    tries = 0
+    while True:
+        tries += 1
+        started = time.time()
+        done, state = check()
+        checked = time.time() - started
+        if done:
+            record('wait', checked, what=what, check=tries, sleep=0)
+            return state, tries
+        left = deadline - time.time()
+        if left <= 0:
+            record('wait', checked, what=what, check=tries, sleep=0)
+            error = JBossTimeout('{} not reached after {}s and {} checks, last state: {}'.format(what, timeout, tries, state))
+            error.state = state
+            raise error
+        time.sleep(min(delay, left))
+        record('wait', checked + min(delay, left), what=what, check=tries, sleep=min(delay, left))
+        delay = min(delay * 2, maxDelay)
+
+def serverStatus(data, host, server):
+    '''status attribute of a server-config: STARTED, STARTING, STOPPED, STOPPING, FAILED or DISABLED'''
+    return jbossRead(data, dmrOperation([('host', host), ('server-config', server)], 'read-attribute', {"name": "status"}))
+
+def waitForServerStatus(data, host, server, statuses, timeout):
+    def check():
+        status = serverStatus(data, host, server)
+        return status in statuses, status
+    return waitFor(check, timeout, 'Status {} of server {}/{}'.format('/'.join(statuses), host, server))
+
+def waitForHost(data, host, timeout):
+    '''host controller running again after a reload, it does not answer while it restarts'''
+    def check():
+        try:
+            state = jbossRead(data, dmrOperation([('host', host)], 'read-attribute', {"name": "host-state"}))
+        except JBossConnetionError as e:
+            return False, str(e)
+        return state == 'running', state
+    return waitFor(check, timeout, 'Running state of host {}'.format(host))
+
+def readHostStates(data, host='*'):
+    '''host-state of every host controller matched by host: running, reload-required or restart-required'''
+    response = jbossOperation(data, dmrOperation([('host', host)], 'read-attribute', {"name": "host-state"}))
+    if response.get('outcome') != 'success':
+        raise JBossOperationFailed('Could not read the host states: {}'.format(response.get('failure-description')))
+    result = response.get('result')
+    if not isinstance(result, list):
+        return {host: result}
+    return dict((dict(addressPairs(entry['address']))['host'], entry.get('result')) for entry in result)
+
+def readServerReadiness(data, host='*'):
+    '''group, status, server-state and runtime-configuration-state of every server of host, in one composite of
+    two wildcard reads: a stopped server has a server-config but no running server resource'''
+    steps = [
+        dmrOperation([('host', host), ('server-config', '*')], 'read-resource', {"attributes-only": True, "include-runtime": True}),
+        dmrOperation([('host', host), ('server', '*')], 'read-resource', {"attributes-only": True, "include-runtime": True}),
+    ]
+    response = jbossOperation(data, dmrComposite(steps))
+    if response.get('outcome') != 'success':
+        raise JBossOperationFailed('Could not read the server states: {}'.format(response.get('failure-description')))
+    servers = {}
+    for entry in response['result']['step-1'].get('result') or []:
+        pairs = dict(addressPairs(entry['address']))
+        result = entry.get('result') or {}
+        servers["{}/{}".format(pairs['host'], pairs['server-config'])] = {
+            "group": result.get('group'),
+            "status": result.get('status'),
+            "server-state": None,
+            "runtime-configuration-state": None,
+        }
+    for entry in response['result']['step-2'].get('result') or []:
+        pairs = dict(addressPairs(entry['address']))
+        result = entry.get('result') or {}
+        server = servers.get("{}/{}".format(pairs['host'], pairs['server']))
+        if server is not None:
+            server['server-state'] = result.get('server-state')
+            server['runtime-configuration-state'] = result.get('runtime-configuration-state')
+    return servers
+
+def isServerReady(server, state):
+    '''started: running with its configuration applied, neither starting nor waiting for a reload or restart'''
+    if state == 'stopped':
+        return server['status'] in STOPPED
+    return (server['status'] == 'STARTED'
+            and str(server['server-state']).lower() == 'running'
+            and server['runtime-configuration-state'] in (None, 'ok'))
+
+def waitForServers(data, state, timeout, host='*', group=None, servers=None):
+    '''every selected server started or stopped, all of them checked with one read per try
+
+    servers are names or host/name entries; returns the selected servers and the number of tries, the
+    JBossTimeout raised at the deadline has the lagging servers as its state'''
+    def check():
+        current = readServerReadiness(data, host)
+        selected = {}
+        for name, server in current.items():
+            if group is None or server['group'] == group:
+                selected[name] = server
+        if servers:
+            wanted = {}
+            for name in servers:
+                matches = [key for key in selected if key == name or key.endswith('/' + name)]
+                for key in matches:
+                    wanted[key] = selected[key]
+                if not matches:
+                    wanted[name] = {"group": None, "status": 'MISSING', "server-state": None, "runtime-configuration-state": None}
+            selected = wanted
+        lagging = dict((name, server) for name, server in selected.items() if not isServerReady(server, state))
+        return not lagging, lagging if lagging else selected
+    what = 'State {} of the servers{}{}'.format(state, ' of group ' + group if group else '', ' on host ' + host if host != '*' else '')
+    return waitFor(check, timeout, what)
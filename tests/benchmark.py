@@ -0,0 +1,168 @@
+# -*- coding: utf-8 -*-
+'''Runs the state paths of the jcli modules at scale against the fakes and reports their cost.
+
+    python tests/benchmark.py [--servers 200] [--groups 20] [--latency 0.005] [--startup 0.5]
+
+Every task is a separate python process, as under Ansible, so the start of the interpreter, of
+jboss-cli and the authentication are paid per task like in a play. The http scenarios run against
+FakeManagementServer answering from a FakeDomain, the cli scenarios against fake_cli. The report
+lists the wall time, the management round trips and the jboss-cli spawns of every scenario.'''
+
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+TESTS = os.path.dirname(os.path.abspath(__file__))
+ROLE = os.path.dirname(TESTS)
+sys.path.insert(0, TESTS)
+sys.path.insert(0, os.path.join(ROLE, 'module_utils'))
+
+from fake_cli import commands, fakeJbossHome, spawns
+from fake_domain import FakeDomain
+from fake_management import FakeManagementServer
+from jcli_daemon import JBossDaemon
+
+HOSTS = ('master', 'slave')
+
+# runs library/<module>.py like Ansible does, with the module_utils of the role
+RUNNER = ("import sys, runpy, ansible.module_utils; ansible.module_utils.__path__.append(sys.argv.pop(1)); "
+          "runpy.run_path(sys.argv.pop(1), run_name='__main__')")
+
+def runModule(module, args, env=None):
+    '''result of one task'''
+    with tempfile.NamedTemporaryFile('w', suffix='.json') as argsFile:
+        json.dump({"ANSIBLE_MODULE_ARGS": args}, argsFile)
+        argsFile.flush()
+        process = subprocess.Popen([sys.executable, '-c', RUNNER, os.path.join(ROLE, 'module_utils'),
+                                    os.path.join(ROLE, 'library', module + '.py'), argsFile.name],
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE, env=env)
+        out, err = process.communicate()
+    try:
+        return json.loads(out.decode('utf-8'))
+    except ValueError:
+        return {"failed": True, "msg": (out + err).decode('utf-8', 'replace')[-2000:]}
+
+class Scenario(object):
+    '''tasks run one after the other, an args of a task may be a function of the result of the task before'''
+
+    def __init__(self, name, tasks):
+        self.name = name
+        self.tasks = tasks
+
+    def run(self, connection, env=None):
+        report = {"scenario": self.name, "tasks": len(self.tasks), "changed": 0, "failed": 0}
+        started = time.time()
+        result = {}
+        for module, args in self.tasks:
+            if callable(args):
+                args = args(result)
+            result = runModule(module, dict(connection, **args), env)
+            report['changed'] += 1 if result.get('changed') else 0
+            report['failed'] += 1 if result.get('failed') else 0
+        report['seconds'] = round(time.time() - started, 3)
+        report['last'] = result
+        return report
+
+def httpScenarios(servers, groups, artifactDir):
+    # populated round robin on the hosts of the domain
+    existing = ['{}/server-{}'.format(HOSTS[i % len(HOSTS)], i) for i in range(servers)]
+    added = ['bench-{}'.format(i) for i in range(servers)]
+    groupNames = ['group-{}'.format(i) for i in range(groups)]
+    def addServer(name, **args):
+        return ('jcli_server', dict({"server_config_name": name, "server_group_name": 'group-0', "server_group_socket": 'full-sockets',
+                                     "server_socket_binding_port_offset": 1000, "state": 'present'}, **args))
+    pools = {"profile": 'full', "min_pool_size": 10, "max_pool_size": 100, "pool_prefill": True, "prepared_statements_cache_size": 64}
+    def withFacts(name):
+        return lambda facts: addServer(name, model=facts['ansible_facts']['jcli_model'])[1]
+    return [
+        (Scenario('server group present', [('jcli_servergroup', {"server_group_name": 'bench-group-{}'.format(i)}) for i in range(groups)]), None),
+        (Scenario('server present', [addServer(name) for name in added]), None),
+        (Scenario('server present, unchanged', [addServer(name) for name in added]), None),
+        (Scenario('servers present, count, one task', [('jcli_server', {"server_config_name": 'bulk', "count": servers, "server_group_name": 'group-0',
+                                                                        "jvm_name": 'default', "heap_size": '512m'})]), None),
+        (Scenario('server present, unchanged, from jcli_facts', [('jcli_facts', {"server_states": False})] +
+                  [('jcli_server', withFacts(name)) for name in added]), None),
+        (Scenario('start every server, one task', [('jcli_server', {"servers": existing, "state": 'start', "wait": True})]), None),
+        (Scenario('wait for the started servers', [('jcli_wait', {"servers": existing, "state": 'started', "timeout": 10})]), None),
+        (Scenario('jvm of every server, one reload handler', [('jcli_jvm', {"server_config_name": name.split('/')[1], "host": name.split('/')[0],
+                                                                           "jvm_name": 'default', "auto_size": True, "memory_mb": 32768})
+                                                                  for name in existing] +
+                  [('jcli_reload', {})]), None),
+        (Scenario('runtime metrics of every server, one task', [('jcli_metrics', {})]), None),
+        (Scenario('pools of every datasource, one task', [('jcli_datasource', pools)]), None),
+        (Scenario('pools of every datasource, unchanged', [('jcli_datasource', pools)]), None),
+        (Scenario('web tuning from the cpu preset', [('jcli_web_tuning', {"profile": 'full', "preset": 'cpu', "max_connections": 2000})]), None),
+        (Scenario('web tuning from the cpu preset, unchanged', [('jcli_web_tuning', {"profile": 'full', "preset": 'cpu', "max_connections": 2000})]), None),
+        (Scenario('restart every server group, one task', [('jcli_servergroup', {"server_groups": groupNames, "state": 'restart'})]), None),
+        (Scenario('deploy to every server group', [('jcli_deploy', {"artifact": 'app.war', "artifact_dir": artifactDir,
+                                                                     "server_group_name": groupNames, "server_mode": 'domain'})]), None),
+        (Scenario('stop and remove servers, one task', [('jcli_server', {"servers": added, "state": 'absent'})]), None),
+        (Scenario('start-servers failing with WFLYDC0074', [('jcli_servergroup', {"server_group_name": 'group-0', "state": 'start'})]),
+         {"start-servers": 'WFLYDC0074'}),
+    ]
+
+def cliScenarios(servers):
+    names = ['server-{}'.format(i) for i in range(servers)]
+    start = [('jcli_server', {"server_config_name": name, "state": 'start'}) for name in names]
+    return [
+        (Scenario('cli: start, one task per server', start), {}, False),
+        (Scenario('cli: start, one task per server, daemon', start), {}, True),
+        (Scenario('cli: start of a missing server (WFLYCTL0216)', start[:1]), {"failures": {"query": 'WFLYCTL0216'}}, False),
+        (Scenario('cli: unreachable controller (WFLYPRT0053)', start[:1]), {"connectError": True}, False),
+    ]
+
+def benchmark(servers=200, groups=20, latency=0.005, startup=0.5):
+    '''report of every scenario'''
+    reports = []
+    workdir = tempfile.mkdtemp(prefix='jcli-benchmark-')
+    try:
+        with open(os.path.join(workdir, 'app.war'), 'wb') as f:
+            f.write(os.urandom(256 * 1024))
+        domain = FakeDomain(hosts=HOSTS).populate(groups, servers)
+        with FakeManagementServer(domain, latency=latency) as server:
+            for scenario, failures in httpScenarios(servers, groups, workdir):
+                domain.failures = failures or {}
+                before = len(server.requests)
+                connections = server.connections
+                report = scenario.run(server.data())
+                report.update({"transport": 'http', "round_trips": len(server.requests) - before,
+                               "connections": server.connections - connections, "spawns": 0})
+                reports.append(report)
+            domain.failures = {}
+        for number, (scenario, cli, daemon) in enumerate(cliScenarios(servers)):
+            home = fakeJbossHome(os.path.join(workdir, 'cli-{}'.format(number)), startup=startup, latency=latency, **cli)
+            env = dict(os.environ, JCLI_DAEMON_SOCKET=os.path.join(workdir, 'daemon-{}.sock'.format(number)))
+            jcliDaemon = None
+            if daemon:
+                jcliDaemon = JBossDaemon(env['JCLI_DAEMON_SOCKET'], 60)
+                threading.Thread(target=jcliDaemon.run).start()
+            try:
+                report = scenario.run({"jboss_home": home, "user": 'admin', "password": 'nimda'}, env)
+            finally:
+                if jcliDaemon is not None:
+                    jcliDaemon.shutdown()
+            report.update({"transport": 'cli', "round_trips": commands(home), "spawns": spawns(home)})
+            reports.append(report)
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+    return reports
+
+def printReport(reports):
+    print('{:<55} {:>9} {:>6} {:>7} {:>6} {:>9} {:>11} {:>7}'.format('scenario', 'transport', 'tasks', 'changed', 'failed', 'seconds', 'round trips', 'spawns'))
+    for report in reports:
+        print('{scenario:<55} {transport:>9} {tasks:>6} {changed:>7} {failed:>6} {seconds:>9.2f} {round_trips:>11} {spawns:>7}'.format(**report))
+
+def main(args):
+    options = {"servers": 200, "groups": 20, "latency": 0.005, "startup": 0.5}
+    while args:
+        name = args.pop(0).lstrip('-')
+        options[name] = type(options[name])(args.pop(0))
+    printReport(benchmark(**options))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
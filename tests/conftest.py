@@ -0,0 +1,5 @@
+import os
+import sys
+
+# module_utils are plain python modules, ansible maps them to ansible.module_utils
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'module_utils'))
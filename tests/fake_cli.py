@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+'''Stand-in for bin/jboss-cli.sh of a WildFly installation, answering every operation with a success.
+
+The behaviour is read from fake-cli.json in jboss_home: startup and latency in seconds, connect_error
+to fail like an unreachable controller, and failures mapping operation names to failure codes.'''
+
+import json
+import os
+import re
+import sys
+import time
+
+SCRIPT = '''#!/bin/sh
+exec "{python}" "{main}" "$0" "$@"
+'''
+
+FAILURES = {
+    "WFLYCTL0216": "WFLYCTL0216: Management resource not found",
+    "WFLYDC0074": "WFLYDC0074: Operation failed or was rolled back on all servers.",
+}
+
+CONNECT_ERROR = ('Failed to connect to the controller: The controller is not available at localhost:9990: '
+                 'java.net.ConnectException: WFLYPRT0053: Could not connect to remote+http://localhost:9990. '
+                 'The connection failed: Connection refused\n')
+
+def fakeJbossHome(root, startup=0, latency=0, connectError=False, failures=None):
+    '''jboss_home whose jboss-cli.sh runs this module, every start of the cli is counted in spawns'''
+    root = str(root)
+    if not os.path.isdir(os.path.join(root, 'bin')):
+        os.makedirs(os.path.join(root, 'bin'))
+    with open(os.path.join(root, 'bin', 'jboss-cli.sh'), 'w') as f:
+        f.write(SCRIPT.format(python=sys.executable, main=os.path.abspath(__file__)))
+    with open(os.path.join(root, 'fake-cli.json'), 'w') as f:
+        json.dump({"startup": startup, "latency": latency, "connect_error": connectError, "failures": failures or {}}, f)
+    return root
+
+def spawns(root):
+    try:
+        with open(os.path.join(str(root), 'spawns')) as f:
+            return len(f.readlines())
+    except IOError:
+        return 0
+
+def commands(root):
+    '''operations and commands answered by every cli started so far'''
+    try:
+        with open(os.path.join(str(root), 'commands')) as f:
+            return len(f.readlines())
+    except IOError:
+        return 0
+
+def answer(command, config):
+    operation = re.search(r':([\w-]+)', command)
+    name = operation.group(1) if operation else command.split(' ')[0]
+    if name in config['failures']:
+        return json.dumps({"outcome": "failed", "failure-description": FAILURES[config['failures'][name]], "rolled-back": True}, indent=4)
+    if operation is None:
+        # commands such as deploy print nothing when they succeed
+        return None
+    return json.dumps({"outcome": "success", "result": command}, indent=4)
+
+def main(script, args):
+    root = os.path.dirname(os.path.dirname(os.path.abspath(script)))
+    with open(os.path.join(root, 'fake-cli.json')) as f:
+        config = json.load(f)
+    with open(os.path.join(root, 'spawns'), 'a') as f:
+        f.write(' '.join(args) + '\n')
+    time.sleep(config['startup'])
+    if config['connect_error']:
+        sys.stdout.write(CONNECT_ERROR)
+        return
+    for line in iter(sys.stdin.readline, ''):
+        command = line.strip()
+        if command == 'quit':
+            break
+        if command.startswith('echo '):
+            sys.stdout.write(command[len('echo '):] + '\n')
+        elif command:
+            time.sleep(config['latency'])
+            with open(os.path.join(root, 'commands'), 'a') as f:
+                f.write(command + '\n')
+            output = answer(command, config)
+            if output is not None:
+                sys.stdout.write(output + '\n')
+            if output is not None and '"failed"' in output:
+                # a non interactive cli exits on the first failed command
+                sys.stdout.flush()
+                return
+        sys.stdout.flush()
+
+if __name__ == '__main__':
+    main(sys.argv[1], sys.argv[2:])
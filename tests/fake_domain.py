@@ -0,0 +1,323 @@
+# -*- coding: utf-8 -*-
+'''Managed domain kept in memory, a responder for FakeManagementServer that answers the operations of the jcli modules.'''
+
+import base64
+import hashlib
+import threading
+
+NOT_FOUND = "WFLYCTL0216: Management resource '{}' not found"
+
+# failure-descriptions injected with FakeDomain(failures={operation: code})
+FAILURES = {
+    "WFLYCTL0216": "WFLYCTL0216: Management resource not found",
+    "WFLYDC0074": "WFLYDC0074: Operation failed or was rolled back on all servers.",
+}
+
+def usage(used, maximum):
+    return {"init": maximum // 4, "used": used, "committed": maximum // 2, "max": maximum}
+
+# runtime resources of every running server
+RUNTIME = {
+    "core-service": {"platform-mbean": {"type": {
+        "memory": {"heap-memory-usage": usage(300 << 20, 1 << 30), "non-heap-memory-usage": usage(120 << 20, 256 << 20)},
+        "garbage-collector": {"name": {"G1_Young_Generation": {"collection-count": 42, "collection-time": 310},
+                                       "G1_Old_Generation": {"collection-count": 0, "collection-time": 0}}},
+        "threading": {"thread-count": 120, "peak-thread-count": 140, "daemon-thread-count": 80},
+    }}},
+    "subsystem": {
+        "io": {"worker": {"default": {"io-thread-count": 8, "task-max-threads": 64, "busy-task-thread-count": 5, "queue-size": 0}}},
+        "undertow": {"server": {"default-server": {"http-listener": {"default": {"request-count": 1000, "error-count": 2, "processing-time": 5000}}}}},
+        "datasources": {"data-source": {"ExampleDS": {"statistics": {"pool": {"ActiveCount": 10, "AvailableCount": 10, "InUseCount": 3,
+                                                                               "MaxUsedCount": 7, "WaitCount": 0}}}}},
+    },
+}
+
+def isChildren(value):
+    '''a map of child resources by name, as opposed to an attribute'''
+    return isinstance(value, dict) and all(isinstance(child, dict) for child in value.values())
+
+def path(address):
+    return ''.join('/{}={}'.format(k, v) for k, v in address) or '/'
+
+def success(result=None):
+    return {"outcome": "success", "result": result}
+
+def failed(description):
+    return {"outcome": "failed", "failure-description": description, "rolled-back": True}
+
+class FakeDomain(object):
+    '''server groups, server-configs with their jvms and status, and deployments
+
+    failures maps operation names to one of the codes of FAILURES, every such operation fails with it, deploymentStatus
+    maps server groups to the status their running servers report for the deployments of the group, OK otherwise'''
+
+    def __init__(self, hosts=('master',), failures=None, deploymentStatus=None):
+        self.lock = threading.Lock()
+        self.failures = failures or {}
+        self.deploymentStatus = deploymentStatus or {}
+        self.operations = []
+        self.model = {"server-group": {}, "deployment": {}, "profile": {},
+                      "host": dict((host, {"host-state": "running", "server-config": {}}) for host in hosts)}
+
+    def populate(self, groups, servers, group=None):
+        '''groups server groups and servers server-configs spread over the hosts and groups, all stopped'''
+        names = ['group-{}'.format(i) for i in range(groups)]
+        datasource = {"jndi-name": None, "min-pool-size": 0, "max-pool-size": 20, "pool-prefill": False, "validate-on-match": False,
+                      "prepared-statements-cache-size": 0}
+        self.model['profile']['full'] = {"subsystem": {"datasources": {
+            "data-source": dict((name, dict(datasource, **{"jndi-name": 'java:jboss/datasources/' + name})) for name in ('ExampleDS', 'OrdersDS')),
+            "xa-data-source": {}},
+            "io": {"worker": {"default": {"io-threads": None, "task-max-threads": None, "task-keepalive": 60000, "stack-size": 0}},
+                   "buffer-pool": {"default": {"buffer-size": None, "buffers-per-slice": None, "direct-buffers": None}}},
+            "undertow": {"server": {"default-server": {"http-listener": {"default": {"max-connections": None, "max-post-size": 10485760,
+                                                                                     "no-request-timeout": 60000, "tcp-backlog": None}}}}}}}
+        for name in names:
+            self.model['server-group'][name] = {"profile": "full", "socket-binding-group": "full-sockets", "deployment": {}}
+        hosts = sorted(self.model['host'])
+        for i in range(servers):
+            configs = self.model['host'][hosts[i % len(hosts)]]['server-config']
+            configs['server-{}'.format(i)] = {"group": group or names[i % len(names)], "socket-binding-port-offset": 100 * i,
+                                              "status": "STOPPED", "jvm": {}}
+        return self
+
+    def __call__(self, op):
+        with self.lock:
+            self.operations.append(op)
+            return self.execute(op)
+
+    def execute(self, op):
+        name = op['operation']
+        if name in self.failures:
+            return failed(FAILURES[self.failures[name]])
+        if name == 'composite':
+            results = {}
+            # the streams attached to a composite are those of its steps
+            streams = dict((key, op[key]) for key in ('input-streams',) if key in op)
+            for i, step in enumerate(op['steps'], 1):
+                results['step-{}'.format(i)] = self.execute(dict(step, **streams))
+                if results['step-{}'.format(i)]['outcome'] != 'success':
+                    return {"outcome": "failed", "result": results, "rolled-back": True,
+                            "failure-description": {"WFLYCTL0062: Composite operation failed and was rolled back. Steps that failed:":
+                                                    {"Operation step-{}".format(i): results['step-{}'.format(i)]['failure-description']}}}
+            return success(results)
+        address = [list(step.items())[0] for step in op['address']]
+        handler = getattr(self, 'op_' + name.replace('-', '_'), None)
+        if handler is None:
+            return success()
+        if any(value == '*' for key, value in address):
+            matches = self.expand(address)
+            return success([{"address": [{k: v} for k, v in match], "outcome": "success",
+                             "result": handler(match, op)['result']} for match in matches])
+        return handler(address, op)
+
+    def expand(self, address):
+        '''concrete addresses of the existing resources matched by a wildcard address'''
+        found = [[]]
+        for key, value in address:
+            nextFound = []
+            for prefix in found:
+                children = self.children(prefix, key)
+                names = sorted(children) if value == '*' else [value] if value in children else []
+                nextFound += [prefix + [(key, name)] for name in names]
+            found = nextFound
+        return found
+
+    def children(self, address, key):
+        if key == 'server' and address and address[-1][0] == 'host':
+            # running servers are the started server-configs
+            configs = self.model['host'][address[-1][1]]['server-config']
+            return dict((name, config) for name, config in configs.items() if config['status'] != 'STOPPED')
+        node = self.get(address)
+        return (node or {}).get(key) or {}
+
+    def get(self, address):
+        node = self.model
+        for key, value in address:
+            if key == 'server' and node.get('server-config', {}).get(value):
+                node = self.serverView(node['server-config'][value])
+                continue
+            node = (node.get(key) or {}).get(value)
+            if node is None:
+                return None
+        return node
+
+    def serverView(self, config):
+        state = (config.get('pending') or "running") if config['status'] == 'STARTED' else "STOPPED"
+        deployments = (self.model['server-group'].get(config['group']) or {}).get('deployment') or {}
+        status = self.deploymentStatus.get(config['group'], "OK")
+        view = {"server-group": config['group'], "server-state": state, "runtime-configuration-state": "ok",
+                "deployment": dict((name, {"status": status}) for name in deployments)}
+        view.update(RUNTIME)
+        return view
+
+    def missing(self, address):
+        return failed(NOT_FOUND.format(path(address)))
+
+    def read(self, address, op):
+        node = self.get(address)
+        if node is None:
+            return self.missing(address)
+        if op.get('recursive'):
+            return success(node)
+        return success(dict((k, v) for k, v in node.items() if not isChildren(v)))
+
+    def op_read_resource(self, address, op):
+        return self.read(address, op)
+
+    op_query = op_read_resource
+
+    def op_read_attribute(self, address, op):
+        node = self.get(address)
+        if node is None:
+            return self.missing(address)
+        return success(node.get(op['name']))
+
+    def op_write_attribute(self, address, op):
+        node = self.get(address)
+        if node is None:
+            return self.missing(address)
+        node[op['name']] = op.get('value')
+        return self.changed(address, success())
+
+    def op_undefine_attribute(self, address, op):
+        node = self.get(address)
+        if node is None:
+            return self.missing(address)
+        node.pop(op['name'], None)
+        return self.changed(address, success())
+
+    def op_add_jvm_option(self, address, op):
+        node = self.get(address)
+        if node is None:
+            return self.missing(address)
+        options = node.setdefault('jvm-options', [])
+        if op['jvm-option'] in options:
+            return failed("WFLYHC0071: JVM option {} already exists".format(op['jvm-option']))
+        options.append(op['jvm-option'])
+        return self.changed(address, success())
+
+    def changed(self, address, response):
+        '''a change under the server-config of a started server leaves it restart-required, a change of a profile leaves the
+        started servers of its groups reload-required, as the response reports'''
+        if address and address[0][0] == 'profile':
+            groups = [name for name, group in self.model['server-group'].items() if group.get('profile') == address[0][1]]
+            servers = [(host, name) for host, hostModel in self.model['host'].items() for name, config in hostModel['server-config'].items()
+                       if config['group'] in groups]
+            return self.pending(response, servers, 'reload-required')
+        if len(address) < 3 or address[1][0] != 'server-config':
+            return response
+        return self.pending(response, [(address[0][1], address[1][1])], 'restart-required')
+
+    def pending(self, response, servers, state):
+        headers = {"operation-requires-" + state.split('-')[0]: True, "process-state": state}
+        for host, name in servers:
+            config = self.model['host'][host]['server-config'].get(name)
+            if config is None or config['status'] != 'STARTED':
+                continue
+            config['pending'] = state
+            groupResponse = response.setdefault('server-groups', {}).setdefault(config['group'], {"host": {}})
+            groupResponse['host'].setdefault(host, {})[name] = {"response": {"outcome": "success", "response-headers": headers}}
+        return response
+
+    def op_add(self, address, op):
+        parent = self.get(address[:-1])
+        key, value = address[-1]
+        if parent is None:
+            return self.missing(address[:-1])
+        children = parent.setdefault(key, {})
+        if value in children:
+            return failed("WFLYCTL0212: Duplicate resource {}".format(path(address)))
+        resource = dict((k, v) for k, v in op.items() if k not in ('operation', 'address', 'operation-headers', 'input-streams'))
+        if 'content' in resource:
+            resource['content'] = self.content(op)
+        if key == 'server-config':
+            resource.setdefault('status', 'STOPPED')
+            resource.setdefault('jvm', {})
+        if key == 'server-group':
+            resource.setdefault('deployment', {})
+        children[value] = resource
+        return self.changed(address, success())
+
+    def op_remove(self, address, op):
+        parent = self.get(address[:-1])
+        key, value = address[-1]
+        if parent is None or value not in (parent.get(key) or {}):
+            return self.missing(address)
+        del parent[key][value]
+        return self.changed(address, success())
+
+    def status(self, address, status):
+        config = self.get(address)
+        if config is None:
+            return self.missing(address)
+        config['status'] = status
+        config.pop('pending', None)
+        return success(status)
+
+    def op_start(self, address, op):
+        return self.status(address, 'STARTED')
+
+    op_restart = op_start
+
+    def op_reload(self, address, op):
+        if len(address) == 1:
+            host = self.get(address)
+            if host is None:
+                return self.missing(address)
+            # only a restart of its process clears restart-required
+            if host['host-state'] != 'restart-required':
+                host['host-state'] = 'running'
+            return success()
+        return self.status(address, 'STARTED')
+
+    def op_shutdown(self, address, op):
+        host = self.get(address)
+        if host is None:
+            return self.missing(address)
+        host['host-state'] = 'running' if op.get('restart') else 'stopped'
+        return success()
+
+    def op_stop(self, address, op):
+        return self.status(address, 'STOPPED')
+
+    def groupStatus(self, address, status):
+        if self.get(address) is None:
+            return self.missing(address)
+        for host in self.model['host'].values():
+            for config in host['server-config'].values():
+                if config['group'] == address[0][1]:
+                    config['status'] = status
+                    config.pop('pending', None)
+        return success()
+
+    def op_start_servers(self, address, op):
+        return self.groupStatus(address, 'STARTED')
+
+    op_restart_servers = op_start_servers
+
+    def op_stop_servers(self, address, op):
+        return self.groupStatus(address, 'STOPPED')
+
+    def content(self, op):
+        '''content of a deployment as the repository keeps it, an uploaded stream under its sha1'''
+        content = []
+        for item in op.get('content') or []:
+            if 'input-stream-index' in item:
+                digest = hashlib.sha1(op['input-streams'][item['input-stream-index']]).digest()
+                item = {"hash": {"BYTES_VALUE": base64.b64encode(digest).decode('ascii')}}
+            content.append(item)
+        return content
+
+    def op_full_replace_deployment(self, address, op):
+        self.model['deployment'][op['name']] = {"content": self.content(op), "enabled": op.get('enabled', False)}
+        return success()
+
+    def op_replace_deployment(self, address, op):
+        deployments = (self.get(address) or {}).get('deployment')
+        if deployments is None or op['to-replace'] not in deployments:
+            return self.missing(address + [('deployment', op['to-replace'])])
+        if op['name'] not in self.model['deployment']:
+            return self.missing([('deployment', op['name'])])
+        del deployments[op['to-replace']]
+        deployments[op['name']] = {"enabled": True}
+        return self.changed(address, success())
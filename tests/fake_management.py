@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+'''Local stand-in for the http management endpoint of a WildFly controller.'''
+
+import hashlib
+import json
+import re
+import threading
+import time
+
+try:
+    from http.server import BaseHTTPRequestHandler, HTTPServer
+    from socketserver import ThreadingMixIn
+except ImportError:
+    from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+    from SocketServer import ThreadingMixIn
+
+REALM = 'ManagementRealm'
+NONCE = 'fakenonce'
+
+def md5(text):
+    return hashlib.md5(text.encode('utf-8')).hexdigest()
+
+class FakeManagementHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # the status line, headers and body are written separately
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPRequestHandler.setup(self)
+        self.server.connections += 1
+
+    def log_message(self, format, *args):
+        pass
+
+    def authorized(self, method):
+        header = self.headers.get('Authorization') or ''
+        if not header.startswith('Digest '):
+            return False
+        fields = dict(re.findall(r'(\w+)="?([^",]*)"?', header[len('Digest '):]))
+        ha1 = md5('{}:{}:{}'.format(self.server.user, REALM, self.server.password))
+        ha2 = md5('{}:{}'.format(method, fields.get('uri')))
+        expected = md5('{}:{}:{}:{}:{}:{}'.format(ha1, NONCE, fields.get('nc'), fields.get('cnonce'), fields.get('qop'), ha2))
+        return fields.get('username') == self.server.user and fields.get('response') == expected
+
+    def reply(self, status, body, headers=None):
+        content = body.encode('utf-8')
+        self.send_response(status)
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.send_header('Content-Length', str(len(content)))
+        self.end_headers()
+        self.wfile.write(content)
+
+    def files(self, body):
+        '''content of the files of a multipart body, in their order'''
+        boundary = re.search(r'boundary=(\S+)', self.headers.get('Content-Type')).group(1).encode('utf-8')
+        files = []
+        for part in body.split(b'--' + boundary)[1:-1]:
+            head, content = part.split(b'\r\n\r\n', 1)
+            if b'filename=' in head:
+                files.append(content[:-len(b'\r\n')])
+        return files
+
+    def answer(self, method):
+        length = int(self.headers.get('Content-Length') or 0)
+        body = self.rfile.read(length) if length else b''
+        if not self.authorized(method):
+            challenge = 'Digest realm="{}", domain="/management", nonce="{}", opaque="00", algorithm=MD5, qop="auth"'.format(REALM, NONCE)
+            self.reply(401, 'unauthorized', {'WWW-Authenticate': challenge})
+            return
+        self.server.requests.append((method, self.path, body))
+        if method == 'GET':
+            self.reply(200, json.dumps({"outcome": "success"}))
+            return
+        if self.path == '/management-upload':
+            op = json.loads(re.search(b'\r\n\r\n(\\{.*?\\})\r\n--', body, re.S).group(1).decode('utf-8'))
+            op['input-streams'] = self.files(body)
+        else:
+            op = json.loads(body.decode('utf-8'))
+        response = self.server.respond(op)
+        if response is None:
+            # the operation ran but the connection drops before its answer
+            self.close_connection = True
+            return
+        self.reply(200 if response.get('outcome') == 'success' else 500, json.dumps(response), {'Content-Type': 'application/json'})
+
+    def do_GET(self):
+        self.answer('GET')
+
+    def do_POST(self):
+        self.answer('POST')
+
+class FakeManagementServer(ThreadingMixIn, HTTPServer):
+    '''answers every operation with responder(op), a success with an undefined result by default,
+    after latency seconds; a responder answering None drops the connection instead'''
+
+    daemon_threads = True
+
+    def __init__(self, responder=None, user='admin', password='nimda', latency=0):
+        HTTPServer.__init__(self, ('127.0.0.1', 0), FakeManagementHandler)
+        self.responder = responder
+        self.latency = latency
+        self.user = user
+        self.password = password
+        self.connections = 0
+        self.requests = []
+        self.thread = threading.Thread(target=self.serve_forever)
+        self.thread.daemon = True
+
+    def respond(self, op):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.responder is None:
+            return {"outcome": "success", "result": None}
+        return self.responder(op)
+
+    def data(self, **params):
+        '''module parameters pointing at this server'''
+        data = {"controller_host": '127.0.0.1', "controller_port": self.server_address[1],
+                "user": self.user, "password": self.password, "transport": 'http'}
+        data.update(params)
+        return data
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *args):
+        self.shutdown()
+        self.server_close()
@@ -0,0 +1,27 @@
+import pytest
+
+pytest.importorskip('ansible')
+
+from benchmark import benchmark
+
+def test_benchmark_scenarios():
+    reports = dict((report['scenario'], report) for report in benchmark(servers=2, groups=1, latency=0, startup=0))
+    failing = ('start-servers failing with WFLYDC0074', 'cli: unreachable controller (WFLYPRT0053)')
+    for name, report in reports.items():
+        assert report['failed'] == (1 if name in failing else 0), report['last']
+    assert reports['server present']['changed'] == 2
+    assert reports['server present, unchanged']['changed'] == 0
+    assert reports['pools of every datasource, one task']['round_trips'] == 2
+    assert reports['pools of every datasource, unchanged']['changed'] == 0
+    assert reports['web tuning from the cpu preset']['round_trips'] == 2
+    assert reports['web tuning from the cpu preset, unchanged']['changed'] == 0
+    assert reports['server present, unchanged, from jcli_facts']['round_trips'] == 1
+    assert reports['cli: start of a missing server (WFLYCTL0216)']['changed'] == 0
+    assert reports['cli: start, one task per server']['spawns'] == 2
+    assert reports['cli: start, one task per server, daemon']['spawns'] == 1
+    # one read of the deployment, then the content uploaded once and added to the groups in the same composite
+    deployed = reports['deploy to every server group']
+    assert (deployed['changed'], deployed['round_trips']) == (1, 2)
+    assert deployed['last']['meta']['upload']['bytes'] == 256 * 1024
+    restarted = reports['jvm of every server, one reload handler']['last']['meta']['servers']
+    assert sorted(entry['server'] for entry in restarted) == ['master/server-0', 'slave/server-1']
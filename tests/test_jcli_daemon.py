@@ -0,0 +1,52 @@
+import os
+import threading
+
+import pytest
+
+from fake_cli import fakeJbossHome, spawns
+from jcli import closeSessions, jbossOperation, jbossSession
+from jcli_daemon import JBossDaemon, JBossDaemonSession
+from jcli_dmr import dmrOperation
+
+@pytest.fixture
+def data(tmp_path, monkeypatch):
+    monkeypatch.setenv('JCLI_DAEMON_SOCKET', str(tmp_path / 'jcli.sock'))
+    yield {"jboss_home": fakeJbossHome(tmp_path / 'wildfly'), "controller_host": 'localhost', "controller_port": 9990,
+           "user": 'admin', "password": 'nimda', "transport": 'cli'}
+    closeSessions()
+
+@pytest.fixture
+def daemon(data, tmp_path):
+    server = JBossDaemon(str(tmp_path / 'jcli.sock'), 60)
+    thread = threading.Thread(target=server.run)
+    thread.start()
+    yield server
+    server.shutdown()
+    thread.join()
+
+def test_tasks_share_the_cli_of_the_daemon(data, daemon):
+    for task in range(3):
+        response = jbossOperation(data, dmrOperation([('server-group', 'g{}'.format(task))], 'query'))
+        assert response['result'] == '/server-group=g{}:query'.format(task)
+        assert isinstance(jbossSession(data), JBossDaemonSession)
+        # every module run closes its sessions when it exits
+        closeSessions()
+    assert spawns(data['jboss_home']) == 1
+
+def test_blocking_operation_is_bounded_by_the_command_timeout_of_the_cli(data, daemon):
+    jbossOperation(data, dmrOperation([('server-group', 'g')], 'stop-servers', {"blocking": True}), 12.5)
+    jbossOperation(data, dmrOperation([], 'read-resource'))
+    with open(os.path.join(data['jboss_home'], 'commands')) as f:
+        assert f.read().splitlines() == ['command-timeout set 13', '/server-group=g:stop-servers(blocking=true)',
+                                         'command-timeout reset default', ':read-resource']
+
+def test_without_daemon_the_module_runs_the_cli(data):
+    for task in range(2):
+        jbossOperation(data, dmrOperation([], 'read-resource'))
+        closeSessions()
+    assert spawns(data['jboss_home']) == 2
+
+def test_daemon_stops_when_idle(data, tmp_path):
+    server = JBossDaemon(str(tmp_path / 'jcli.sock'), 0)
+    server.run()
+    assert not (tmp_path / 'jcli.sock').exists()
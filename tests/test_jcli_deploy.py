@@ -0,0 +1,209 @@
+import base64
+import hashlib
+import os
+
+import pytest
+
+pytest.importorskip('ansible')
+
+from benchmark import runModule
+from fake_domain import FakeDomain
+from fake_management import FakeManagementServer
+
+GROUPS = ['group-0', 'group-1', 'group-2']
+
+@pytest.fixture
+def artifactDir(tmp_path):
+    (tmp_path / 'app.war').write_bytes(b'PK\x03\x04version 2')
+    return str(tmp_path)
+
+def startedDomain(**options):
+    '''three server groups of two running servers, server-i on group-(i % 3)'''
+    domain = FakeDomain(hosts=('master', 'slave'), **options).populate(3, 6)
+    for host in domain.model['host'].values():
+        for config in host['server-config'].values():
+            config['status'] = 'STARTED'
+    return domain
+
+def rollout(server, artifactDir, **args):
+    args = dict(dict(artifact='app.war', artifact_dir=artifactDir, server_group_name=GROUPS, server_mode='domain',
+                     rollout_wave_size=1, rollout_timeout=5), **args)
+    return runModule('jcli_deploy', dict(server.data(), **args))
+
+def deployedGroups(domain):
+    return [name for name, group in sorted(domain.model['server-group'].items()) if 'app.war' in group['deployment']]
+
+def test_rollout_adds_the_deployment_wave_by_wave(artifactDir):
+    domain = startedDomain()
+    with FakeManagementServer(domain) as server:
+        result = rollout(server, artifactDir)
+    assert not result.get('failed'), result
+    assert [wave['server_groups'] for wave in result['meta']['waves']] == [['group-0'], ['group-1'], ['group-2']]
+    assert deployedGroups(domain) == GROUPS
+
+def test_failed_wave_rolls_back_the_groups_deployed_so_far(artifactDir):
+    domain = startedDomain(deploymentStatus={"group-1": 'FAILED'})
+    with FakeManagementServer(domain) as server:
+        result = rollout(server, artifactDir)
+    assert result['failed']
+    waves = result['meta']['waves']
+    assert [wave['server_groups'] for wave in waves] == [['group-0'], ['group-1']]
+    assert waves[-1]['failed'] == ['master/server-4', 'slave/server-1']
+    assert waves[-1]['rolled_back'] == ['group-0', 'group-1']
+    assert deployedGroups(domain) == []
+
+def test_wave_not_healthy_in_time_stops_the_rollout(artifactDir):
+    domain = startedDomain(deploymentStatus={"group-0": 'STOPPED'})
+    with FakeManagementServer(domain) as server:
+        result = rollout(server, artifactDir, rollout_timeout=1, rollout_on_failure='stop')
+    assert result['failed']
+    waves = result['meta']['waves']
+    assert len(waves) == 1
+    assert (waves[0]['pending'], waves[0]['failed']) == (['master/server-0', 'slave/server-3'], [])
+    assert 'rolled_back' not in waves[0]
+    assert deployedGroups(domain) == ['group-0']
+
+def runningVersions(domain):
+    return dict((name, sorted(group['deployment'])) for name, group in sorted(domain.model['server-group'].items()))
+
+def versionOf(artifactDir):
+    with open(os.path.join(artifactDir, 'app.war'), 'rb') as f:
+        return 'app.war-' + hashlib.sha1(f.read()).hexdigest()[:12]
+
+def test_content_no_group_runs_is_replaced_by_a_new_version(artifactDir):
+    domain = startedDomain()
+    previous = base64.b64encode(b'\x00' * 20).decode('ascii')
+    domain.model['deployment']['app.war'] = {"content": [{"hash": {"BYTES_VALUE": previous}}], "enabled": False}
+    with FakeManagementServer(domain) as server:
+        result = rollout(server, artifactDir)
+    assert not result.get('failed'), result
+    version = versionOf(artifactDir)
+    assert not [op for op in domain.operations if op['operation'] == 'full-replace-deployment']
+    upload, = [op for op in domain.operations if 'input-streams' in op]
+    assert 'operation-headers' not in upload
+    assert [wave['server_groups'] for wave in result['meta']['waves']] == [['group-0'], ['group-1'], ['group-2']]
+    assert (result['meta']['version'], result['meta']['removed']) == (version, ['app.war'])
+    assert sorted(domain.model['deployment']) == [version]
+    assert domain.model['deployment'][version]['runtime-name'] == 'app.war'
+    assert runningVersions(domain) == dict((group, [version]) for group in GROUPS)
+
+def changeArchive(artifactDir):
+    with open(os.path.join(artifactDir, 'app.war'), 'wb') as f:
+        f.write(b'PK\x03\x04version 3')
+
+def test_changed_archive_replaces_the_running_version_wave_by_wave(artifactDir):
+    domain = startedDomain()
+    with FakeManagementServer(domain) as server:
+        rollout(server, artifactDir)
+        changeArchive(artifactDir)
+        before = len(domain.operations)
+        result = rollout(server, artifactDir)
+        again = rollout(server, artifactDir)
+    assert not result.get('failed'), result
+    version = versionOf(artifactDir)
+    replaced = [op for op in domain.operations[before:] if op['operation'] == 'replace-deployment']
+    assert [(op['address'], op['name'], op['to-replace']) for op in replaced] == [
+        ([{"server-group": group}], version, 'app.war') for group in GROUPS]
+    assert all('rollout-plan' in op['operation-headers'] for op in replaced)
+    assert result['meta']['removed'] == ['app.war']
+    assert sorted(domain.model['deployment']) == [version]
+    assert runningVersions(domain) == dict((group, [version]) for group in GROUPS)
+    assert (again['changed'], again['meta']['version']) == (False, version)
+
+def test_failed_wave_puts_the_moved_groups_back_on_the_running_version(artifactDir):
+    domain = startedDomain()
+    with FakeManagementServer(domain) as server:
+        rollout(server, artifactDir)
+        changeArchive(artifactDir)
+        domain.deploymentStatus['group-1'] = 'FAILED'
+        before = len(domain.operations)
+        result = rollout(server, artifactDir)
+    assert result['failed']
+    version = versionOf(artifactDir)
+    waves = result['meta']['waves']
+    assert [wave['server_groups'] for wave in waves] == [['group-0'], ['group-1']]
+    assert waves[-1]['rolled_back'] == ['group-0', 'group-1']
+    back = [step for op in domain.operations[before:] if op['operation'] == 'composite' and 'operation-headers' not in op
+            for step in op['steps'] if step['operation'] == 'replace-deployment']
+    assert [(step['address'], step['name'], step['to-replace']) for step in back] == [
+        ([{"server-group": group}], 'app.war', version) for group in ('group-0', 'group-1')]
+    assert runningVersions(domain) == dict((group, ['app.war']) for group in GROUPS)
+    assert sorted(domain.model['deployment']) == ['app.war', version]
+
+def test_absent_removes_every_version_in_rollout_mode(artifactDir):
+    domain = startedDomain()
+    with FakeManagementServer(domain) as server:
+        rollout(server, artifactDir)
+        changeArchive(artifactDir)
+        rollout(server, artifactDir, server_group_name=['group-0'])
+        assert rollout(server, artifactDir, server_group_name=['group-0'], state='absent')['changed']
+        assert sorted(domain.model['deployment']) == ['app.war']
+        assert rollout(server, artifactDir, state='absent')['changed']
+        assert rollout(server, artifactDir, state='absent')['changed'] is False
+    assert domain.model['deployment'] == {}
+    assert runningVersions(domain) == dict((group, []) for group in GROUPS)
+
+def test_same_archive_is_not_uploaded_again_and_a_changed_one_is_replaced(artifactDir):
+    domain = FakeDomain(hosts=('master', 'slave')).populate(1, 2)
+    archive = os.path.join(artifactDir, 'app.war')
+    def deploy():
+        before = len(server.requests)
+        result = runModule('jcli_deploy', dict(server.data(), artifact='app.war', artifact_dir=artifactDir, server_group_name=['group-0'],
+                                               server_mode='domain'))
+        assert not result.get('failed'), result
+        uploads = sum(1 for method, uri, body in server.requests[before:] if uri == '/management-upload')
+        return result['changed'], uploads
+    def stored():
+        return [base64.b64decode(item['hash']['BYTES_VALUE']) for item in domain.model['deployment']['app.war']['content']]
+    with FakeManagementServer(domain) as server:
+        assert deploy() == (True, 1)
+        assert deploy() == (False, 0)
+        with open(archive, 'wb') as f:
+            f.write(b'PK\x03\x04version 3')
+        assert deploy() == (True, 1)
+    assert [op['operation'] for op in domain.operations if 'input-streams' in op] == ['composite', 'full-replace-deployment']
+    with open(archive, 'rb') as f:
+        assert stored() == [hashlib.sha1(f.read()).digest()]
+    assert 'app.war' in domain.model['server-group']['group-0']['deployment']
+
+def deploy(server, artifactDir, groups, **args):
+    return runModule('jcli_deploy', dict(server.data(), artifact='app.war', artifact_dir=artifactDir, server_group_name=groups,
+                                         server_mode='domain', **args))
+
+def uploads(server):
+    return [body for method, uri, body in server.requests if uri == '/management-upload']
+
+def test_content_is_uploaded_once_for_every_server_group_in_one_composite(artifactDir):
+    domain = FakeDomain().populate(3, 0)
+    with FakeManagementServer(domain) as server:
+        result = deploy(server, artifactDir, GROUPS)
+        assert len(uploads(server)) == 1
+    assert not result.get('failed'), result
+    composite, = [op for op in domain.operations if 'input-streams' in op]
+    assert [(step['address'], step['operation']) for step in composite['steps']] == [([{"deployment": 'app.war'}], 'add')] + [
+        ([{"server-group": group}, {"deployment": 'app.war'}], 'add') for group in GROUPS]
+    assert deployedGroups(domain) == GROUPS
+
+def test_deployed_content_is_only_added_to_the_missing_server_groups(artifactDir):
+    domain = FakeDomain().populate(3, 0)
+    with FakeManagementServer(domain) as server:
+        deploy(server, artifactDir, ['group-0'])
+        before = len(domain.operations)
+        result = deploy(server, artifactDir, GROUPS)
+        assert len(uploads(server)) == 1
+    assert (result['changed'], result['meta']['server_groups']) == (True, ['group-1', 'group-2'])
+    added = [op for op in domain.operations[before:] if op['operation'] in ('add', 'composite')]
+    assert [[step['address'][0]['server-group'] for step in op['steps']] for op in added] == [['group-1', 'group-2']]
+    assert deployedGroups(domain) == GROUPS
+
+def test_absent_keeps_the_content_while_other_server_groups_use_it(artifactDir):
+    domain = FakeDomain().populate(3, 0)
+    with FakeManagementServer(domain) as server:
+        deploy(server, artifactDir, GROUPS)
+        assert deploy(server, artifactDir, ['group-0'], state='absent')['changed']
+        assert deployedGroups(domain) == ['group-1', 'group-2']
+        assert 'app.war' in domain.model['deployment']
+        assert deploy(server, artifactDir, ['group-0'], state='absent')['changed'] is False
+        assert deploy(server, artifactDir, ['group-1', 'group-2'], state='absent')['changed']
+    assert deployedGroups(domain) == []
+    assert 'app.war' not in domain.model['deployment']
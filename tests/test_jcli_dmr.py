@@ -0,0 +1,72 @@
+from jcli_dmr import dmrEquals, dmrResponse, dmrSummary, isNotFound, processState
+
+CLI_OUTPUT = '''{
+    "outcome" => "success",
+    "result" => {
+        "heap-size" => "64m",
+        "socket-binding-port-offset" => 100L,
+        "auto-start" => true,
+        "permgen-size" => undefined,
+        "jvm-options" => ["-Xss1m"],
+        "address" => [("host" => "master"),("server-config" => "server-one")],
+        "content" => [{"hash" => bytes {
+            0x7e, 0x1a, 0x0f
+        }}],
+        "value" => expression "${jboss.bind.address:127.0.0.1}"
+    }
+}
+'''
+
+def test_cli_dmr_notation_is_parsed():
+    result = dmrResponse(CLI_OUTPUT)['result']
+    assert result['heap-size'] == '64m'
+    assert result['socket-binding-port-offset'] == 100
+    assert result['auto-start'] is True
+    assert result['permgen-size'] is None
+    assert result['jvm-options'] == ['-Xss1m']
+    assert result['address'] == [{"host": "master"}, {"server-config": "server-one"}]
+    assert result['content'] == [{"hash": "7e1a0f"}]
+    assert result['value'] == '${jboss.bind.address:127.0.0.1}'
+
+def test_json_response_is_parsed():
+    response = dmrResponse('{"outcome" : "failed", "failure-description" : "WFLYCTL0216: not found"}')
+    assert response['outcome'] == 'failed'
+
+def test_output_without_response_is_a_failure():
+    assert dmrResponse('Failed to connect to the controller')['outcome'] == 'failed'
+
+def test_command_without_output_succeeded():
+    assert dmrResponse('\n')['outcome'] == 'success'
+
+def test_json_after_a_cli_warning_is_decoded_in_place():
+    response = dmrResponse('WARN: something\n{"outcome" : "success", "result" : {"a" : {"b" : [1, 2]}}}\n')
+    assert response['result'] == {"a": {"b": [1, 2]}}
+
+def test_missing_resource_is_found_in_nested_failures():
+    response = {"outcome": "failed", "failure-description": {"WFLYCTL0062: Composite operation failed": {"Operation step-2": "WFLYCTL0216: not found"}}}
+    assert isNotFound(response)
+    assert not isNotFound({"outcome": "failed", "failure-description": "WFLYCTL0155: name may not be null"})
+
+def test_summary_drops_read_results_and_keeps_step_outcomes():
+    response = {"outcome": "success", "result": {
+        "step-1": {"outcome": "success", "result": [{"address": [], "result": {"big": "x" * 10000}}]},
+        "step-2": {"outcome": "success", "result": "STARTED"},
+        "step-10": {"outcome": "success"},
+    }, "response-headers": {"operation-requires-reload": True}}
+    assert dmrSummary(response) == {"outcome": "success", "response-headers": {"operation-requires-reload": True},
+                                    "steps": [{"outcome": "success"}, {"outcome": "success", "result": "STARTED"}, {"outcome": "success"}]}
+
+def test_values_are_compared_as_the_model_prints_them():
+    assert dmrEquals(100, '100')
+    assert dmrEquals(True, 'true')
+    assert not dmrEquals('64m', '128m')
+
+def test_process_state_of_steps_and_servers():
+    restart = {"operation-requires-restart": True, "process-state": "restart-required"}
+    response = {"outcome": "success", "result": {
+        "step-1": {"outcome": "success", "response-headers": {"process-state": "reload-required"}},
+        "step-2": {"outcome": "success"},
+    }, "server-groups": {"main": {"host": {"master": {"s1": {"response": {"outcome": "success", "response-headers": restart}},
+                                                      "s2": {"response": {"outcome": "success"}}}}}}}
+    assert processState(response) == {"reload_required": True, "restart_required": True, "servers": ["master/s1"]}
+    assert processState({"outcome": "success"}) == {"reload_required": False, "restart_required": False, "servers": []}
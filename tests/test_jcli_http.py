@@ -0,0 +1,132 @@
+import json
+
+import pytest
+
+from fake_management import FakeManagementServer
+from jcli import JBossConnetionError, JBossTimeout, closeSessions, jbossBatch, jbossOperation, jbossSession, jbossUpload
+from jcli_dmr import dmrComposite, dmrOperation, isNotFound, toCli
+from jcli_model import modelGet, readModel
+
+def missing(op):
+    return {"outcome": "failed", "failure-description": "WFLYCTL0216: Management resource not found", "rolled-back": True}
+
+@pytest.fixture(autouse=True)
+def sessions():
+    yield
+    closeSessions()
+
+def test_operation_is_sent_as_json_dmr():
+    with FakeManagementServer() as server:
+        op = dmrOperation([('host', 'master'), ('server-config', 'server-one')], 'add', {"group": "main-server-group"})
+        jbossOperation(server.data(), op)
+        method, uri, body = server.requests[0]
+        assert (method, uri) == ('POST', '/management')
+        assert json.loads(body.decode('utf-8')) == {"operation": "add", "address": [{"host": "master"}, {"server-config": "server-one"}], "group": "main-server-group"}
+
+def test_failure_description_is_returned():
+    with FakeManagementServer(missing) as server:
+        response = jbossOperation(server.data(), dmrOperation([('server-group', 'nope')], 'query'))
+        assert response['outcome'] == 'failed'
+        assert isNotFound(response)
+
+def test_connection_is_kept_alive_and_authenticated_once():
+    with FakeManagementServer() as server:
+        data = server.data()
+        for i in range(5):
+            jbossOperation(data, dmrOperation([('server-group', 'g{}'.format(i))], 'query'))
+        assert server.connections == 1
+        assert len(server.requests) == 5
+        assert jbossSession(data).nonceCount == 5
+
+def test_reconnects_when_the_server_drops_the_connection():
+    with FakeManagementServer() as server:
+        data = server.data()
+        jbossOperation(data, dmrOperation([], 'read-resource'))
+        jbossSession(data).connection.sock.close()
+        jbossOperation(data, dmrOperation([], 'read-resource'))
+        assert len(server.requests) == 2
+
+def test_blocking_operation_not_answered_in_time_times_out():
+    with FakeManagementServer(latency=0.5) as server:
+        data = server.data()
+        with pytest.raises(JBossTimeout):
+            jbossOperation(data, dmrOperation([('host', 'master'), ('server-config', 's1')], 'start', {"blocking": True}), 0.1)
+        server.latency = 0
+        assert jbossOperation(data, dmrOperation([], 'read-resource'))['outcome'] == 'success'
+        # the operation that timed out was not sent again
+        assert len(server.requests) == 2
+
+def test_operation_the_server_received_is_not_sent_again():
+    answers = iter([{"outcome": "success"}, None])
+    with FakeManagementServer(lambda op: next(answers)) as server:
+        data = server.data()
+        jbossOperation(data, dmrOperation([], 'read-resource'))
+        with pytest.raises(JBossConnetionError):
+            jbossOperation(data, dmrOperation([('server-group', 'app')], 'add', {"profile": "full"}))
+        assert len(server.requests) == 2
+
+def test_wrong_password_fails():
+    with FakeManagementServer() as server:
+        with pytest.raises(JBossConnetionError):
+            jbossOperation(server.data(password='wrong'), dmrOperation([], 'read-resource'))
+
+def test_unreachable_controller_fails():
+    with pytest.raises(JBossConnetionError):
+        jbossOperation({"controller_host": '127.0.0.1', "controller_port": 1, "user": 'admin', "password": 'nimda', "transport": 'http'},
+                       dmrOperation([], 'read-resource'))
+
+def test_upload_attaches_the_archive(tmp_path):
+    archive = tmp_path / 'app.war'
+    archive.write_bytes(b'PK\x03\x04archive')
+    with FakeManagementServer() as server:
+        op = dmrOperation([('deployment', 'app.war')], 'add', {"content": [{"input-stream-index": 0}], "enabled": True})
+        jbossUpload(server.data(), op, str(archive))
+        method, uri, body = server.requests[-1]
+        assert (method, uri) == ('POST', '/management-upload')
+        assert b'PK\x03\x04archive' in body
+        assert sum(1 for r in server.requests if r[1] == '/management-upload') == 1
+
+def test_upload_is_streamed_in_chunks(tmp_path):
+    archive = tmp_path / 'big.ear'
+    payload = bytes(bytearray(range(256))) * 4096
+    archive.write_bytes(payload)
+    with FakeManagementServer() as server:
+        op = dmrOperation([], 'full-replace-deployment', {"name": "big.ear", "content": [{"input-stream-index": 0}], "enabled": True})
+        result, upload = jbossUpload(server.data(), op, str(archive), chunkSize=64 * 1024)
+        assert payload in server.requests[-1][2]
+        assert upload['bytes'] == len(payload)
+        assert upload['progress'][-1]['percent'] == 100
+        assert len(upload['progress']) < 1024 * 1024 // (64 * 1024)
+
+def test_cli_rendering():
+    op = dmrOperation([('host', 'master'), ('server-config', 's1')], 'add', {"group": "g", "socket-binding-port-offset": 100, "auto-start": True})
+    assert toCli(op) == '/host=master/server-config=s1:add(group="g",socket-binding-port-offset=100,auto-start=true)'
+    assert toCli(dmrOperation([('server-group', 'g')], 'query')) == '/server-group=g:query'
+
+def test_batch_is_one_composite_round_trip():
+    with FakeManagementServer() as server:
+        address = [('host', 'master'), ('server-config', 's1'), ('jvm', 'default')]
+        jbossBatch(server.data(), [dmrOperation(address, 'add'),
+                                   dmrOperation(address, 'write-attribute', {"name": "heap-size", "value": "64m"})])
+        assert len(server.requests) == 1
+        op = json.loads(server.requests[0][2].decode('utf-8'))
+        assert op['operation'] == 'composite'
+        assert [step['operation'] for step in op['steps']] == ['add', 'write-attribute']
+
+def test_composite_renders_steps_for_the_cli():
+    op = dmrComposite([dmrOperation([('host', 'master'), ('server-config', 's1'), ('jvm', 'default')], 'add')])
+    assert toCli(op) == ':composite(steps=[{"operation" => "add","address" => [("host" => "master"),("server-config" => "s1"),("jvm" => "default")]}])'
+
+def test_model_snapshot_is_one_read():
+    def respond(op):
+        return {"outcome": "success", "result": {
+            "step-1": {"outcome": "success", "result": [{"address": [{"server-group": "main"}], "outcome": "success", "result": {"profile": "full"}}]},
+            "step-2": {"outcome": "success", "result": [{"address": [{"host": "master"}, {"server-config": "s1"}], "outcome": "success", "result": {"group": "main"}}]},
+            "step-3": {"outcome": "success", "result": []},
+        }}
+    with FakeManagementServer(respond) as server:
+        model = readModel(server.data())
+        assert len(server.requests) == 1
+        assert modelGet(model, [('server-group', 'main')]) == {"profile": "full"}
+        assert modelGet(model, [('host', 'master'), ('server-config', 's1')]) == {"group": "main"}
+        assert modelGet(model, [('deployment', 'app.war')]) is None
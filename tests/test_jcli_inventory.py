@@ -0,0 +1,52 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from fake_domain import FakeDomain
+from fake_management import FakeManagementServer
+
+ROLE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def plain(value):
+    '''inventory json without the markers ansible-inventory puts on untrusted strings'''
+    if isinstance(value, dict):
+        return value['__ansible_unsafe'] if list(value) == ['__ansible_unsafe'] else dict((k, plain(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return [plain(v) for v in value]
+    return value
+
+def test_servers_grouped_by_server_group_from_one_cached_read(tmp_path):
+    pytest.importorskip('ansible')
+    domain = FakeDomain(hosts=('master', 'slave')).populate(2, 3)
+    with FakeManagementServer(domain) as server:
+        connection = server.data()
+        (tmp_path / 'domain.jcli.yml').write_text(u'\n'.join([
+            'plugin: jcli_domain',
+            'controller_host: {}'.format(connection['controller_host']),
+            'controller_port: {}'.format(connection['controller_port']),
+            'user: admin',
+            'password: nimda',
+            'cache: true',
+            'cache_plugin: jsonfile',
+            'cache_connection: cache',
+            'compose: {http_port: 8080 + jcli_port_offset}',
+        ]))
+        env = dict(os.environ, ANSIBLE_INVENTORY_PLUGINS=os.path.join(ROLE, 'inventory_plugins'), ANSIBLE_INVENTORY_ENABLED='jcli_domain',
+                   ANSIBLE_TRANSFORM_INVALID_GROUP_CHARS='always')
+        def inventory(*args):
+            before = len(server.requests)
+            out = subprocess.check_output([sys.executable, '-m', 'ansible', 'inventory', '-i', 'domain.jcli.yml', '--list'] + list(args),
+                                          cwd=str(tmp_path), env=env)
+            return plain(json.loads(out.decode('utf-8'))), len(server.requests) - before
+        listed, requests = inventory()
+        assert requests == 1
+        assert inventory()[1] == 0
+        assert inventory('--flush-cache')[1] == 1
+    assert os.listdir(str(tmp_path / 'cache'))
+    assert sorted(listed['group_0']['hosts']) == ['master_server-0', 'master_server-2']
+    assert listed['host_slave']['hosts'] == ['slave_server-1']
+    hostvars = listed['_meta']['hostvars']['master_server-2']
+    assert (hostvars['jcli_port_offset'], hostvars['jcli_socket_binding_group'], hostvars['http_port']) == (200, 'full-sockets', 8280)
@@ -0,0 +1,73 @@
+import pytest
+
+pytest.importorskip('ansible')
+
+from benchmark import runModule
+from fake_domain import FakeDomain
+from fake_management import FakeManagementServer
+
+WRITES = ('add', 'write-attribute', 'undefine-attribute', 'add-jvm-option', 'composite')
+
+def startedDomain():
+    domain = FakeDomain().populate(1, 1)
+    domain.model['host']['master']['server-config']['server-0']['status'] = 'STARTED'
+    return domain
+
+def configure(server, domain, **args):
+    '''result of one jcli_jvm task and the writes it sent'''
+    before = len(domain.operations)
+    result = runModule('jcli_jvm', dict(server.data(), server_config_name='server-0', jvm_name='default', **args))
+    assert not result.get('failed'), result
+    return result, [op['operation'] for op in domain.operations[before:] if op['operation'] in WRITES]
+
+def test_rerun_with_the_same_attributes_writes_nothing_and_needs_no_restart():
+    domain = startedDomain()
+    args = {"heap_size": '512m', "max_heap_size": '1024m', "jvm_options": ['-Dfoo=1', '-Xss1m']}
+    with FakeManagementServer(domain) as server:
+        first, writes = configure(server, domain, **args)
+        assert (first['changed'], first['restart_required']) == (True, True)
+        assert sorted(first['meta']['changed_attributes']) == ['heap-size', 'jvm-options', 'max-heap-size']
+        second, writes = configure(server, domain, **args)
+    assert (second['changed'], second['restart_required'], writes) == (False, False, [])
+    jvm = domain.model['host']['master']['server-config']['server-0']['jvm']['default']
+    assert (jvm['heap-size'], jvm['jvm-options']) == ('512m', ['-Dfoo=1', '-Xss1m'])
+
+def test_only_the_changed_attribute_is_written():
+    domain = startedDomain()
+    with FakeManagementServer(domain) as server:
+        configure(server, domain, heap_size='512m', max_heap_size='1024m')
+        result, writes = configure(server, domain, heap_size='768m', max_heap_size='1024m')
+    assert (result['changed'], result['meta']['changed_attributes'], writes) == (True, ['heap-size'], ['write-attribute'])
+
+def test_rerun_of_an_auto_sized_jvm_keeps_the_order_of_its_options():
+    domain = startedDomain()
+    args = {"auto_size": True, "memory_mb": 16384, "jvm_options": ['-Dfoo=1']}
+    with FakeManagementServer(domain) as server:
+        first, writes = configure(server, domain, **args)
+        second, writes = configure(server, domain, **args)
+    assert first['changed']
+    assert (second['changed'], second['restart_required'], writes) == (False, False, [])
+    options = domain.model['host']['master']['server-config']['server-0']['jvm']['default']['jvm-options']
+    assert options == ['-Dfoo=1', '-XX:MetaspaceSize=256m', '-XX:MaxMetaspaceSize=512m', '-XX:+UseG1GC']
+
+def test_permgen_sizes_are_refused_only_with_auto_size():
+    domain = startedDomain()
+    with FakeManagementServer(domain) as server:
+        configure(server, domain, auto_size=False, heap_size='512m', max_heap_size='1024m', permgen_size='128m')
+        result = runModule('jcli_jvm', dict(server.data(), server_config_name='server-0', jvm_name='default', auto_size=True,
+                                            memory_mb=16384, max_permgen_size='256m'))
+    assert result['failed']
+    assert 'auto_size' in result['msg']
+    assert domain.model['host']['master']['server-config']['server-0']['jvm']['default']['permgen-size'] == '128m'
+
+def test_jvm_options_are_a_list_in_jcli_jvm_as_in_jcli_server():
+    domain = startedDomain()
+    options = ['-Dfoo=1', '-Xss1m']
+    with FakeManagementServer(domain) as server:
+        created = runModule('jcli_server', dict(server.data(), server_config_name='server-1', server_group_name='group-0',
+                                                server_socket_binding_port_offset=100, jvm_name='default', heap_size='512m', jvm_options=options))
+        assert not created.get('failed'), created
+        result = runModule('jcli_jvm', dict(server.data(), server_config_name='server-1', jvm_name='default', heap_size='512m',
+                                            max_heap_size='1024m', jvm_options=options))
+    assert not result.get('failed'), result
+    assert result['meta']['changed_attributes'] == ['max-heap-size']
@@ -0,0 +1,48 @@
+from jcli_model import allocatePortOffsets, cachedResource, invalidate, isCovered, modelGet, serverConfigs
+
+def snapshot():
+    return {
+        "server-group": {"main": {"profile": "full", "deployment": {"app.war": {"enabled": True}}}},
+        "host": {"master": {"server-config": {"s1": {"group": "main", "jvm": {"default": {"heap-size": "64m"}}}}}},
+    }
+
+def unread():
+    raise AssertionError('the controller should not be asked')
+
+def test_snapshot_answers_existence_checks():
+    data = {"model": snapshot()}
+    assert cachedResource(data, [('host', 'master'), ('server-config', 's1'), ('jvm', 'default')], unread) == {"heap-size": "64m"}
+    assert cachedResource(data, [('host', 'master'), ('server-config', 's2')], unread) is None
+    assert cachedResource(data, [('deployment', 'app.war')], unread) is None
+
+def test_resources_outside_the_snapshot_are_read():
+    data = {"model": snapshot()}
+    assert not isCovered(data['model'], [('profile', 'full')])
+    assert cachedResource(data, [('profile', 'full')], lambda: 'read') == 'read'
+    assert cachedResource({"model": None}, [('server-group', 'main')], lambda: 'read') == 'read'
+
+def test_a_change_invalidates_only_its_subtree():
+    data = {"model": snapshot()}
+    invalidate(data, [('host', 'master'), ('server-config', 's1'), ('jvm', 'default')])
+    assert modelGet(data['model'], [('host', 'master'), ('server-config', 's1'), ('jvm', 'default')]) is None
+    assert cachedResource(data, [('host', 'master'), ('server-config', 's1'), ('jvm', 'default')], lambda: 'read') == 'read'
+    assert cachedResource(data, [('host', 'master'), ('server-config', 's1')], unread)['group'] == 'main'
+    assert cachedResource(data, [('server-group', 'main')], unread)['profile'] == 'full'
+
+def test_wildcard_invalidation():
+    data = {"model": snapshot()}
+    invalidate(data, [('server-group', '*'), ('deployment', 'app.war')])
+    assert modelGet(data['model'], [('server-group', 'main')]) == {"profile": "full", "deployment": {}}
+    assert not isCovered(data['model'], [('server-group', 'main'), ('deployment', 'app.war')])
+    assert not isCovered(data['model'], [('server-group', '*'), ('deployment', 'app.war')])
+    assert isCovered(data['model'], [('server-group', 'main')])
+
+def test_port_offsets_keep_clear_of_used_ones():
+    assert allocatePortOffsets([0, 200], 3) == [100, 300, 400]
+    assert allocatePortOffsets([150], 2, start=100) == [300, 400]
+    assert allocatePortOffsets([], 2, start=1000, step=10) == [1000, 1010]
+
+def test_server_configs_from_the_snapshot():
+    data = {"model": snapshot()}
+    assert list(serverConfigs(data, 'master')) == ['s1']
+    assert serverConfigs(data, 'slave') == {}
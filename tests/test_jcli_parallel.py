@@ -0,0 +1,48 @@
+import threading
+import time
+
+from jcli import jbossSession
+from jcli_parallel import runParallel, runParallelStates
+
+def test_items_run_concurrently_and_keep_their_order():
+    def task(item):
+        time.sleep(0.2)
+        return item * 2
+    started = time.time()
+    outcomes = runParallel(task, [1, 2, 3, 4], 4)
+    assert time.time() - started < 0.6
+    assert [o['result'] for o in outcomes] == [2, 4, 6, 8]
+    assert all(o['seconds'] >= 0.2 for o in outcomes)
+
+def test_workers_bound_the_pool():
+    running = []
+    peak = []
+    lock = threading.Lock()
+    def task(item):
+        with lock:
+            running.append(item)
+            peak.append(len(running))
+        time.sleep(0.05)
+        with lock:
+            running.remove(item)
+    runParallel(task, list(range(8)), 2)
+    assert max(peak) == 2
+
+def test_failures_are_reported_per_item():
+    def task(server):
+        if server == 'bad':
+            raise ValueError('boom')
+        return False, server == 'changed', {"status": "OK"}
+    isError, hasChanged, meta = runParallelStates(task, ['changed', 'same', 'bad'], 3, 'server')
+    assert isError and hasChanged
+    assert [s['server'] for s in meta['servers']] == ['changed', 'same', 'bad']
+    assert meta['servers'][2] == {"server": 'bad', "seconds": meta['servers'][2]['seconds'], "changed": False, "failed": True, "error": 'boom'}
+
+def test_every_thread_has_its_own_session():
+    data = {"controller_host": 'localhost', "controller_port": 9990, "user": 'admin', "password": 'x', "transport": 'http'}
+    barrier = threading.Barrier(2)
+    def task(item):
+        barrier.wait()
+        return jbossSession(data)
+    outcomes = runParallel(task, [1, 2], 2)
+    assert outcomes[0]['result'] is not outcomes[1]['result']
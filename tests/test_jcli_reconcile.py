@@ -0,0 +1,64 @@
+import json
+import os
+import subprocess
+import sys
+
+import pytest
+
+from fake_domain import FakeDomain
+from fake_management import FakeManagementServer
+from jcli_dmr import dmrOperation
+from jcli_reconcile import batchPhases
+
+ROLE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def test_phases_keep_the_dependencies_in_order():
+    group = dmrOperation([('server-group', 'app')], 'add', {"profile": "full"})
+    s1 = dmrOperation([('host', 'h1'), ('server-config', 's1')], 'add', {"group": "app"})
+    jvm = dmrOperation([('host', 'h1'), ('server-config', 's1'), ('jvm', 'default')], 'add')
+    s2 = dmrOperation([('host', 'h2'), ('server-config', 's2')], 'add', {"group": "app"})
+    deployment = dmrOperation([('server-group', 'app'), ('deployment', 'app.war')], 'add', {"enabled": True})
+    removal = dmrOperation([('host', 'h2'), ('server-config', 'old')], 'remove')
+    assert batchPhases([group, s1, jvm, s2, deployment, removal]) == [[[group]], [[s1, jvm], [s2]], [[deployment]], [[removal]]]
+    assert batchPhases([s2]) == [[[s2]]]
+
+def test_action_plugin_applies_every_host_in_a_few_composites(tmp_path):
+    pytest.importorskip('ansible')
+    hosts = ('master', 'slave1', 'slave2')
+    domain = FakeDomain(hosts=hosts)
+    (tmp_path / 'hosts').write_text(u'[domain]\n' + u''.join(u'{} ansible_connection=local\n'.format(host) for host in hosts))
+    (tmp_path / 'host_vars').mkdir()
+    for host in hosts:
+        servers = [{"name": '{}-app-{}'.format(host, i), "group": 'app', "socket_binding_port_offset": 100 * i} for i in range(3)]
+        (tmp_path / 'host_vars' / (host + '.json')).write_text(json.dumps({"jcli_domain": {
+            "server_groups": [{"name": 'app', "profile": 'full', "socket_binding_group": 'full-sockets'}], "servers": servers}}))
+    with FakeManagementServer(domain) as server:
+        connection = server.data()
+        (tmp_path / 'play.yml').write_text(u'''- hosts: domain
+  gather_facts: false
+  tasks:
+    - jcli_batch: {{controller_host: {}, controller_port: {}, user: admin, password: nimda}}
+'''.format(connection['controller_host'], connection['controller_port']))
+        env = dict(os.environ, ANSIBLE_ACTION_PLUGINS=os.path.join(ROLE, 'action_plugins'))
+        def play():
+            before = len(server.requests)
+            subprocess.check_call([sys.executable, '-m', 'ansible', 'playbook', '-i', 'hosts', 'play.yml'], cwd=str(tmp_path), env=env,
+                                  stdout=subprocess.DEVNULL)
+            return len(server.requests) - before
+        # one read, the server group, one composite per host
+        assert play() == 5
+        assert play() == 1
+    assert all(len(domain.model['host'][host]['server-config']) == 3 for host in hosts)
+
+def test_action_plugin_appends_its_module_utils_to_the_import_path():
+    pytest.importorskip('ansible')
+    script = '''
+import importlib.util, json, sys
+path = list(sys.path)
+for i in range(2):
+    spec = importlib.util.spec_from_file_location('jcli_batch_plugin', {!r})
+    spec.loader.exec_module(importlib.util.module_from_spec(spec))
+print(json.dumps(sys.path[len(path):] if sys.path[:len(path)] == path else sys.path))
+'''.format(os.path.join(ROLE, 'action_plugins', 'jcli_batch.py'))
+    out = subprocess.check_output([sys.executable, '-c', script], cwd=ROLE)
+    assert json.loads(out.decode('utf-8')) == [os.path.join(ROLE, 'module_utils')]
@@ -0,0 +1,18 @@
+import pytest
+
+pytest.importorskip('ansible')
+
+from benchmark import runModule
+from fake_domain import FakeDomain
+from fake_management import FakeManagementServer
+
+def test_host_controller_needing_a_restart_is_restarted_not_reloaded():
+    domain = FakeDomain(hosts=('master', 'slave1', 'slave2'))
+    domain.model['host']['slave1']['host-state'] = 'reload-required'
+    domain.model['host']['slave2']['host-state'] = 'restart-required'
+    with FakeManagementServer(domain) as server:
+        result = runModule('jcli_reload', dict(server.data(), timeout=5))
+    assert not result.get('failed'), result
+    applied = [(op['address'], op['operation'], op.get('restart')) for op in domain.operations if op['operation'] in ('reload', 'shutdown')]
+    assert applied == [([{"host": 'slave1'}], 'reload', None), ([{"host": 'slave2'}], 'shutdown', True)]
+    assert [host['host-state'] for name, host in sorted(domain.model['host'].items())] == ['running'] * 3
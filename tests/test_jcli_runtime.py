@@ -0,0 +1,46 @@
+from fake_domain import FakeDomain
+from fake_management import FakeManagementServer
+from jcli import closeSessions
+from jcli_runtime import metricsRows, readRuntimeMetrics
+
+def startedDomain():
+    domain = FakeDomain(hosts=('master', 'slave')).populate(2, 4)
+    for host in domain.model['host'].values():
+        for config in host['server-config'].values():
+            config['status'] = 'STARTED'
+    return domain
+
+def test_every_section_of_a_group_in_one_read():
+    with FakeManagementServer(startedDomain()) as server:
+        metrics = readRuntimeMetrics(server.data(), group='group-1')
+        closeSessions()
+        assert len(server.requests) == 1
+    assert sorted(metrics['servers']) == ['slave/server-1', 'slave/server-3']
+    server = metrics['servers']['slave/server-1']
+    assert server['memory']['heap-memory-usage']['used'] == 300 << 20
+    assert server['gc']['G1_Young_Generation'] == {"collection-count": 42, "collection-time": 310}
+    assert server['listeners']['default-server/default']['request-count'] == 1000
+    assert server['datasources']['ExampleDS']['InUseCount'] == 3
+    assert metrics['unavailable'] == []
+
+def test_a_section_that_fails_is_reported_unavailable():
+    domain = startedDomain()
+    def responder(op):
+        response = domain(op)
+        response['result']['step-7'] = {"outcome": "failed", "failure-description": "WFLYCTL0030: No resource definition is registered"}
+        return response
+    with FakeManagementServer(responder) as server:
+        metrics = readRuntimeMetrics(server.data(), servers=['server-0'])
+        closeSessions()
+    assert list(metrics['servers']) == ['master/server-0']
+    assert metrics['unavailable'] == ['datasources']
+    assert 'datasources' not in metrics['servers']['master/server-0']
+
+def test_rows_split_the_memory_usages():
+    metrics = {"collected": 0, "servers": {"master/s1": {"server-group": "main", "memory": {"heap-memory-usage": {"used": 1, "max": 2}},
+                                                        "gc": {"G1": {"collection-count": 3}}}}}
+    assert metricsRows(metrics) == [
+        ('master/s1', 'gc', 'G1', 'collection-count', 3),
+        ('master/s1', 'memory', '', 'heap-memory-usage.max', 2),
+        ('master/s1', 'memory', '', 'heap-memory-usage.used', 1),
+    ]
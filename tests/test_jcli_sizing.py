@@ -0,0 +1,28 @@
+import pytest
+
+from jcli_sizing import jvmSizing, mergeJvmOptions, physicalMemoryMb, sizingOptions, webPreset
+
+def test_memory_is_shared_by_the_servers_of_the_host():
+    sizing = jvmSizing(16384, 4)
+    assert (sizing['heap-size'], sizing['max-heap-size'], sizing['max-metaspace-size']) == ('2016m', '2016m', '384m')
+    assert jvmSizing(65536, 2)['max-metaspace-size'] == '512m'
+    assert jvmSizing(16384, 4, reserveRatio=0.5)['heap-size'] == '1344m'
+
+def test_too_many_servers_for_the_memory():
+    with pytest.raises(ValueError) as e:
+        jvmSizing(1024, 3)
+    assert '3 servers' in str(e.value)
+
+def test_options_replace_the_collector_metaspace_and_permgen():
+    current = ['-Xss1m', '-XX:+UseParallelGC', '-XX:MaxPermSize=256m', '-XX:MaxMetaspaceSize=1g', '-XX:+HeapDumpOnOutOfMemoryError']
+    options = mergeJvmOptions(current, sizingOptions(jvmSizing(16384, 4), 'G1'))
+    assert options == ['-Xss1m', '-XX:+HeapDumpOnOutOfMemoryError', '-XX:MetaspaceSize=192m', '-XX:MaxMetaspaceSize=384m', '-XX:+UseG1GC']
+    assert mergeJvmOptions(options, sizingOptions(jvmSizing(16384, 4), 'G1')) == options
+
+def test_physical_memory_from_meminfo(tmp_path):
+    meminfo = tmp_path / 'meminfo'
+    meminfo.write_text(u'MemTotal:       16303264 kB\nMemFree:         1000000 kB\n')
+    assert physicalMemoryMb(str(meminfo)) == 15921
+
+def test_web_preset_scales_with_the_cores():
+    assert webPreset(4) == {"io_threads": 8, "task_max_threads": 64, "buffer_size": 16384, "direct_buffers": True}
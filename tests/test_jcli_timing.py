@@ -0,0 +1,41 @@
+import pytest
+
+from fake_cli import fakeJbossHome
+from fake_management import FakeManagementServer
+from jcli import closeSessions, jbossOperation
+from jcli_dmr import dmrOperation
+from jcli_timing import metricsReport, resetMetrics
+from jcli_wait import waitFor
+
+@pytest.fixture(autouse=True)
+def metrics():
+    resetMetrics()
+    yield
+    closeSessions()
+
+def kinds():
+    return [event['kind'] for event in metricsReport()['events']]
+
+def test_cli_spawn_and_connect_are_told_apart_from_operations(tmp_path):
+    data = {"jboss_home": fakeJbossHome(tmp_path), "controller_host": 'localhost', "controller_port": 9990,
+            "user": 'admin', "password": 'nimda', "transport": 'cli'}
+    jbossOperation(data, dmrOperation([('host', 'master')], 'reload'))
+    jbossOperation(data, dmrOperation([], 'read-resource'))
+    assert kinds() == ['spawn', 'connect', 'operation', 'operation']
+    operation = metricsReport()['events'][2]
+    assert (operation['operation'], operation['address'], operation['transport']) == ('reload', '/host=master', 'cli')
+    assert metricsReport()['totals']['operation']['count'] == 2
+
+def test_http_connect_and_authentication_are_recorded():
+    with FakeManagementServer() as server:
+        jbossOperation(server.data(), dmrOperation([], 'read-resource'))
+        jbossOperation(server.data(), dmrOperation([], 'read-resource'))
+    assert kinds() == ['connect', 'authenticate', 'operation', 'operation']
+
+def test_every_check_of_a_wait_is_recorded(monkeypatch):
+    import jcli_wait
+    monkeypatch.setattr(jcli_wait.time, 'sleep', lambda seconds: None)
+    states = iter([False, False, True])
+    waitFor(lambda: (next(states), None), 60, 'test', delay=0.25)
+    waits = [event for event in metricsReport()['events'] if event['kind'] == 'wait']
+    assert [(event['check'], event['sleep']) for event in waits] == [(1, 0.25), (2, 0.5), (3, 0)]
@@ -0,0 +1,79 @@
+import pytest
+
+import jcli_wait
+from fake_management import FakeManagementServer
+from jcli import JBossTimeout, closeSessions
+from jcli_wait import blockingOperation, waitFor, waitForServers
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    slept = []
+    monkeypatch.setattr(jcli_wait.time, 'sleep', slept.append)
+    yield slept
+    closeSessions()
+
+def test_backoff_doubles_up_to_the_maximum(sleeps):
+    states = iter(['STOPPING'] * 6 + ['STOPPED'])
+    def check():
+        state = next(states)
+        return state == 'STOPPED', state
+    assert waitFor(check, 60, 'stop', delay=0.25, maxDelay=2) == ('STOPPED', 7)
+    assert sleeps == [0.25, 0.5, 1, 2, 2, 2]
+
+def test_deadline_reports_the_last_state(sleeps):
+    with pytest.raises(JBossTimeout) as e:
+        waitFor(lambda: (False, 'STARTING'), 0, 'Status STARTED of server master/s1')
+    assert 'STARTING' in str(e.value)
+    assert e.value.state == 'STARTING'
+    assert sleeps == []
+
+def readiness(configs, servers):
+    '''composite answer of readServerReadiness, configs and servers map host/name to their attributes'''
+    def entries(items, kind):
+        return [{"address": [{"host": name.split('/')[0]}, {kind: name.split('/')[1]}], "outcome": "success", "result": result}
+                for name, result in items.items()]
+    return {"outcome": "success", "result": {
+        "step-1": {"outcome": "success", "result": entries(configs, 'server-config')},
+        "step-2": {"outcome": "success", "result": entries(servers, 'server')},
+    }}
+
+def test_servers_of_a_group_are_checked_in_one_read_per_try(sleeps):
+    answers = iter([
+        readiness({"master/s1": {"group": "g", "status": "STARTED"}, "slave/s2": {"group": "g", "status": "STARTING"},
+                   "slave/s3": {"group": "other", "status": "STOPPED"}},
+                  {"master/s1": {"server-state": "running", "runtime-configuration-state": "ok"},
+                   "slave/s2": {"server-state": "STARTING", "runtime-configuration-state": "starting"}}),
+        readiness({"master/s1": {"group": "g", "status": "STARTED"}, "slave/s2": {"group": "g", "status": "STARTED"},
+                   "slave/s3": {"group": "other", "status": "STOPPED"}},
+                  {"master/s1": {"server-state": "running", "runtime-configuration-state": "ok"},
+                   "slave/s2": {"server-state": "running", "runtime-configuration-state": "ok"}}),
+    ])
+    with FakeManagementServer(lambda op: next(answers)) as server:
+        servers, checks = waitForServers(server.data(), 'started', 60, group='g')
+        assert checks == 2
+        assert len(server.requests) == 2
+        assert sorted(servers) == ['master/s1', 'slave/s2']
+
+def test_lagging_servers_are_reported(sleeps):
+    answer = readiness({"master/s1": {"group": "g", "status": "STARTED"}, "master/s2": {"group": "g", "status": "STARTED"}},
+                       {"master/s1": {"server-state": "running", "runtime-configuration-state": "ok"},
+                        "master/s2": {"server-state": "reload-required", "runtime-configuration-state": "reload-required"}})
+    with FakeManagementServer(lambda op: answer) as server:
+        with pytest.raises(JBossTimeout) as e:
+            waitForServers(server.data(), 'started', 0, servers=['s1', 's2', 'slave/s9'])
+        assert sorted(e.value.state) == ['master/s2', 'slave/s9']
+        assert e.value.state['slave/s9']['status'] == 'MISSING'
+
+def test_blocking_stop_suspends_until_the_deadline_and_is_awaited_past_it(monkeypatch):
+    sent = []
+    monkeypatch.setattr(jcli_wait, 'jbossOperation', lambda data, op, timeout=None: sent.append((op, timeout)) or {"outcome": "success"})
+    monkeypatch.setattr(jcli_wait.time, 'time', lambda: 1000.0)
+    address = [('server-group', 'app')]
+    blockingOperation({"wait": True}, address, 'stop-servers', 1060.0)
+    blockingOperation({"wait": True}, address, 'start-servers', 1060.0)
+    blockingOperation({"wait": False}, address, 'stop-servers', 1060.0)
+    assert [(op['operation'], op.get('blocking'), op.get('timeout'), timeout) for op, timeout in sent] == [
+        ('stop-servers', True, 60, 60 + jcli_wait.BLOCKING_GRACE),
+        ('start-servers', True, None, 60 + jcli_wait.BLOCKING_GRACE),
+        ('stop-servers', None, None, None),
+    ]